@@ -0,0 +1,56 @@
+"""
+Compare fitting many profiles one at a time with build_and_fit,
+against fitting them all at once with build_and_fit_batch.
+
+Usage: python bench_fitters.py [nprofile] [nchannel]
+"""
+from __future__ import absolute_import, division, print_function
+
+import sys
+from time import time
+
+import numpy as np
+
+from glue.core.fitters import BasicGaussianFitter, PolynomialFitter
+
+
+def profiles(nprofile, nchannel):
+    rng = np.random.RandomState(0)
+    x = np.linspace(-10, 10, nchannel)
+    amplitude = rng.uniform(1, 5, (nprofile, 1))
+    mean = rng.uniform(-3, 3, (nprofile, 1))
+    stddev = rng.uniform(0.5, 2, (nprofile, 1))
+    y = amplitude * np.exp(-(x - mean) ** 2 / (2 * stddev ** 2))
+    y += rng.normal(0, 0.05, y.shape)
+    return x, y
+
+
+def compare(fitter, x, y):
+    start = time()
+    loop = [fitter.build_and_fit(x, row) for row in y]
+    t_loop = time() - start
+
+    start = time()
+    batch = fitter.build_and_fit_batch(x, y)
+    t_batch = time() - start
+
+    diff = max(np.abs(fitter.predict(a, x) - fitter.predict(b, x)).max()
+               for a, b in zip(loop, batch))
+
+    print("%-10s loop: %7.3fs  batch: %7.3fs  speedup: %6.1fx  "
+          "max model difference: %.1e" %
+          (fitter.label, t_loop, t_batch, t_loop / t_batch, diff))
+
+
+def main():
+    nprofile = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    nchannel = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    x, y = profiles(nprofile, nchannel)
+
+    print("%i profiles of %i channels" % (nprofile, nchannel))
+    compare(BasicGaussianFitter(), x, y)
+    compare(PolynomialFitter(degree=3), x, y)
+
+
+if __name__ == "__main__":
+    main()
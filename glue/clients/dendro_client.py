@@ -25,6 +25,7 @@ class DendroClient(GenericMplClient):
     def __init__(self, *args, **kwargs):
         super(DendroClient, self).__init__(*args, **kwargs)
         self._layout = None
+        self._tree_cache = None
         self.axes.set_xticks([])
         self.axes.spines['top'].set_visible(False)
         self.axes.spines['bottom'].set_visible(False)
@@ -71,24 +72,13 @@ class DendroClient(GenericMplClient):
             return
 
         try:
-            parent = np.asarray(self.display_data[self.parent_attr],
-                                dtype=np.int).ravel()
+            tree = self._tree
+            parent = tree.parent
             y = self.display_data[self.height_attr].ravel()
-            key = self.display_data[self.order_attr].ravel()
         except IncompatibleAttribute:
             return
 
-        children = self._children
-        pos = np.zeros(key.size) - 1
-        cur_pos = 0
-
-        for struct in _iter_sorted(children, parent, key):
-            if children[struct].size == 0:  # leaf
-                pos[struct] = cur_pos
-                cur_pos += 1
-            else:  # branch
-                assert pos[children[struct]].mean() >= 0
-                pos[struct] = pos[children[struct]].mean()
+        pos = tree.positions()
 
         layout = np.zeros((2, 3 * y.size))
         layout[0, ::3] = pos
@@ -156,9 +146,19 @@ class DendroClient(GenericMplClient):
                           dtype=np.int).ravel()
 
     @property
-    def _children(self):
-        children = _dendro_children(self._parents)
-        return children
+    def _tree(self):
+        """
+        The :class:`DendroTree` of the displayed data, cached until the
+        data, parent attribute, or order attribute change
+        """
+        data = self.display_data
+        key = (data, self.parent_attr, self.order_attr)
+        cache = self._tree_cache
+        if (cache is None or cache[1] != data._version or
+                any(k is not c for k, c in zip(key, cache[0]))):
+            tree = DendroTree(self._parents, data[self.order_attr].ravel())
+            cache = self._tree_cache = (key, data._version, tree)
+        return cache[2]
 
     def _substructures(self, idx):
         """
@@ -168,14 +168,7 @@ class DendroClient(GenericMplClient):
         :param idx: The structure to extract. Int
         :returns: array
         """
-        children = self._children
-        result = []
-        todo = [idx]
-
-        while todo:
-            result.append(todo.pop())
-            todo.extend(children[result[-1]])
-        return np.array(result, dtype=np.int)
+        return self._tree.substructures(idx)
 
     def apply_roi(self, roi):
         if not isinstance(roi, PointROI):
@@ -210,49 +203,172 @@ class DendroClient(GenericMplClient):
                                 focus_data=self.display_data)
 
 
-def _dendro_children(parent):
-    children = [[] for _ in range(parent.size)]
-    for i, p in enumerate(parent):
-        if p < 0:
-            continue
-        children[p].append(i)
-    return list(map(np.asarray, children))
+class DendroTree(object):
 
+    """
+    An array representation of a dendrogram, for fast layout and selection.
 
-def _iter_sorted(children, parent, key):
-    # must yield both children before parent
-    yielded = set()
-    trunks = np.array([i for i, p in enumerate(parent) if p < 0], dtype=np.int)
-    for idx in np.argsort(key[trunks]):
-        idx = trunks[idx]
-        for item in _postfix_iter(idx, children, parent, yielded, key):
-            yield item
-
+    The children of each structure are stored in compressed sparse row
+    form, sorted by a key: the children of structure i are
+    ``children[offsets[i]:offsets[i + 1]]``. The structures are also
+    ordered depth-first (children in ascending key order, after their
+    parent), so that the substructures of each structure are a
+    contiguous range of this ordering.
 
-def _postfix_iter(node, children, parent, yielded, key):
+    Everything is computed with a fixed number of vectorized
+    operations per level of the tree.
     """
-    Iterate over a node and its children, in the following fashion:
 
-    parents are yielded after children
-    children are yielded in order of ascending key value
-    """
+    def __init__(self, parent, key=None):
+        """
+        :param parent: The index of the parent of each structure, or -1
+                       for trunks
+        :param key: The value to sort siblings by. Defaults to the
+                    structure index
+        """
+        self.parent = parent = np.asarray(parent, dtype=np.intp).ravel()
+        n = parent.size
+        if key is None:
+            key = np.arange(n)
+        key = np.asarray(key).ravel()
+
+        # sort by parent, then key. Trunks (parent = -1) come first
+        srt = np.lexsort((key, parent))
+        ntrunk = np.searchsorted(parent[srt], 0)
+        self.trunks = srt[:ntrunk]
+        self.children = srt[ntrunk:]
+        self.offsets = np.searchsorted(parent[self.children],
+                                       np.arange(n + 1))
+
+        self.depth = _depth(parent)
+
+        # nodes grouped by depth. Nodes not descended from a trunk
+        # (which would have to be in a cycle) are sorted to the front,
+        # and left out
+        self._levels = np.argsort(self.depth, kind='mergesort')
+        depths = self.depth[self._levels]
+        self._level_edges = np.searchsorted(
+            depths, np.arange((self.depth.max() if n else -1) + 2))
+        orphans = self._levels[:self._level_edges[0]]
+        self._rank = np.empty(n, dtype=np.intp)
+        self._rank[self._levels] = np.arange(n) - self._level_edges[depths]
+
+        # size of each subtree, accumulated from the deepest level up
+        self.size = np.ones(n, dtype=np.intp)
+        for depth in range(self._level_edges.size - 2, 0, -1):
+            nodes, total = self._parent_sums(depth, self.size)
+            self.size[nodes] += total.astype(np.intp)
+
+        # position of each structure in the depth-first ordering. Each
+        # structure comes after its parent, and the subtrees of its
+        # earlier siblings
+        self.start = np.zeros(n, dtype=np.intp)
+        self.start[self.trunks] = _exclusive_cumsum(self.size[self.trunks])
+        if self.children.size > 0:
+            before = _exclusive_cumsum(self.size[self.children])
+            first = self.offsets[parent[self.children]]
+            before -= before[first]
+            offset = np.zeros(n, dtype=np.intp)
+            offset[self.children] = before
+            for depth in range(1, self._level_edges.size - 1):
+                nodes = self._level(depth)
+                self.start[nodes] = (self.start[parent[nodes]] + 1 +
+                                     offset[nodes])
+        self.size[orphans] = 1
+        self.start[orphans] = np.arange(n - orphans.size, n)
+        self._ntree = n - orphans.size
+
+        self.order = np.empty(n, dtype=np.intp)
+        self.order[self.start] = np.arange(n)
+
+    def _level(self, depth):
+        """ The structures at a given depth """
+        lo, hi = self._level_edges[depth], self._level_edges[depth + 1]
+        return self._levels[lo:hi]
+
+    def _parent_sums(self, depth, values):
+        """
+        Sum values over the children of each structure one level
+        above depth
 
-    todo = [node]
-    expanded = set()
+        :returns: (structures, sums)
+        """
+        nodes = self._level(depth)
+        parents = self._level(depth - 1)
+        total = np.bincount(self._rank[self.parent[nodes]],
+                            weights=values[nodes], minlength=parents.size)
+        return parents, total
 
-    while todo:
-        node = todo[-1]
+    @property
+    def nchildren(self):
+        """ The number of children of each structure """
+        return np.diff(self.offsets)
 
-        if node in yielded:
-            todo.pop()
-            continue
+    def substructures(self, idx):
+        """
+        The indices of a structure and all of its substructures
 
-        if children[node].size == 0 or node in expanded:
-            yield todo.pop()
-            yielded.add(node)
-            continue
+        :param idx: The structure index
+        :returns: An array, in depth-first order
+        """
+        return self.order[self.start[idx]:self.start[idx] + self.size[idx]]
 
-        c = children[node]
-        ind = np.argsort(key[c])[::-1]
-        todo.extend(c[ind])
-        expanded.add(node)
+    def postfix(self):
+        """
+        All structures, each after all of its children. Children
+        are ordered by ascending key.
+        """
+        # a structure ends at start + size, and comes after
+        # every structure which ends before it
+        end = self.start + self.size
+        return np.lexsort((-self.start, end))
+
+    def positions(self):
+        """
+        The x position of each structure in a dendrogram plot.
+        Leaves are evenly spaced in depth-first order, and each
+        branch is centered over its children.
+        """
+        n = self.parent.size
+        nchild = self.nchildren
+        placed = self.order[:self._ntree]
+        leaves = placed[nchild[placed] == 0]
+
+        pos = np.zeros(n) - 1
+        pos[leaves] = np.arange(leaves.size)
+        for depth in range(self._level_edges.size - 2, 0, -1):
+            nodes, total = self._parent_sums(depth, pos)
+            branch = nchild[nodes] > 0
+            pos[nodes[branch]] = total[branch] / nchild[nodes[branch]]
+        return pos
+
+
+def _exclusive_cumsum(x):
+    result = np.zeros(x.size, dtype=np.intp)
+    np.cumsum(x[:-1], out=result[1:])
+    return result
+
+
+def _depth(parent):
+    """
+    The depth of each node of a tree, by pointer jumping
+
+    :param parent: The index of the parent of each node, or -1 for roots
+    :returns: The depth of each node, or -1 for nodes which are not
+              descended from a root (i.e. in or below a cycle)
+    """
+    depth = (parent >= 0).astype(np.intp)
+    jump = parent.copy()
+    todo = np.flatnonzero(jump >= 0)
+
+    # each pass doubles the number of ancestors skipped
+    for _ in range(int(np.log2(parent.size + 1)) + 1):
+        if todo.size == 0:
+            break
+        target = jump[todo]
+        depth[todo] += depth[target]
+        jump[todo] = jump[target]
+        todo = todo[jump[todo] >= 0]
+
+    depth[todo] = -1
+    return depth
@@ -9,7 +9,7 @@ from ..core.subset import RangeSubsetState
 from ..core.exceptions import IncompatibleDataException, IncompatibleAttribute
 from ..core.edit_subset_mode import EditSubsetMode
 from .layer_artist import HistogramLayerArtist, LayerArtistContainer
-from .util import visible_limits, update_ticks
+from .util import visible_limits, update_ticks, request_redraw
 from ..core.callback_property import CallbackProperty, add_callback
 from ..core.util import lookup_class
 
@@ -143,7 +143,7 @@ class HistogramClient(Client):
         return art
 
     def _redraw(self):
-        self._axes.figure.canvas.draw()
+        request_redraw(self._axes.figure.canvas)
 
     def _ensure_layer_data_present(self, layer):
         if layer.data is layer:
@@ -17,7 +17,7 @@ from ..core.callback_property import (
 from ..core.edit_subset_mode import EditSubsetMode
 
 from .viz_client import VizClient, init_mpl
-from .util import defer_draw
+from .util import defer_draw, request_redraw
 from .layer_artist import (ScatterLayerArtist, LayerArtistContainer,
                            ImageLayerArtist, SubsetImageLayerArtist,
                            RGBImageLayerArtist,
@@ -757,7 +757,7 @@ class MplImageClient(ImageClient):
             self.axes.reset_wcs(wcs, slices=slc[::-1])
 
     def _redraw(self):
-        self._axes.figure.canvas.draw()
+        request_redraw(self._axes.figure.canvas)
 
     def relim(self):
         shp = _2d_shape(self.display_data.shape, self.slice)
@@ -18,11 +18,13 @@ from abc import ABCMeta, abstractproperty, abstractmethod
 
 import numpy as np
 from matplotlib.cm import gray
+from matplotlib.patches import Polygon
 from ..external import six
 from ..core.exceptions import IncompatibleAttribute
 from ..core.util import color2rgb, PropertySetMixin, Pointer
 from ..core.subset import Subset
-from .util import view_cascade, get_extent, small_view, small_view_array
+from .util import (view_cascade, get_extent, small_view, small_view_array,
+                   fast_histogram2d, request_redraw)
 from .ds9norm import DS9Normalize
 
 
@@ -321,7 +323,7 @@ class LayerArtist(LayerArtistBase):
         self.artists = []
 
     def redraw(self):
-        self._axes.figure.canvas.draw()
+        request_redraw(self._axes.figure.canvas)
 
     @property
     def visible(self):
@@ -334,22 +336,25 @@ class LayerArtist(LayerArtistBase):
             a.set_visible(value)
 
     def _sync_style(self):
-        style = self.layer.style
         for artist in self.artists:
-            edgecolor = style.color
-            # due to a bug in MPL 1.4.1, we can't disable the edge
-            # without making the whole point disappear. So we make the
-            # edge very thin instead
-            mew = 3 if style.marker == '+' else 0.01
-            artist.set_markeredgecolor(edgecolor)
-            artist.set_markeredgewidth(mew)
-            artist.set_markerfacecolor(style.color)
-            artist.set_marker(style.marker)
-            artist.set_markersize(style.markersize)
-            artist.set_linestyle('None')
-            artist.set_alpha(style.alpha)
-            artist.set_zorder(self.zorder)
-            artist.set_visible(self.visible and self.enabled)
+            self._sync_marker_style(artist)
+
+    def _sync_marker_style(self, artist):
+        style = self.layer.style
+        edgecolor = style.color
+        # due to a bug in MPL 1.4.1, we can't disable the edge
+        # without making the whole point disappear. So we make the
+        # edge very thin instead
+        mew = 3 if style.marker == '+' else 0.01
+        artist.set_markeredgecolor(edgecolor)
+        artist.set_markeredgewidth(mew)
+        artist.set_markerfacecolor(style.color)
+        artist.set_marker(style.marker)
+        artist.set_markersize(style.markersize)
+        artist.set_linestyle('None')
+        artist.set_alpha(style.alpha)
+        artist.set_zorder(self.zorder)
+        artist.set_visible(self.visible and self.enabled)
 
     @property
     def zorder(self):
@@ -679,12 +684,31 @@ class DendroLayerArtist(LayerArtist):
 class ScatterLayerArtist(LayerArtist, ScatterLayerBase):
     xatt = ChangedTrigger()
     yatt = ChangedTrigger()
-    _property_set = LayerArtist._property_set + ['xatt', 'yatt']
+
+    # If more than this many points are visible, render the layer
+    # as a density map instead of individual markers. None disables
+    density_threshold = ChangedTrigger(None)
+
+    _property_set = LayerArtist._property_set + ['xatt', 'yatt',
+                                                 'density_threshold']
+
+    # The average number of points in each cell of the spatial index
+    # used to sample the points inside a view
+    _lod_cell_size = 64
 
     def __init__(self, layer, ax):
         super(ScatterLayerArtist, self).__init__(layer, ax)
         self.emphasis = None  # an optional SubsetState of emphasized points
 
+        # If not None, draw at most this many points, chosen at random
+        # from the points inside the current view
+        self.max_points = None
+
+        self._xy = None  # cache of the raveled (x, y) data
+        self._lod = None  # cache of the spatial sampling index of the points
+        self._density = None  # 2D counts, if rendering a density map
+        self._view_state = None  # the view that the artists were made for
+
     def _recalc(self):
         self.clear()
         assert len(self.artists) == 0
@@ -693,12 +717,226 @@ class ScatterLayerArtist(LayerArtist, ScatterLayerBase):
             x = self.layer[self.xatt].ravel()
             y = self.layer[self.yatt].ravel()
         except IncompatibleAttribute as exc:
+            self._xy = None
+            self._lod = None
             self.disable_invalid_attributes(*exc.args)
             return False
 
-        self.artists = self._axes.plot(x, y)
+        self._xy = x, y
+        self._lod = None
+        self._render()
         return True
 
+    def _current_view(self):
+        """
+        The (xlim, ylim, shape) of the axes, where shape is the
+        screen resolution in pixels
+        """
+        bbox = self._axes.get_window_extent()
+        shape = max(int(bbox.height), 1), max(int(bbox.width), 1)
+        return (tuple(self._axes.get_xlim()), tuple(self._axes.get_ylim()),
+                shape)
+
+    def _use_density(self):
+        """Whether the density map is relevant for the current view"""
+        if self.density_threshold is None or self._xy is None:
+            return False
+        if self._xy[0].size <= self.density_threshold:
+            return False
+        # images don't map onto log axes
+        return (self._axes.get_xscale() == 'linear' and
+                self._axes.get_yscale() == 'linear')
+
+    def _use_sample(self):
+        """Whether only a subsample of the markers should be drawn"""
+        if self.max_points is None or self._xy is None:
+            return False
+        return self._xy[0].size > self.max_points
+
+    def _view_key(self):
+        """
+        A summary of everything about the axes that the rendered
+        artists depend on. None if the artists are view-independent
+        """
+        density, sample = self._use_density(), self._use_sample()
+        if not density and not sample:
+            return None
+        return (density, self.max_points if sample else None,
+                self._current_view())
+
+    def _lod_index(self):
+        """
+        Build (or fetch) the index used to sample points
+
+        Points are sampled in the order of a random permutation, so that
+        the first n points in the permutation are an unbiased sample of
+        size n. The permutation is derived from the one the data cache
+        for each version, rather than sorted for every layer.
+
+        So that a view does not scan the whole permutation, points are
+        also bucketed into a coarse grid of cells, and sorted by cell
+        and then by their rank in the permutation.
+
+        :returns: (index, key, grid). index holds the point indices,
+                  sorted by key = cell * n + rank, where n is the number
+                  of points. grid is (xmin, ymin, xstep, ystep, ncells, n)
+        """
+        if self._lod is not None:
+            return self._lod
+
+        data = self.layer.data
+        order = data._random_order()
+        if self.layer is not data:
+            # keep the subset members, in the data's random order,
+            # and number them by their position in the subset
+            mask = self.layer.to_mask().ravel()
+            local = np.cumsum(mask) - 1
+            order = local[order[mask[order]]]
+
+        n = order.size
+        ncells = int(np.clip(np.sqrt(n / self._lod_cell_size), 1, 256))
+        x, y = self._xy
+        x = np.asarray(x[order], dtype=float)
+        y = np.asarray(y[order], dtype=float)
+        rank = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        if rank.size == 0:
+            grid = (0., 0., 1., 1., ncells, n)
+            self._lod = order[:0], np.zeros(0, dtype=np.int64), grid
+            return self._lod
+
+        x, y = x[rank], y[rank]
+        xmin, ymin = x.min(), y.min()
+        xstep = (x.max() - xmin) / ncells or 1.
+        ystep = (y.max() - ymin) / ncells or 1.
+        ix = np.minimum(((x - xmin) / xstep).astype(np.intp), ncells - 1)
+        iy = np.minimum(((y - ymin) / ystep).astype(np.intp), ncells - 1)
+
+        # a stable sort keeps each cell in permutation order. At most
+        # 2 ** 16 cells fit in 16 bits, which numpy radix-sorts
+        cell = (iy * ncells + ix).astype(np.uint16)
+        srt = np.argsort(cell, kind='mergesort')
+        rank = rank[srt]
+        key = cell[srt].astype(np.int64) * n + rank
+        self._lod = order[rank], key, (xmin, ymin, xstep, ystep, ncells, n)
+        return self._lod
+
+    def _sample(self, limit, pad=0.25):
+        """
+        Return the indices of an unbiased random sample of at most
+        limit points, among those inside the current view.
+
+        Only the cells of the spatial index which overlap the view are
+        read. Within them, points are taken in permutation order, up to
+        a rank which is raised until enough points inside the view have
+        been found.
+
+        :param limit: The maximum number of points
+        :param pad: Fraction by which to enlarge the view on each side,
+                    so that small pans don't reveal empty regions
+        """
+        index, key, (xmin, ymin, xstep, ystep, ncells, n) = self._lod_index()
+        x, y = self._xy
+        x0, x1 = sorted(self._axes.get_xlim())
+        y0, y1 = sorted(self._axes.get_ylim())
+        dx, dy = (x1 - x0) * pad, (y1 - y0) * pad
+        x0, x1, y0, y1 = x0 - dx, x1 + dx, y0 - dy, y1 + dy
+
+        empty = np.zeros(0, dtype=np.intp)
+        if (x1 < xmin or x0 > xmin + xstep * ncells or
+                y1 < ymin or y0 > ymin + ystep * ncells):
+            return empty
+        ix0, ix1, iy0, iy1 = [int(np.clip(np.floor(v), 0, ncells - 1))
+                              for v in ((x0 - xmin) / xstep,
+                                        (x1 - xmin) / xstep,
+                                        (y0 - ymin) / ystep,
+                                        (y1 - ymin) / ystep)]
+        cells = (np.arange(iy0, iy1 + 1)[:, np.newaxis] * ncells +
+                 np.arange(ix0, ix1 + 1)).ravel().astype(np.int64) * n
+
+        start = np.searchsorted(key, cells)
+        ncand = (np.searchsorted(key, cells + n) - start).sum()
+        if ncand == 0:
+            return empty
+
+        # about twice limit candidates have a rank below the threshold
+        threshold = min(n, 2 * limit * n // ncand + 1)
+        while True:
+            stop = np.searchsorted(key, cells + threshold)
+            counts = stop - start
+            pos = (np.repeat(start - np.cumsum(counts) + counts, counts) +
+                   np.arange(counts.sum()))
+            xi, yi = x[index[pos]], y[index[pos]]
+            pos = pos[(xi >= x0) & (xi <= x1) & (yi >= y0) & (yi <= y1)]
+            if pos.size >= limit or threshold >= n:
+                break
+            threshold = min(n, threshold * 4)
+
+        if pos.size > limit:
+            # the first limit points, in permutation order
+            pos = pos[np.argpartition(key[pos] % n, limit - 1)[:limit]]
+        return np.sort(index[pos])
+
+    def _render(self):
+        """
+        Create the artist for the cached data, as either a marker
+        plot or a density map
+        """
+        self.clear()
+        x, y = self._xy
+        self._view_state = self._view_key()
+
+        if self._use_density():
+            xlim, ylim, shape = self._current_view()
+            counts = fast_histogram2d(x, y, xlim, ylim, shape)
+
+            # zoomed in far enough to show individual points
+            if counts.sum() > self.density_threshold:
+                self._density = counts
+                extent = (min(xlim), max(xlim), min(ylim), max(ylim))
+                self.artists = [self._axes.imshow(self._density_rgba(),
+                                                  extent=extent,
+                                                  origin='lower',
+                                                  aspect='auto',
+                                                  interpolation='nearest')]
+                return
+
+        if self._use_sample():
+            idx = self._sample(self.max_points)
+            x, y = x[idx], y[idx]
+
+        self.artists = self._axes.plot(x, y)
+
+    def view_outdated(self):
+        """
+        Whether the axes have changed in a way that requires
+        re-rendering (e.g. re-binning a density map, or re-sampling
+        the points to draw)
+        """
+        if self._xy is None:
+            return False
+        return self._view_key() != self._view_state
+
+    def _density_rgba(self):
+        """
+        Convert the density map into an RGBA image in the layer color.
+        Empty bins are transparent, so subsets render as masked densities
+        """
+        counts = self._density
+        r, g, b = color2rgb(self.layer.style.color)
+        alpha = np.log1p(counts.astype(float))
+        amax = alpha.max()
+        if amax > 0:
+            alpha /= amax
+        # keep sparse bins visible
+        alpha = np.where(counts > 0, 0.2 + 0.8 * alpha, 0)
+
+        result = np.empty(counts.shape + (4,), dtype=float)
+        result[..., 0] = r
+        result[..., 1] = g
+        result[..., 2] = b
+        result[..., 3] = alpha * self.layer.style.alpha
+        return result
+
     def update(self, view=None, transpose=False):
         self._check_subset_state_changed()
 
@@ -706,6 +944,8 @@ class ScatterLayerArtist(LayerArtist, ScatterLayerBase):
             if not self._recalc():  # no need to update style
                 return
             self._changed = False
+        elif self.view_outdated():
+            self._render()
 
         has_emph = False
         if self.emphasis is not None:
@@ -727,6 +967,21 @@ class ScatterLayerArtist(LayerArtist, ScatterLayerBase):
             self.artists[-1].set_mew(2)
             self.artists[-1].set_alpha(1)
 
+    def _sync_style(self):
+        artists = self.artists
+        if self._density is not None and len(artists) > 0:
+            image, artists = artists[0], artists[1:]
+            image.set_data(self._density_rgba())
+            image.set_zorder(self.zorder)
+            image.set_visible(self.visible and self.enabled)
+
+        for artist in artists:
+            self._sync_marker_style(artist)
+
+    def clear(self):
+        super(ScatterLayerArtist, self).clear()
+        self._density = None
+
     def get_data(self):
         try:
             return self.layer[self.xatt].ravel(), self.layer[self.yatt].ravel()
@@ -854,30 +1109,35 @@ class HistogramLayerArtist(LayerArtist, HistogramLayerBase):
         self._y = np.array([])
 
     def _calculate_histogram(self):
-        """Recalculate the histogram, creating new patches"""
-        self.clear()
+        """Recalculate the bin counts, and update or create the patch"""
+        if self.xlog:
+            rng = [np.log10(self.lo), np.log10(self.hi)]
+        else:
+            rng = self.lo, self.hi
+
+        # counts are computed and cached by the parent data,
+        # and shared with other subsets and viewers
+        subset = self.layer if isinstance(self.layer, Subset) else None
         try:
-            data = self.layer[self.att].ravel()
-            if not np.isfinite(data).any():
-                return False
+            counts = self.layer.data.compute_histogram(self.att,
+                                                       rng[0], rng[1],
+                                                       self.nbins,
+                                                       log=self.xlog,
+                                                       subset=subset)
         except IncompatibleAttribute as exc:
             self.disable_invalid_attributes(*exc.args)
             return False
 
-        if data.size == 0:
-            return
+        if counts.sum() == 0:  # empty, or out of range
+            self.clear()
+            return False
 
-        if self.lo > np.nanmax(data) or self.hi < np.nanmin(data):
-            return
-        if self.xlog:
-            data = np.log10(data)
-            rng = [np.log10(self.lo), np.log10(self.hi)]
-        else:
-            rng = self.lo, self.hi
-        nbinpatch = self._axes.hist(data,
-                                    bins=self.nbins,
-                                    range=rng)
-        self._y, self.x, self.artists = nbinpatch
+        self._y = counts
+        self.x = np.linspace(rng[0], rng[1], int(self.nbins) + 1)
+
+        if len(self.artists) == 0:
+            patch = Polygon(np.zeros((0, 2)), closed=True)
+            self.artists = [self._axes.add_patch(patch)]
         return True
 
     def _scale_histogram(self):
@@ -899,10 +1159,13 @@ class HistogramLayerArtist(LayerArtist, HistogramLayerBase):
         self.y = y
         bottom = 0 if not self.ylog else 1e-100
 
-        for a, y in zip(self.artists, y):
-            a.set_height(y)
-            x, y = a.get_xy()
-            a.set_xy((x, bottom))
+        # a single step outline, closed along the bottom
+        xy = np.empty((2 * self.x.size, 2))
+        xy[:, 0] = np.repeat(self.x, 2)
+        xy[0, 1] = xy[-1, 1] = bottom
+        xy[1:-1, 1] = np.repeat(y, 2)
+        for a in self.artists:
+            a.set_xy(xy)
 
     def _check_scale_histogram(self):
         """
@@ -935,6 +1198,7 @@ class HistogramLayerArtist(LayerArtist, HistogramLayerBase):
         style = self.layer.style
         for artist in self.artists:
             artist.set_facecolor(style.color)
+            artist.set_edgecolor('none')
             artist.set_alpha(style.alpha)
             artist.set_zorder(self.zorder)
             artist.set_visible(self.visible and self.enabled)
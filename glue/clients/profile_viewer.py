@@ -2,6 +2,7 @@ import numpy as np
 from matplotlib.transforms import blended_transform_factory
 
 from ..core.callback_property import CallbackProperty, add_callback
+from .util import request_redraw
 
 
 PICK_THRESH = 30  # pixel distance threshold for picking
@@ -60,13 +61,13 @@ class Grip(object):
         self.enabled = False
         if self.artist is not None:
             self.artist.set_visible(False)
-            self.viewer.axes.figure.canvas.draw()
+            request_redraw(self.viewer.axes.figure.canvas)
 
     def enable(self):
         self.enabled = True
         if self.artist is not None:
             self.artist.set_visible(True)
-            self.viewer.axes.figure.canvas.draw()
+            request_redraw(self.viewer.axes.figure.canvas)
 
 
 class ValueGrip(Grip):
@@ -198,7 +199,7 @@ class ValueArtist(object):
 
     def _update(self, value):
         self._line.set_xdata([value, value])
-        self._line.axes.figure.canvas.draw()
+        request_redraw(self._line.axes.figure.canvas)
 
     def set_visible(self, visible):
         self._line.set_visible(visible)
@@ -228,7 +229,7 @@ class RangeArtist(object):
 
     def _update(self, rng):
         self._line.set_xdata(self.x)
-        self._line.axes.figure.canvas.draw()
+        request_redraw(self._line.axes.figure.canvas)
 
     def set_visible(self, visible):
         self._line.set_visible(visible)
@@ -389,7 +390,7 @@ class ProfileViewer(object):
         self.active_grip.drag(event.xdata, event.ydata)
 
     def _redraw(self):
-        self.axes.figure.canvas.draw()
+        request_redraw(self.axes.figure.canvas)
 
     def profile_data(self, xlim=None):
         if self._x is None or self._y is None:
@@ -13,7 +13,7 @@ from ..core.edit_subset_mode import EditSubsetMode
 from ..core.message import ComponentReplacedMessage
 from .viz_client import init_mpl
 from .layer_artist import ScatterLayerArtist, LayerArtistContainer
-from .util import visible_limits, update_ticks
+from .util import visible_limits, update_ticks, request_redraw
 from ..core.callback_property import (CallbackProperty, add_callback,
                                       delay_callback)
 
@@ -35,6 +35,12 @@ class ScatterClient(Client):
     yatt = CallbackProperty()
     jitter = CallbackProperty()
 
+    # layers with more visible points than this are drawn as density maps
+    density_threshold = CallbackProperty(100000)
+
+    # max number of points per layer to draw during interactive updates
+    interactive_points = CallbackProperty(20000)
+
     def __init__(self, data=None, figure=None, axes=None,
                  artist_container=None):
         """
@@ -56,6 +62,7 @@ class ScatterClient(Client):
             self.artists = LayerArtistContainer()
 
         self._layer_updated = False  # debugging
+        self._max_points = None  # current per-layer point budget
         self._xset = False
         self._yset = False
         self.axes = axes
@@ -93,6 +100,7 @@ class ScatterClient(Client):
         add_callback(self, 'xatt', partial(self._set_xydata, 'x'))
         add_callback(self, 'yatt', partial(self._set_xydata, 'y'))
         add_callback(self, 'jitter', self._jitter)
+        add_callback(self, 'density_threshold', self._set_density_threshold)
         self.axes.figure.canvas.mpl_connect('draw_event',
                                             lambda x: self._pull_properties())
 
@@ -109,9 +117,75 @@ class ScatterClient(Client):
         yold = self.axes.get_ylim()
         self.axes.set_xlim(xlim)
         self.axes.set_ylim(ylim)
-        if xlim != xold or ylim != yold:
+        rerendered = self._update_view_dependent()
+        if xlim != xold or ylim != yold or rerendered:
             self._redraw()
 
+    def _update_view_dependent(self):
+        """
+        Re-render any layers whose appearance depends on the view
+        (density maps, or subsampled points), after the view has changed.
+
+        Returns True if any layer was re-rendered
+        """
+        result = False
+        for art in self.artists:
+            if art.view_outdated():
+                art.update()
+                result = True
+        return result
+
+    def _set_max_points(self, limit):
+        self._max_points = limit
+        for art in self.artists:
+            art.max_points = limit
+        self._update_view_dependent()
+
+    def begin_interaction(self):
+        """
+        Start an interactive update (e.g., a pan/zoom drag).
+
+        Until :meth:`end_interaction` is called (or :meth:`refine` reaches
+        full resolution), each layer draws at most ``interactive_points``
+        points, sampled at random from the points inside the current view.
+        """
+        self._set_max_points(self.interactive_points)
+
+    def end_interaction(self):
+        """
+        Finish an interactive update, and immediately restore
+        full resolution.
+
+        Use :meth:`refine` instead to restore full resolution
+        progressively.
+        """
+        if self._max_points is None:
+            return
+        self._set_max_points(None)
+        self._redraw()
+
+    def refine(self):
+        """
+        Increase the number of points drawn after an interactive update,
+        progressively restoring full resolution.
+
+        Returns True if further calls to refine will draw more points
+        """
+        if self._max_points is None:
+            return False
+
+        limit = self._max_points * 4
+        if all(a._xy is None or a._xy[0].size <= limit
+               for a in self.artists):
+            limit = None
+
+        self._set_max_points(limit)
+        self._redraw()
+        return limit is not None
+
+    def _set_density_threshold(self, value):
+        list(map(self._update_layer, self.artists.layers))
+
     def plottable_attributes(self, layer, show_hidden=False):
         data = layer.data
         comp = data.components if show_hidden else data.visible_components
@@ -285,6 +359,7 @@ class ScatterClient(Client):
         if state and min(lim) <= 0:
             self._snap_xlim()
 
+        self._update_view_dependent()
         self._redraw()
 
     def _set_ylog(self, state):
@@ -300,6 +375,7 @@ class ScatterClient(Client):
         if state and min(lim) <= 0:
             self._snap_ylim()
 
+        self._update_view_dependent()
         self._redraw()
 
     def _remove_data(self, message):
@@ -329,7 +405,7 @@ class ScatterClient(Client):
             self._update_layer(s, force=True)
 
     def _redraw(self):
-        self.axes.figure.canvas.draw()
+        request_redraw(self.axes.figure.canvas)
 
     def _jitter(self, *args):
 
@@ -432,6 +508,8 @@ class ScatterClient(Client):
         for art in self.artists[layer]:
             art.xatt = self.xatt
             art.yatt = self.yatt
+            art.density_threshold = self.density_threshold
+            art.max_points = self._max_points
             art.force_update() if force else art.update()
         self._redraw()
 
@@ -3,7 +3,7 @@ import numpy as np
 from numpy.testing import assert_array_equal
 from mock import MagicMock
 
-from ..dendro_client import DendroClient
+from ..dendro_client import DendroClient, DendroTree
 from .util import renderless_figure
 
 from ...core import Data, Subset, DataCollection, Hub
@@ -158,3 +158,52 @@ class TestDendroClient():
         l = self.client._layout
         self.client.order_attr = self.data.id['parent']
         assert self.client._layout is not l
+
+    def test_tree_cached(self):
+        self.client.add_layer(self.data)
+        tree = self.client._tree
+        self.client.height_attr = self.data.id['parent']
+        assert self.client._tree is tree
+
+        self.client.order_attr = self.data.id['parent']
+        assert self.client._tree is not tree
+
+    def test_parent_cycle(self):
+        self.client.add_layer(self.data)
+        self.client.parent_attr = self.data.id['height']
+        assert_array_equal(self.client._layout[0, ::3], -1)
+
+
+class TestDendroTree(object):
+
+    def setup_method(self, method):
+        #        6
+        #     /  |  \
+        #    4   2   5     7
+        #   / \      |
+        #  0   3     1
+        self.parent = np.array([4, 5, 6, 4, 6, 6, -1, -1])
+        self.tree = DendroTree(self.parent)
+
+    def test_children(self):
+        t = self.tree
+        children = [list(t.children[t.offsets[i]:t.offsets[i + 1]])
+                    for i in range(8)]
+        assert children == [[], [], [], [], [0, 3], [1], [2, 4, 5], []]
+        assert_array_equal(t.trunks, [6, 7])
+        assert_array_equal(t.depth, [2, 2, 1, 2, 1, 1, 0, 0])
+
+    def test_order(self):
+        assert_array_equal(self.tree.order, [6, 2, 4, 0, 3, 5, 1, 7])
+        assert_array_equal(self.tree.postfix(), [2, 0, 3, 4, 1, 5, 6, 7])
+        assert_array_equal(self.tree.substructures(4), [4, 0, 3])
+        assert_array_equal(self.tree.substructures(6), [6, 2, 4, 0, 3, 5, 1])
+        assert_array_equal(self.tree.substructures(7), [7])
+
+    def test_key(self):
+        tree = DendroTree(self.parent, key=-np.arange(8))
+        assert_array_equal(tree.order, [7, 6, 5, 1, 4, 3, 0, 2])
+
+    def test_positions(self):
+        assert_array_equal(self.tree.positions(),
+                           [1, 3, 0, 2, 1.5, 3, 1.5, 4])
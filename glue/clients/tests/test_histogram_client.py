@@ -3,6 +3,7 @@
 from __future__ import absolute_import, division, print_function
 
 import pytest
+import numpy as np
 
 from mock import MagicMock
 
@@ -619,3 +620,48 @@ class TestHistogramLayerArtist(object):
         self.artist.update()
         self.artist.update()
         assert ct.call_count == 9
+
+    def setup_rendered(self):
+        ax = FIGURE.add_subplot(111)
+        self.data = Data(x=[1, 2, 2, 3, 3, 3])
+        self.artist = HistogramLayerArtist(self.data, ax)
+        self.artist.att = self.data.id['x']
+        self.artist.lo = 1
+        self.artist.hi = 4
+        self.artist.nbins = 3
+        self.artist.update()
+
+    def test_counts(self):
+        self.setup_rendered()
+        np.testing.assert_array_equal(self.artist.y, [1, 2, 3])
+        np.testing.assert_array_equal(self.artist.x, [1, 2, 3, 4])
+
+    def test_single_patch_updated_in_place(self):
+        self.setup_rendered()
+        assert len(self.artist.artists) == 1
+        patch = self.artist.artists[0]
+
+        self.artist.nbins = 6
+        self.artist.update()
+        assert self.artist.artists == [patch]
+        assert np.unique(patch.get_xy()[:, 0]).size == 7
+
+    def test_rebin_does_not_reread_data(self):
+        self.setup_rendered()
+        data = self.artist.layer.data
+        cache = data._histogram_cache(self.artist.att)
+
+        self.artist.lo = 0
+        self.artist.nbins = 8
+        self.artist.update()
+        assert data._histogram_cache(self.artist.att) is cache
+
+    def test_data_update_rereads_data(self):
+        self.setup_rendered()
+        data = self.artist.layer.data
+        cache = data._histogram_cache(self.artist.att)
+        data.update_components({data.id['x']: np.array([1, 1, 1, 1, 1, 3])})
+        assert data._histogram_cache(self.artist.att) is not cache
+
+        self.artist.force_update()
+        np.testing.assert_array_equal(self.artist._y, [5, 0, 1])
@@ -1,3 +1,8 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+from matplotlib.image import AxesImage
+from matplotlib.lines import Line2D
+
 from .util import renderless_figure
 from ..layer_artist import ScatterLayerArtist
 from ...core import Data
@@ -19,3 +24,140 @@ class TestScatterArtist(object):
         s.emphasis = d.id['x'] > 1
 
         s.update()
+
+    def test_density_above_threshold(self):
+        d = Data(x=np.arange(100.), y=np.arange(100.))
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.density_threshold = 10
+        self.ax.set_xlim(0, 100)
+        self.ax.set_ylim(0, 100)
+        s.update()
+
+        assert s._density is not None
+        assert s._density.sum() == 100
+        assert isinstance(s.artists[0], AxesImage)
+
+    def test_markers_below_threshold(self):
+        d = Data(x=np.arange(100.), y=np.arange(100.))
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.density_threshold = 1000
+        s.update()
+
+        assert s._density is None
+        assert isinstance(s.artists[0], Line2D)
+
+    def test_markers_when_zoomed_in(self):
+        d = Data(x=np.arange(100.), y=np.arange(100.))
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.density_threshold = 10
+        self.ax.set_xlim(0, 100)
+        self.ax.set_ylim(0, 100)
+        s.update()
+        assert s._density is not None
+
+        self.ax.set_xlim(0, 5)
+        self.ax.set_ylim(0, 5)
+        assert s.view_outdated()
+        s.update()
+        assert s._density is None
+        assert isinstance(s.artists[0], Line2D)
+
+        self.ax.set_xlim(0, 100)
+        self.ax.set_ylim(0, 100)
+        s.update()
+        assert s._density is not None
+
+    def test_max_points_samples_visible(self):
+        d = Data(x=np.arange(1000.), y=np.arange(1000.))
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.max_points = 50
+        self.ax.set_xlim(0, 1000)
+        self.ax.set_ylim(0, 1000)
+        s.update()
+
+        x, y = s.artists[0].get_data()
+        assert x.size == 50
+        assert np.unique(x).size == 50
+
+        # only sample points near the view
+        self.ax.set_xlim(0, 100)
+        self.ax.set_ylim(0, 100)
+        assert s.view_outdated()
+        s.update()
+        x, y = s.artists[0].get_data()
+        assert x.size == 50
+        assert x.max() <= 125
+
+    def test_sample_prefix_is_nested(self):
+        d = Data(x=np.arange(1000.), y=np.arange(1000.))
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        self.ax.set_xlim(0, 1000)
+        self.ax.set_ylim(0, 1000)
+        s.update()
+
+        small = s._sample(20)
+        large = s._sample(200)
+        assert set(small) <= set(large)
+
+    def test_sample_reads_cells_in_view(self):
+        d = Data(x=np.arange(10000.), y=np.arange(10000.))
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.update()
+
+        # fewer points than the limit in view: all of them are drawn
+        self.ax.set_xlim(100, 120)
+        self.ax.set_ylim(100, 120)
+        assert_array_equal(s._sample(50), np.arange(95, 126))
+
+        # otherwise, the first in-view points of the random order
+        self.ax.set_xlim(0, 5000)
+        self.ax.set_ylim(0, 5000)
+        order = d._random_order()
+        expected = order[order <= 6250][:50]
+        assert_array_equal(s._sample(50), np.sort(expected))
+
+    def test_sample_order_shared_per_version(self):
+        d = Data(x=np.arange(1000.), y=np.arange(1000.))
+        order = d._random_order()
+        assert d._random_order() is order
+        d.update_components({d.id['x']: np.arange(1000.) + 1})
+        assert d._random_order() is not order
+
+    def test_subset_sample_inside_subset(self):
+        d = Data(x=np.arange(1000.), y=np.arange(1000.))
+        sub = d.new_subset()
+        sub.subset_state = d.id['x'] > 499
+        s = ScatterLayerArtist(sub, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.max_points = 50
+        self.ax.set_xlim(0, 1000)
+        self.ax.set_ylim(0, 1000)
+        s.update()
+
+        x, y = s.artists[0].get_data()
+        assert x.size == 50
+        assert np.unique(x).size == 50
+        assert x.min() > 499
+
+    def test_max_points_ignored_for_small_layers(self):
+        d = Data(x=[1, 2, 3], y=[2, 3, 4])
+        s = ScatterLayerArtist(d, self.ax)
+        s.xatt = d.id['x']
+        s.yatt = d.id['y']
+        s.max_points = 50
+        s.update()
+        assert s.artists[0].get_data()[0].size == 3
+        assert not s.view_outdated()
@@ -586,6 +586,50 @@ class TestScatterClient(object):
         data.update_id(self.client.xatt, test)
         assert self.client.xatt is test
 
+    def test_density_threshold_propagates(self):
+        layer = self.setup_2d_data()
+        self.client.density_threshold = 2
+        art = self.client.artists[layer][0]
+        assert art.density_threshold == 2
+        assert art._density is not None
+
+        self.client.density_threshold = None
+        assert art._density is None
+
+    def test_density_rebinned_on_zoom(self):
+        layer = self.setup_2d_data()
+        self.client.density_threshold = 2
+        art = self.client.artists[layer][0]
+        state = art._view_state
+
+        self.client.xmax = self.client.xmax * 2
+        assert art._view_state != state
+        assert art._view_state[2][0] == self.client.axes.get_xlim()
+
+    def test_interaction_limits_points(self):
+        layer = self.setup_2d_data()
+        self.client.interactive_points = 2
+        art = self.client.artists[layer][0]
+
+        self.client.begin_interaction()
+        assert art.max_points == 2
+        assert art.artists[0].get_data()[0].size == 2
+
+        assert not self.client.refine()
+        assert art.max_points is None
+        assert art.artists[0].get_data()[0].size == 4
+
+    def test_end_interaction_restores_points(self):
+        layer = self.setup_2d_data()
+        self.client.interactive_points = 1
+        art = self.client.artists[layer][0]
+
+        self.client.begin_interaction()
+        assert art.artists[0].get_data()[0].size == 1
+        self.client.end_interaction()
+        assert art.max_points is None
+        assert art.artists[0].get_data()[0].size == 4
+
 
 class TestCategoricalScatterClient(TestScatterClient):
 
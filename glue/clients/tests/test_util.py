@@ -1,7 +1,8 @@
 import numpy as np
 from numpy.testing import assert_allclose
+from mock import MagicMock
 
-from ..util import fast_limits
+from ..util import fast_limits, fast_histogram2d, RedrawScheduler
 
 
 def test_fast_limits_nans():
@@ -12,3 +13,85 @@ def test_fast_limits_nans():
 def test_single_value():
     x = np.array([1])
     assert_allclose(fast_limits(x, 5., 95.), [1, 1])
+
+
+def test_fast_histogram2d():
+    x = np.array([0.5, 1.5, 1.5, np.nan, 5])
+    y = np.array([0.5, 0.5, 1.5, 0.5, 0.5])
+    result = fast_histogram2d(x, y, (0, 2), (0, 2), (2, 2))
+    assert_allclose(result, [[1, 1], [0, 1]])
+
+
+def test_fast_histogram2d_matches_numpy():
+    x = np.random.normal(size=1000)
+    y = np.random.normal(size=1000)
+    result = fast_histogram2d(x, y, (-1, 1), (-2, 2), (5, 3))
+    expected = np.histogram2d(y, x, bins=(5, 3), range=[(-2, 2), (-1, 1)])[0]
+    assert_allclose(result, expected)
+
+
+class TestRedrawScheduler(object):
+
+    def setup_method(self, method):
+        self.scheduler = RedrawScheduler()
+        self.timers = []
+        self.canvas = MagicMock()
+
+    def single_shot(self, msec, callback):
+        self.timers.append((msec, callback))
+
+    def fire(self):
+        msec, callback = self.timers.pop(0)
+        callback()
+
+    def test_immediate_by_default(self):
+        self.scheduler.request(self.canvas)
+        self.scheduler.request(self.canvas)
+        assert self.canvas.draw.call_count == 2
+
+    def test_coalesce(self):
+        self.scheduler.install(self.single_shot)
+        other = MagicMock()
+        for i in range(5):
+            self.scheduler.request(self.canvas)
+            self.scheduler.request(other)
+
+        assert self.canvas.draw.call_count == 0
+        assert len(self.timers) == 1
+
+        self.fire()
+        assert self.canvas.draw.call_count == 1
+        assert other.draw.call_count == 1
+        assert len(self.timers) == 0
+
+    def test_throttle(self):
+        self.scheduler.install(self.single_shot)
+        self.scheduler.FRAME_INTERVAL = 100
+        self.scheduler.request(self.canvas)
+        self.fire()
+        assert self.canvas.draw.call_count == 1
+
+        # drawn too recently
+        self.scheduler.request(self.canvas)
+        msec, _ = self.timers[0]
+        assert msec > 90000
+        self.fire()
+        assert self.canvas.draw.call_count == 1
+        assert len(self.timers) == 1
+
+        self.scheduler.flush()
+        assert self.canvas.draw.call_count == 2
+
+    def test_slow_draws_throttled(self):
+        self.scheduler._cost[self.canvas] = 10
+        assert self.scheduler.interval(self.canvas) == 10 / self.scheduler.LOAD
+
+    def test_cost_measured(self):
+        self.scheduler.draw(self.canvas)
+        assert self.canvas in self.scheduler._cost
+
+    def test_uninstall_flushes(self):
+        self.scheduler.install(self.single_shot)
+        self.scheduler.request(self.canvas)
+        self.scheduler.install(None)
+        assert self.canvas.draw.call_count == 1
@@ -2,6 +2,8 @@ from __future__ import absolute_import, division, print_function
 
 import logging
 from functools import partial, wraps
+from time import time
+from weakref import WeakKeyDictionary
 
 import numpy as np
 from matplotlib.ticker import AutoLocator, MaxNLocator, LogLocator
@@ -95,6 +97,37 @@ def fast_limits(data, plo, phi):
     return lo, hi
 
 
+def fast_histogram2d(x, y, xlim, ylim, shape):
+    """Bin points into a regular 2D grid, using a single bincount
+
+    :param x: array-like of x coordinates
+    :param y: array-like of y coordinates
+    :param xlim: (lo, hi) x range covered by the grid
+    :param ylim: (lo, hi) y range covered by the grid
+    :param shape: (ny, nx) number of bins along each axis
+
+    Points outside the grid, or with non-finite coordinates, are ignored.
+
+    :rtype: Integer array of the given shape. Row i counts points
+            in the i'th y bin (counting up from ylim[0])
+    """
+    ny, nx = shape
+    x0, x1 = min(xlim), max(xlim)
+    y0, y1 = min(ylim), max(ylim)
+    if x1 <= x0 or y1 <= y0 or nx < 1 or ny < 1:
+        return np.zeros((max(ny, 0), max(nx, 0)), dtype=int)
+
+    x = np.asarray(x).ravel()
+    y = np.asarray(y).ravel()
+    ix = np.floor((x - x0) * (nx / (x1 - x0)))
+    iy = np.floor((y - y0) * (ny / (y1 - y0)))
+
+    # NaNs fail every comparison, so are dropped here as well
+    keep = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    idx = iy[keep].astype(np.intp) * nx + ix[keep].astype(np.intp)
+    return np.bincount(idx, minlength=nx * ny).reshape(ny, nx)
+
+
 def visible_limits(artists, axis):
     """Determines the data limits for the data in a set of artists
 
@@ -238,3 +271,137 @@ def defer_draw(func):
 
     wrapper._is_deferred = True
     return wrapper
+
+
+class RedrawScheduler(object):
+
+    """
+    Coalesces redraw requests from every client into at most one
+    draw per canvas per frame.
+
+    By default, requests are drawn immediately. Once an event loop
+    is available, pass its single-shot timer function to :meth:`install`:
+    requests are then batched, and each canvas is drawn at most once per
+    :attr:`FRAME_INTERVAL`. The time spent drawing each canvas is also
+    measured, and slow canvases are throttled further so that no canvas
+    spends more than :attr:`LOAD` of the time drawing.
+    """
+
+    FRAME_INTERVAL = 1. / 30  # minimum seconds between draws of a canvas
+    LOAD = 0.5  # maximum fraction of time spent drawing a canvas
+    SMOOTHING = 0.3  # weight of the latest draw when updating the cost
+
+    def __init__(self):
+        self._single_shot = None
+        self._scheduled = False
+        self._pending = []  # canvases awaiting a draw, in request order
+        self._cost = WeakKeyDictionary()  # canvas -> smoothed draw time
+        self._last_draw = WeakKeyDictionary()  # canvas -> time of last draw
+
+    def install(self, single_shot):
+        """
+        Batch redraws, using an event loop timer
+
+        :param single_shot: A function with the signature
+                            single_shot(msec, callback), which invokes
+                            callback once after msec milliseconds
+                            (e.g. QTimer.singleShot). If None, redraw
+                            requests are drawn immediately.
+        """
+        self._single_shot = single_shot
+        if single_shot is None:
+            self.flush()
+        else:
+            self._schedule()
+
+    @property
+    def immediate(self):
+        """Whether requests are drawn immediately"""
+        return self._single_shot is None
+
+    def request(self, canvas):
+        """
+        Ask for a canvas to be redrawn
+
+        :param canvas: A matplotlib FigureCanvas
+        """
+        if self.immediate:
+            self.draw(canvas)
+            return
+        if canvas not in self._pending:
+            self._pending.append(canvas)
+        self._schedule()
+
+    def cost(self, canvas):
+        """The smoothed time it takes to draw a canvas, in seconds"""
+        return self._cost.get(canvas, 0)
+
+    def interval(self, canvas):
+        """The minimum time between draws of a canvas, in seconds"""
+        return max(self.FRAME_INTERVAL, self.cost(canvas) / self.LOAD)
+
+    def _due(self, canvas):
+        last = self._last_draw.get(canvas)
+        if last is None:
+            return 0
+        return last + self.interval(canvas)
+
+    def _schedule(self):
+        if self._scheduled or not self._pending or self.immediate:
+            return
+        wait = min(self._due(c) for c in self._pending) - time()
+        self._scheduled = True
+        self._single_shot(max(int(wait * 1000), 0), self._on_timer)
+
+    def _on_timer(self):
+        self._scheduled = False
+        self.flush(force=False)
+        self._schedule()
+
+    def flush(self, force=True):
+        """
+        Draw pending canvases
+
+        :param force: If False, only draw canvases which have not been
+                      drawn within their throttling interval
+        """
+        now = time()
+        pending, self._pending = self._pending, []
+        for canvas in pending:
+            if not force and self._due(canvas) > now:
+                self._pending.append(canvas)
+                continue
+            try:
+                self.draw(canvas)
+            except RuntimeError:  # underlying widget was deleted
+                logging.getLogger(__name__).debug("Could not draw %s",
+                                                  canvas)
+
+    def draw(self, canvas):
+        """Draw a canvas now, and record how long it took"""
+        if canvas in self._pending:
+            self._pending.remove(canvas)
+
+        start = time()
+        canvas.draw()
+        end = time()
+
+        cost = end - start
+        old = self._cost.get(canvas)
+        if old is not None:
+            cost = old + self.SMOOTHING * (cost - old)
+        self._cost[canvas] = cost
+        self._last_draw[canvas] = end
+
+
+#: The scheduler shared by all matplotlib clients
+redraw_scheduler = RedrawScheduler()
+
+
+def request_redraw(canvas):
+    """
+    Redraw a canvas, via the shared :class:`RedrawScheduler`
+
+    :param canvas: A matplotlib FigureCanvas
+    """
+    redraw_scheduler.request(canvas)
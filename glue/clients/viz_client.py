@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 from ..core.client import Client
 from ..core import Data
 from .layer_artist import LayerArtistContainer
+from .util import request_redraw
 
 
 class VizClient(Client):
@@ -199,7 +200,7 @@ class GenericMplClient(Client):
         return self.data
 
     def _redraw(self):
-        self.axes.figure.canvas.draw()
+        request_redraw(self.axes.figure.canvas)
 
     def new_layer_artist(self, layer):
         raise NotImplementedError
@@ -15,7 +15,8 @@ __all__ = ['Registry', 'SettingRegistry', 'ExporterRegistry',
            'ProfileFitterRegistry',
            'qt_client', 'data_factory', 'link_function', 'link_helper',
            'colormaps',
-           'exporters', 'settings', 'fit_plugin', 'auto_refresh']
+           'exporters', 'settings', 'fit_plugin', 'auto_refresh',
+           'cache_tables', 'lazy_restore']
 
 
 class Registry(object):
@@ -369,6 +370,15 @@ tool_registry = ToolRegistry()
 
 # watch loaded data files for changes?
 auto_refresh = BooleanSetting(False)
+
+# keep a binary copy of parsed tables, to speed up re-loading?
+# The copies are stored under ~/.glue/cache/tables, and are not
+# cleaned up automatically
+cache_tables = BooleanSetting(False)
+
+# when restoring sessions, defer reading data files and
+# building viewers in hidden tabs until they are needed?
+lazy_restore = BooleanSetting(False)
 enable_contracts = BooleanSetting(False)
 
 
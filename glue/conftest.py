@@ -4,6 +4,10 @@ def pytest_addoption(parser):
 
 
 def pytest_configure(config):
+    # don't write parsed test files into the user's table cache
+    from .config import cache_tables
+    cache_tables(False)
+
     if config.getoption('no_optional_skip'):
         from .tests import helpers
         for attr in helpers.__dict__:
@@ -1,15 +1,38 @@
 """
 Classes to perform aggregations over cubes
-"""
-try:
-    from itertools import izip
-except ImportError:  # python3
-    izip = zip
 
+Cubes are collapsed in tiles: each tile spans the full depth of the slab
+being collapsed, but only a block of the 2D output image. Tiles are read
+and reduced independently, on a thread pool (numpy releases the GIL in
+its reductions), so peak memory is bounded by the tile size rather than
+the size of the slab.
+
+Each tile holds at most ``max(tile_size, depth)`` elements, where depth
+is the number of planes being collapsed (a tile is at least one pixel
+wide). Up to ``workers`` tiles are reduced at once, so the tiles in
+memory at any time take up to about
+``workers * max(tile_size, depth) * itemsize`` bytes, plus the
+temporaries of the reduction itself, and, for HDF5 data, the one
+chunk-aligned block cached by each
+:class:`~glue.core.io.HDF5DatasetSource`. Lower
+:attr:`Aggregate.tile_size` or ``workers`` to reduce this.
+
+When the world coordinate along the collapsed axis does not depend on
+the position within each plane (see
+:meth:`~glue.core.coordinates.Coordinates.dependent_axes`), it is
+looked up from a 1D table of the coordinate of each plane, instead of
+being computed for every element.
+"""
 from functools import wraps
+from threading import Lock
+from tempfile import TemporaryFile
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 from ..external.six.moves import range as xrange
+from .odict import OrderedDict
+from .util import broadcast_to
 
 
 def check_empty(func):
@@ -30,7 +53,11 @@ class Aggregate(object):
     aggregation methods
     """
 
-    def __init__(self, data, attribute, zax, slc, zlim):
+    #: The maximum number of cube elements read into each tile
+    tile_size = 2 ** 22
+
+    def __init__(self, data, attribute, zax, slc, zlim, workers=None,
+                 cache=None, products=None):
         """
         :param data: :class:`~glue.core.data.Data` object
         :param attribute: :class:`~glue.core.data.ComponentID`
@@ -41,12 +68,45 @@ class Aggregate(object):
                     for remaining dimensions of >3D cubes
         :param zlim: tuple of [lo, hi), describing the limits
                      of the slab to collapse over
+        :param workers: Number of threads used to reduce tiles.
+                        Defaults to the number of CPUs
+        :param cache: Optional :class:`CumulativeCube`. If it has been
+                      built for this slice, sum, mean and mom1 are
+                      computed from it, instead of from the data
+        :param products: Optional :class:`CubeProducts`. If it has
+                         computed the products of this slab, sum, max,
+                         argmax, mom1 and mom2 are taken from it
         """
         self.data = data
         self.attribute = attribute
         self.zax = zax
         self.slc = slc
         self.zlim = min(zlim), max(zlim)
+        self.workers = workers
+        self.cache = cache
+        self.products = products
+        self._world_table = None
+
+    def _cached(self, *names):
+        """
+        Totals from the cumulative cache, or None if it is
+        not usable for this aggregation
+        """
+        if self.cache is None or not self.cache.matches(self):
+            return
+        return [self.cache.total(name, self.zlim) for name in names]
+
+    def _product(self, name):
+        """
+        A precomputed product of this slab, or None if it
+        has not been computed
+        """
+        if self.products is None or not self.products.matches(self):
+            return
+        result = self.products._lookup(self.zlim)
+        if result is None:
+            return
+        return self._finalize(result[self.products.NAMES.index(name)])
 
     @property
     def shape(self):
@@ -74,52 +134,151 @@ class Aggregate(object):
         view[self.zax] = slice(*self.zlim)
         return view, ax_collapse
 
-    def _prepare_cube(self, attribute=None):
-        view, ax_collapse = self._subslice()
-        att = attribute or self.attribute
-        cube = self.data[att, view]
-        return cube, ax_collapse
+    def _tiles(self):
+        """
+        Split the slab into tiles which span its full depth
 
-    def _iter_slice(self, attribute=None):
-        # iterate through the uncollapsed slab one plane at a time
-        view, ax_collapse = self._subslice()
-        att = attribute or self.attribute
+        :returns: A list of (view, index) tuples. view extracts a tile
+                  from the data, and index is the location of the
+                  collapsed tile in the output (before transposing)
+        """
+        view = self._subslice()[0]
+        axes = sorted([self.slc.index('y'), self.slc.index('x')])
+        rows, cols = [self.data.shape[i] for i in axes]
+        depth = max(self.zlim[1] - self.zlim[0], 1)
+
+        # tiles are as wide as possible, to read contiguous blocks
+        ncol = min(cols, max(self.tile_size // depth, 1))
+        nrow = min(rows, max(self.tile_size // (depth * ncol), 1))
+
+        result = []
+        for r in xrange(0, rows, nrow):
+            for c in xrange(0, cols, ncol):
+                index = slice(r, r + nrow), slice(c, c + ncol)
+                tile = list(view)
+                tile[axes[0]], tile[axes[1]] = index
+                result.append((tuple(tile), index))
+        return result
+
+    def _map_tiles(self, function):
+        """
+        Apply a function to the view of each tile, and assemble
+        the results into the (transposed) 2D output
+        """
+        tiles = self._tiles()
+        views = [t[0] for t in tiles]
+        workers = min(self.workers or cpu_count(), len(tiles))
 
-        for z in xrange(*self.zlim):
-            view[self.zax] = z
-            plane = self.data[att, view]
-            yield np.nan_to_num(plane)
+        if workers == 1:
+            results = map(function, views)
+        else:
+            pool = ThreadPool(workers)
+            results = pool.imap(function, views)
 
-    def _iter_slice_index(self):
-        """Loop over slices of the target attribute and its world coordinate"""
-        att = self.data.get_world_component_id(self.zax)
-        loop = izip(self._iter_slice(), self._iter_slice(att))
-        return loop
+        shape = self.shape
+        if self.slc.index('x') < self.slc.index('y'):
+            shape = shape[::-1]
+
+        try:
+            out = None
+            for (_, index), result in zip(tiles, results):
+                result = np.asarray(result)
+                if out is None:
+                    # functions may return a stack of 2D tiles
+                    out = np.empty(result.shape[:-2] + shape,
+                                   dtype=result.dtype)
+                out[(Ellipsis,) + index] = result
+        finally:
+            if workers > 1:
+                pool.terminate()
+
+        return self._finalize(out)
 
     def _finalize(self, cube):
         if self.slc.index('x') < self.slc.index('y'):
-            cube = cube.T
+            cube = np.swapaxes(cube, -1, -2)
         return cube
 
     def collapse_using(self, function):
         """
         Produce a collapsed image using a numpy aggregation function
+
+        The function is called on each tile of the slab, with an axis
+        keyword giving the axis to collapse.
+        """
+        att = self.attribute
+        ax = self._subslice()[1]
+        return self._map_tiles(lambda view: function(self.data[att, view],
+                                                     axis=ax))
+
+    def _moments(self, view, order):
+        """
+        The intensity-weighted mean (order=1) or dispersion (order=2)
+        of the world coordinate along the collapsed axis, in one tile
         """
-        cube, ax = self._prepare_cube()
-        result = function(cube, axis=ax)
-        return self._finalize(result)
+        ax = self._subslice()[1]
+
+        val = np.maximum(np.nan_to_num(self.data[self.attribute, view]), 0)
+        loc = self._world(view)
+
+        w = val.sum(axis=ax)
+        mean = (val * loc).sum(axis=ax) / w
+        if order == 1:
+            return mean
+
+        # the whole depth of the tile is in memory, so the dispersion is
+        # taken about the mean, rather than from the raw second moment
+        resid = loc - np.expand_dims(mean, ax)
+        return np.sqrt((val * resid ** 2).sum(axis=ax) / w)
+
+    def _world_axis(self):
+        """
+        The world coordinate of each plane along the collapsed axis,
+        or None if it also depends on the position within the plane
+        """
+        if self._world_table is None:
+            axes = tuple(self.data.coords.dependent_axes(self.zax))
+            if axes != (self.zax,):
+                return
+            view = [0] * self.data.ndim
+            view[self.zax] = slice(None)
+            world = self.data.get_world_component_id(self.zax)
+            self._world_table = self.data[world, tuple(view)]
+        return self._world_table
+
+    def _world(self, view):
+        """
+        The world coordinate along the collapsed axis, for a view
+        extracted by :meth:`_tiles`. If possible, this has length-1
+        dimensions along the other axes, which broadcast against the view
+        """
+        table = self._world_axis()
+        if table is None:
+            world = self.data.get_world_component_id(self.zax)
+            return self.data[world, view]
+
+        ax = self._subslice()[1]
+        shape = [1] * sum(not isinstance(v, (int, np.integer)) for v in view)
+        shape[ax] = -1
+        return table[view[self.zax]].reshape(shape)
 
     def _to_world(self, idx):
+        # idx counts planes from the start of the slab
+        idx = idx + self.zlim[0]
+        table = self._world_axis()
+        if table is not None:
+            return table[idx]
+
         args = [None] * self.data.ndim
         y, x = np.mgrid[:idx.shape[0], :idx.shape[1]]
         for i, s in enumerate(self.slc):
             if s not in ['x', 'y']:
-                args[i] = np.ones(idx.size) * s
+                args[i] = np.full(idx.size, s, dtype=int)
         args[self.slc.index('y')] = y.ravel()
         args[self.slc.index('x')] = x.ravel()
         args[self.zax] = idx.ravel()
         att = self.data.get_world_component_id(self.zax)
-        return self.data[att, args].reshape(idx.shape)
+        return self.data[att, tuple(args)].reshape(idx.shape)
 
     @staticmethod
     def all_operators():
@@ -140,14 +299,26 @@ class Aggregate(object):
 
     @check_empty
     def sum(self):
+        cached = self._cached('sum')
+        if cached is not None:
+            return self._finalize(cached[0])
+        product = self._product('mom0')
+        if product is not None:
+            return product
         return self.collapse_using(np.nansum)
 
     @check_empty
     def mean(self):
+        cached = self._cached('sum', 'count')
+        if cached is not None:
+            return self._finalize(cached[0] / cached[1])
         return self.collapse_using(self._mean)
 
     @check_empty
     def max(self):
+        product = self._product('peak')
+        if product is not None:
+            return product
         return self.collapse_using(np.nanmax)
 
     @check_empty
@@ -160,6 +331,9 @@ class Aggregate(object):
         """
         Location of peak value, in world coords
         """
+        product = self._product('peak_world')
+        if product is not None:
+            return product
         idx = self.collapse_using(np.nanargmax)
         return self._to_world(idx)
 
@@ -176,32 +350,396 @@ class Aggregate(object):
         """
         Intensity-weighted coordinate. Pixel units.
         """
-        # build up slice-by-slice, to avoid big temporary cubes
-        loop = self._iter_slice_index()
-        val, loc = next(loop)
-
-        val = np.maximum(val, 0)
-        w, result = val, loc * val
-        for val, loc in loop:
-            val = np.maximum(val, 0)
-            result += val * loc
-            w += val
-        return self._finalize(result / w)
+        cached = self._cached('weighted', 'weight')
+        if cached is not None:
+            return self._finalize(cached[0] / cached[1])
+        product = self._product('mom1')
+        if product is not None:
+            return product
+        return self._map_tiles(lambda view: self._moments(view, 1))
 
     @check_empty
     def mom2(self):
         """
         Intensity-weighted coordinate dispersion. Pixel units.
         """
-        loop = self._iter_slice_index()
-        val, loc = next(loop)
+        product = self._product('mom2')
+        if product is not None:
+            return product
+        return self._map_tiles(lambda view: self._moments(view, 2))
+
+
+def _plane_key(zax, slc):
+    """
+    Identify the plane of a cube which a slice collapses onto.
+
+    Cached 2D results are stored in array order, so they can be used
+    with either orientation of the x and y axes
+    """
+    return tuple('xy' if s in ['x', 'y'] else s
+                 for i, s in enumerate(slc) if i != zax)
+
+
+class CumulativeCube(object):
+
+    """
+    Running totals of a cube along one axis, for instant collapses.
+
+    For a 2D slice through a cube, this stores the cumulative sum along
+    the collapse axis of the (NaN-free) values, the number of finite
+    values, the positive values used as weights by
+    :meth:`Aggregate.mom1`, and the weighted world coordinates. The
+    total of any of these over a range [lo, hi) is then the difference
+    of two planes, so :meth:`Aggregate.sum`, :meth:`Aggregate.mean`
+    and :meth:`Aggregate.mom1` take the same time for any range.
+
+    The totals are kept in a memory-mapped temporary file of
+    :attr:`nbytes` bytes, and are built by streaming the cube in chunks
+    of planes. They are not updated if the data values change: the
+    cube is no longer :attr:`ready`, and must be built again.
+    """
+
+    NAMES = ['sum', 'count', 'weight', 'weighted']
+
+    def __init__(self, data, attribute, zax, slc):
+        """
+        :param data: :class:`~glue.core.data.Data` object
+        :param attribute: :class:`~glue.core.data.ComponentID`
+        :param zax: integer. The axis to accumulate along
+        :param slc: The 2D slice through the cube, as for
+                    :class:`Aggregate`. The value for zax is ignored
+        """
+        self.data = data
+        self.attribute = attribute
+        self.zax = zax
+        self.slc = tuple(s if i != zax else 0 for i, s in enumerate(slc))
+        self._totals = None
+        self._version = None
+
+    @property
+    def nbytes(self):
+        """ The size of the totals, in bytes """
+        axes = sorted([self.slc.index('y'), self.slc.index('x')])
+        size = np.prod([self.data.shape[i] for i in axes])
+        size *= len(self.NAMES) * (self.data.shape[self.zax] + 1)
+        return int(size) * np.dtype(float).itemsize
+
+    @property
+    def ready(self):
+        """ Whether the totals have been built for the current data """
+        return (self._totals is not None and
+                self._version == self.data._version)
+
+    def matches(self, aggregate):
+        """
+        Whether this cache can be used to compute an
+        :class:`Aggregate`
+        """
+        return (self.ready and aggregate.data is self.data and
+                aggregate.attribute is self.attribute and
+                aggregate.zax == self.zax and
+                _plane_key(self.zax, aggregate.slc) ==
+                _plane_key(self.zax, self.slc) and
+                0 <= aggregate.zlim[0] <= aggregate.zlim[1] <=
+                self.data.shape[self.zax])
+
+    def build(self, chunk_size=Aggregate.tile_size):
+        """
+        Compute the running totals
+
+        :param chunk_size: The approximate number of cube elements
+                           to read at once
+        """
+        version = self.data._version
+        nz = self.data.shape[self.zax]
+        agg = Aggregate(self.data, self.attribute, self.zax, self.slc,
+                        (0, nz))
+        view, ax = agg._subslice()
+
+        axes = sorted([self.slc.index('y'), self.slc.index('x')])
+        plane = tuple(self.data.shape[i] for i in axes)
+        step = max(chunk_size // max(np.prod(plane), 1), 1)
+
+        totals = np.memmap(TemporaryFile(), dtype=float, mode='w+',
+                           shape=(len(self.NAMES), nz + 1) + plane)
+        totals[:, 0] = 0
+
+        for lo in xrange(0, nz, step):
+            hi = min(lo + step, nz)
+            view[self.zax] = slice(lo, hi)
+            values = np.rollaxis(self.data[self.attribute, tuple(view)],
+                                 ax, 0)
+            loc = np.rollaxis(agg._world(tuple(view)), ax, 0)
+
+            weight = np.maximum(np.nan_to_num(values), 0)
+            chunks = [np.nan_to_num(values), np.isfinite(values),
+                      weight, weight * loc]
+            for i, chunk in enumerate(chunks):
+                totals[i, lo + 1: hi + 1] = (np.cumsum(chunk, axis=0) +
+                                             totals[i, lo])
+
+        totals.flush()
+        self._totals = totals
+        self._version = version
+
+    def total(self, name, zlim):
+        """
+        The total of one quantity over a range of planes
+
+        :param name: One of 'sum', 'count', 'weight' or 'weighted'
+        :param zlim: The range [lo, hi) of planes to add up
+
+        :rtype: A 2D array, with axes in the order of the data
+        """
+        if not self.ready:
+            raise RuntimeError("CumulativeCube has not been built")
+        totals = self._totals[self.NAMES.index(name)]
+        lo, hi = zlim
+        return np.asarray(totals[hi] - totals[lo])
+
+
+class CubeProducts(object):
+
+    """
+    Standard 2D products of a cube, computed once per range of planes.
+
+    The products are
+
+    * ``mom0``: The sum of the values, as :meth:`Aggregate.sum`
+    * ``mom1``, ``mom2``: The intensity-weighted mean and dispersion of
+      the world coordinate, as :meth:`Aggregate.mom1` and
+      :meth:`Aggregate.mom2`
+    * ``peak``: The maximum value
+    * ``peak_world``: The world coordinate of the maximum value
+    * ``rms``: A robust estimate of the noise, from the median absolute
+      deviation of the values
+
+    All products are computed in a single pass over the tiles of the
+    slab, and kept until the data values change, for the
+    :attr:`MAX_ENTRIES` most recently used ranges. :meth:`compute` may
+    be called from a background thread, while computed products are
+    read without waiting for it. The products can also be added to the
+    data as components, which are only computed when first read.
+    """
+
+    NAMES = ['mom0', 'mom1', 'mom2', 'peak', 'peak_world', 'rms']
+    MAX_ENTRIES = 8  # number of ranges whose products are kept
+
+    def __init__(self, data, attribute, zax, slc, workers=None):
+        """
+        :param data: :class:`~glue.core.data.Data` object
+        :param attribute: :class:`~glue.core.data.ComponentID`
+        :param zax: integer. The axis to collapse
+        :param slc: The 2D slice through the cube, as for
+                    :class:`Aggregate`. The value for zax is ignored
+        :param workers: Number of threads used to reduce tiles
+        """
+        self.data = data
+        self.attribute = attribute
+        self.zax = zax
+        self.workers = workers
+
+        # products are stored in array order, which is the orientation
+        # in which the first of the x and y axes is y
+        xy = [i for i, s in enumerate(slc) if s in ['x', 'y']]
+        slc = list(slc)
+        slc[xy[0]], slc[xy[1]] = 'y', 'x'
+        self.slc = tuple(s if i != zax else 0 for i, s in enumerate(slc))
+
+        # zlim -> (version, stack of products), least recently used
+        # first. Only changed while holding the lock
+        self._products = OrderedDict()
+        self._lock = Lock()
+
+    def matches(self, aggregate):
+        """
+        Whether this can provide the products of an :class:`Aggregate`
+        """
+        return (aggregate.data is self.data and
+                aggregate.attribute is self.attribute and
+                aggregate.zax == self.zax and
+                _plane_key(self.zax, aggregate.slc) ==
+                _plane_key(self.zax, self.slc))
 
-        val = np.maximum(val, 0)
-        w, x, x2 = val, val * loc, val * loc * loc
-        for val, loc in loop:
-            val = np.maximum(val, 0)
-            w += val
-            x += loc * val
-            x2 += loc ** 2 * val
+    def _lookup(self, zlim):
+        """
+        The stack of products of a range, or None if they have not
+        been computed for the current data. Never waits for a
+        computation to finish
+        """
+        zlim = min(zlim), max(zlim)
+        version, result = self._products.get(zlim, (None, None))
+        if version != self.data._version:
+            return
+
+        # mark as recently used, unless a computation holds the lock
+        if self._lock.acquire(False):
+            try:
+                if zlim in self._products:
+                    self._products[zlim] = self._products.pop(zlim)
+            finally:
+                self._lock.release()
+        return result
+
+    def ready(self, zlim):
+        """ Whether the products of a range have been computed """
+        return self._lookup(zlim) is not None
+
+    def compute(self, zlim):
+        """
+        Compute the products of a range of planes, if needed
+
+        :param zlim: The range [lo, hi) of planes to collapse
+
+        :returns: The stack of products, in the order of :attr:`NAMES`
+        """
+        zlim = min(zlim), max(zlim)
+        result = self._lookup(zlim)
+        if result is not None:
+            return result
+
+        with self._lock:
+            version, result = self._products.get(zlim, (None, None))
+            if version == self.data._version:
+                return result
+            version = self.data._version
+            agg = Aggregate(self.data, self.attribute, self.zax, self.slc,
+                            zlim, workers=self.workers)
+            if agg.empty_slice:
+                result = np.zeros((len(self.NAMES),) + agg.shape) * np.nan
+            else:
+                result = agg._map_tiles(lambda view: _products(agg, view))
+
+            # products of older data are never used again
+            for key in [k for k, v in self._products.items()
+                        if v[0] != version]:
+                del self._products[key]
+            self._products.pop(zlim, None)
+            self._products[zlim] = (version, result)
+            while len(self._products) > self.MAX_ENTRIES:
+                self._products.popitem(last=False)
+            return result
+
+    def get(self, name, zlim):
+        """
+        A product of a range of planes, computed if needed
+
+        Only a computation takes the lock, so products which have
+        already been computed are returned immediately, even while
+        another range is being computed.
+
+        :param name: The product name (one of :attr:`NAMES`)
+        :param zlim: The range [lo, hi) of planes to collapse
+
+        :rtype: A 2D array, with axes in the order of the data
+        """
+        return self.compute(zlim)[self.NAMES.index(name)]
+
+    def add_to_data(self, zlim, names=None):
+        """
+        Add products to the data, as components broadcast along
+        every axis except x and y. Components are labeled with the
+        attribute, product name, and range. Their values are computed
+        the first time they are read, and are not updated afterwards.
+
+        :param zlim: The range [lo, hi) of planes to collapse
+        :param names: The products to add. Defaults to all of them
+
+        :returns: A list of the :class:`~glue.core.data.ComponentID`
+                  for each product
+        """
+        from .data import LazyComponent
+
+        zlim = min(zlim), max(zlim)
+        result = []
+        for name in names or self.NAMES:
+            label = '%s %s [%i:%i]' % (self.attribute, name,
+                                       zlim[0], zlim[1])
+            cid = self.data.find_component_id(label)
+            if cid is None:
+                comp = LazyComponent(_LazyProduct(self, name, zlim))
+                cid = self.data.add_component(comp, label)
+            result.append(cid)
+        return result
+
+
+def _take(values, index, axis):
+    """
+    The elements of values at the given index along axis, with index
+    shaped like values without that axis
+    """
+    idx = list(np.indices(index.shape))
+    idx.insert(axis, index)
+    return values[tuple(idx)]
+
+
+def _nanmedian(values, axis):
+    """
+    The median along axis, ignoring NaNs. NaN where every value is NaN
+    """
+    values = np.sort(values, axis=axis)  # NaNs sort last
+    n = (~np.isnan(values)).sum(axis=axis)
+    lo = _take(values, np.maximum(n - 1, 0) // 2, axis)
+    hi = _take(values, n // 2, axis)
+    return np.where(n > 0, (lo + hi) / 2, np.nan)
+
+
+def _products(agg, view):
+    """
+    The stack of :attr:`CubeProducts.NAMES` products of one tile
+    """
+    ax = agg._subslice()[1]
+    values = np.asarray(agg.data[agg.attribute, view], dtype=float)
+    loc = broadcast_to(agg._world(view), values.shape)
+
+    finite = np.isfinite(values)
+    val = np.where(finite, values, 0)
+    weight = np.maximum(val, 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = weight.sum(axis=ax)
+        mom1 = (weight * loc).sum(axis=ax) / w
+        resid = loc - np.expand_dims(mom1, ax)
+        mom2 = np.sqrt((weight * resid ** 2).sum(axis=ax) / w)
+
+    # columns without any finite values have no peak
+    peak = np.where(finite, values, -np.inf).argmax(axis=ax)
+    empty = ~finite.any(axis=ax)
+    peak_value = np.where(empty, np.nan, _take(values, peak, ax))
+    peak_world = np.where(empty, np.nan, _take(loc, peak, ax))
+
+    median = np.expand_dims(_nanmedian(values, ax), ax)
+    rms = 1.4826 * _nanmedian(np.abs(values - median), ax)
+
+    return np.array([val.sum(axis=ax), mom1, mom2,
+                     peak_value, peak_world, rms])
+
+
+class _LazyProduct(object):
+
+    """
+    An array-like source for a :class:`~glue.core.data.LazyComponent`,
+    which broadcasts a product of a :class:`CubeProducts` to the
+    shape of the data
+    """
 
-        return self._finalize(np.sqrt(x2 / w - (x / w) ** 2))
+    def __init__(self, products, name, zlim):
+        self.products = products
+        self.name = name
+        self.zlim = zlim
+        self.shape = products.data.shape
+        self.dtype = np.dtype(float)
+
+    def _array(self):
+        plane = self.products.get(self.name, self.zlim)
+        xy = [i for i, s in enumerate(self.products.slc) if s in ['x', 'y']]
+        for i in range(len(self.shape)):
+            if i not in xy:
+                plane = np.expand_dims(plane, i)
+        return broadcast_to(plane, self.shape)
+
+    def __array__(self, dtype=None):
+        return np.asarray(self._array(), dtype=dtype)
+
+    def __getitem__(self, key):
+        return self._array()[key]
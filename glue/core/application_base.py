@@ -52,6 +52,9 @@ class Application(HubListener):
         for key, value, validator in settings:
             self._settings[key] = [value, validator]
 
+        # map tab -> (context, viewer ids) of viewers still to be restored
+        self._pending_viewers = {}
+
     @property
     def session(self):
         return self._session
@@ -83,15 +86,15 @@ class Application(HubListener):
     def save_session(self, path):
         """ Save the data collection and hub to file.
 
-        Can be restored via restore_session
+        Can be restored via restore_session. The session is written
+        as a session archive (see :mod:`glue.core.state`)
 
         Note: Saving of client is not currently supported. Thus,
         restoring this session will lose all current viz windows
         """
         from .state import GlueSerializer
         gs = GlueSerializer(self)
-        with open(path, 'w') as out:
-            gs.dump(out, indent=2)
+        gs.dump_archive(path, indent=2)
 
     def new_tab(self):
         raise NotImplementedError()
@@ -129,6 +132,15 @@ class Application(HubListener):
         d = load_data(path)
         self.add_datasets(self.data_collection, d)
 
+    @catch_error("Could not load data")
+    def load_data_files(self, paths):
+        """
+        Load many files, globs or directories in parallel
+
+        :param paths: A list of paths to load
+        """
+        self.do(command.LoadDataFiles(paths=paths, factory=None))
+
     def report_error(self, message, detail):
         """ Report an error message to the user.
         Must be implemented in a subclass
@@ -209,7 +221,38 @@ class Application(HubListener):
         """
         raise NotImplementedError()
 
+    def _tabs(self):
+        i = 0
+        while self.tab(i) is not None:
+            yield self.tab(i)
+            i += 1
+
+    def _tab_index(self, tab):
+        for i, page in enumerate(self._tabs()):
+            if page is tab:
+                return i
+
+    def restore_pending_viewers(self, tab=None):
+        """
+        Restore viewers whose restore was deferred by a lazy session
+        restore, until their tab was shown
+
+        :param tab: The index of the tab to restore. Defaults to all tabs
+        """
+        if not self._pending_viewers:
+            return
+        pages = list(self._tabs()) if tab is None else [self.tab(tab)]
+        for page in pages:
+            if page not in self._pending_viewers:
+                continue
+            context, viewers = self._pending_viewers.pop(page)
+            index = self._tab_index(page)
+            for v in viewers:
+                viewer = context.object(v)
+                self.add_widget(viewer, tab=index, hold_position=True)
+
     def __gluestate__(self, context):
+        self.restore_pending_viewers()
         viewers = [list(map(context.id, tab)) for tab in self.viewers]
         data = self.session.data_collection
 
@@ -225,9 +268,13 @@ class Application(HubListener):
         for i, tab in enumerate(rec['viewers']):
             if self.tab(i) is None:
                 self.new_tab()
-            for v in tab:
-                viewer = context.object(v)
-                self.add_widget(viewer, tab=i, hold_position=True)
+            self._pending_viewers[self.tab(i)] = (context, tab)
+
+        if getattr(context, 'lazy', False):
+            # viewers in hidden tabs are restored when first shown
+            self.restore_pending_viewers(self._tab_index(self.tab()))
+        else:
+            self.restore_pending_viewers()
         return self
 
 
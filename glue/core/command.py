@@ -3,8 +3,8 @@ from __future__ import absolute_import, division, print_function
 from abc import ABCMeta, abstractmethod
 import logging
 
-from .data_factories import load_data
-from .util import CallbackMixin
+from .data_factories import load_data, add_data_files
+from .util import CallbackMixin, as_list
 
 MAX_UNDO = 50
 """
@@ -179,6 +179,30 @@ class LoadData(Command):
         pass
 
 
+class LoadDataFiles(Command):
+    """Load many files in parallel, and add them to the data collection
+
+    :param paths: A list of files, glob patterns or directories
+    :param factory: The factory to use for every file, or None to
+                    identify each file automatically
+    """
+    kwargs = ['paths', 'factory']
+    label = 'load data files'
+
+    def do(self, session):
+        self.results = add_data_files(session.data_collection, self.paths,
+                                      factory=self.factory)
+        self.created = []
+        for result in self.results:
+            if result.data is not None:
+                self.created.extend(as_list(result.data))
+        return self.results
+
+    def undo(self, session):
+        for d in self.created:
+            session.data_collection.remove(d)
+
+
 class AddData(Command):
     kwargs = ['data']
     label = 'add data'
@@ -190,6 +214,19 @@ class AddData(Command):
         session.data_collection.remove(self.data)
 
 
+class AddDatasets(Command):
+    """Add several data sets to the data collection at once"""
+    kwargs = ['data']
+    label = 'add data'
+
+    def do(self, session):
+        session.data_collection.extend(self.data)
+
+    def undo(self, session):
+        for d in self.data:
+            session.data_collection.remove(d)
+
+
 class RemoveData(Command):
     kwargs = ['data']
     label = 'remove data'
@@ -18,6 +18,8 @@ from .hub import Hub
 from .util import (split_component_view, view_shape,
                    coerce_numeric, check_sorted, unique, row_lookup)
 from .decorators import clear_cache
+from .histogram import HistogramCache, mask_key
+from .key_index import KeyIndex, JoinIndex
 from .message import (DataUpdateMessage,
                       DataAddComponentMessage, NumericalDataChangedMessage,
                       SubsetCreateMessage, ComponentsChangedMessage,
@@ -27,7 +29,7 @@ from .odict import OrderedDict
 from ..external import six
 
 __all__ = ['Data', 'ComponentID', 'Component', 'DerivedComponent',
-           'CategoricalComponent', 'CoordinateComponent']
+           'CategoricalComponent', 'CoordinateComponent', 'LazyComponent']
 
 # access to ComponentIDs via .item[name]
 
@@ -204,7 +206,7 @@ class Component(object):
     @property
     def ndim(self):
         """ The number of dimensions """
-        return len(self._data.shape)
+        return len(self.shape)
 
     def __getitem__(self, key):
         logging.debug("Using %s to index data of shape %s", key, self.shape)
@@ -215,7 +217,7 @@ class Component(object):
         """
         Whether or not the datatype is numeric
         """
-        return np.can_cast(self.data[0], np.complex)
+        return np.can_cast(self[0], np.complex)
 
     def __str__(self):
         return "Component with shape %s" % (self.shape,)
@@ -264,6 +266,102 @@ class Component(object):
             return Component(n, units=units)
 
 
+class LazyComponent(Component):
+
+    """
+    A numerical Component whose values are read on demand
+
+    The values come from an array-like source (e.g. a dataset in an
+    open file), which provides ``shape``, ``dtype``, basic (integer and
+    slice) indexing, and conversion via ``np.asarray``. Views into the
+    component read only the requested region from the source. The full
+    array is read the first time :attr:`data` is accessed, and kept.
+    """
+
+    def __init__(self, source, units=None):
+        """
+        :param source: The array-like source of the data
+        :param units: Optional unit label
+        """
+        super(LazyComponent, self).__init__(None, units=units)
+        self._source = source
+        self._loaded = None
+
+    @property
+    def _data(self):
+        return self.data
+
+    @_data.setter
+    def _data(self, value):
+        # values assigned directly (e.g. by Data.update_components)
+        # replace the lazy source
+        self._source = value
+        self._loaded = None
+
+    @property
+    def data(self):
+        if self._loaded is None:
+            data = np.asarray(self._source)
+            # arrays read from the source (e.g. memory maps) are shared
+            # with it. Arrays assigned to the component are left as is
+            if data is not self._source and data.flags.writeable:
+                data.setflags(write=False)
+            self._loaded = data
+        return self._loaded
+
+    @property
+    def loaded(self):
+        """ Whether the full array has been read """
+        return self._loaded is not None
+
+    def close(self):
+        """
+        Close the file behind the source, if any. Sources which can
+        re-open their file do so if the component is read again.
+        """
+        close = getattr(self._source, 'close', None)
+        if close is not None:
+            close()
+
+    @property
+    def shape(self):
+        return tuple(self._source.shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return np.dtype(self._source.dtype)
+
+    @property
+    def numeric(self):
+        return np.can_cast(self.dtype, np.complex)
+
+    def __getitem__(self, key):
+        if self._loaded is not None or not _is_basic_view(key):
+            return self.data[key]
+        logging.debug("Reading %s from data of shape %s", key, self.shape)
+        return np.asarray(self._source[key])
+
+
+def _is_basic_view(view):
+    """
+    Whether a view only uses integers and slices with positive steps,
+    which all lazy sources support
+    """
+    if not isinstance(view, tuple):
+        view = (view,)
+    for v in view:
+        if isinstance(v, slice):
+            if v.step is not None and v.step <= 0:
+                return False
+        elif not isinstance(v, (int, np.integer)):
+            return False
+    return True
+
+
 class DerivedComponent(Component):
 
     """ A component which derives its data from a function """
@@ -365,6 +463,9 @@ class CategoricalComponent(Component):
     Container for categorical data.
     """
 
+    _codes = None
+    _values = None
+
     def __init__(self, categorical_data, categories=None, jitter=None, units=None):
         """
         :param categorical_data: The underlying :class:`numpy.ndarray`
@@ -390,6 +491,67 @@ class CategoricalComponent(Component):
         else:
             self._update_data()
 
+    @classmethod
+    def from_codes(cls, codes, categories, jitter=None, units=None):
+        """
+        Build a component from integer codes into its categories.
+
+        The category and numerical value of each element are
+        only computed if they are needed, so large (e.g.
+        memory-mapped) columns of codes are not expanded into
+        arrays of labels or floats. Views into the component
+        convert only the requested codes.
+
+        :param codes: The index of the category of each element
+        :param categories: The sorted array of unique categories
+        """
+        result = cls.__new__(cls)
+        Component.__init__(result, None, units)
+        codes = np.asarray(codes)
+        if codes.ndim > 1:
+            raise ValueError("Categorical Data must be 1-dimensional")
+        result._codes = codes
+        result._labels = None
+        result._categories = categories
+        result._jitter_method = None
+        result._is_jittered = False
+        result.jitter(method=jitter)
+        return result
+
+    @property
+    def _data(self):
+        if self._values is None and self._codes is not None:
+            self._values = self._codes.astype(np.float)
+            self._values.setflags(write=False)
+        return self._values
+
+    @_data.setter
+    def _data(self, value):
+        self._values = value
+
+    @property
+    def shape(self):
+        if self._values is None and self._codes is not None:
+            return self._codes.shape
+        return self._values.shape
+
+    def __getitem__(self, key):
+        if self._values is None and self._codes is not None:
+            return self._codes[key].astype(np.float)
+        return super(CategoricalComponent, self).__getitem__(key)
+
+    @property
+    def _categorical_data(self):
+        if self._labels is None:
+            self._labels = self._categories[self._codes]
+            self._labels.setflags(write=False)
+        return self._labels
+
+    @_categorical_data.setter
+    def _categorical_data(self, value):
+        self._labels = value
+        self._codes = None
+
     def _update_categories(self, categories=None):
         """
         :param categories: A sorted array of categories to find in the dataset.
@@ -530,6 +692,22 @@ class Data(object):
 
         self._key_joins = {}
 
+        # incremented whenever the numerical values of a component change.
+        # Caches derived from the data can compare against this
+        self._version = 0
+
+        # HistogramCaches, keyed by (ComponentID, log)
+        self._histograms = {}
+
+        # KeyIndexes of join keys, keyed by ComponentID
+        self._key_indices = {}
+
+        # JoinIndexes from joined Data to this data, keyed by Data
+        self._join_indices = {}
+
+        # (version, random permutation of the elements), for sampling
+        self._sample_order = None
+
     @property
     def subsets(self):
         """
@@ -645,6 +823,8 @@ class Data(object):
 
         self._key_joins[other] = (cid, cid_other)
         other._key_joins[self] = (cid_other, cid)
+        self._join_indices.pop(other, None)
+        other._join_indices.pop(self, None)
 
     @contract(component='component_like', label='cid_like')
     def add_component(self, component, label, hidden=False):
@@ -693,6 +873,8 @@ class Data(object):
 
         is_present = component_id in self._components
         self._components[component_id] = component
+        if is_present:
+            self._version += 1
 
         first_component = len(self._components) == 1
         if first_component:
@@ -1095,6 +1277,119 @@ class Data(object):
         order = [comp.label for comp in self.components]
         return df[order]
 
+    def write_csv(self, path, components=None, subsets=(), chunk_size=None):
+        """ Write the Data object to a CSV file
+
+        Rows are formatted and written a chunk at a time
+        (see :func:`glue.core.io.write_csv`). Multidimensional data
+        are flattened. Categorical components are written as their
+        category labels.
+
+        :param path: The file to write
+        :param components: The ComponentIDs to write. Defaults to
+                           all components
+        :param subsets: Subsets to write as extra, 0/1 columns,
+                        named after each subset
+        :param chunk_size: The number of rows to format at a time
+        """
+        from .io import write_csv
+
+        components = self.components if components is None else components
+        columns, names = [], []
+        for cid in components:
+            comp = self.get_component(cid)
+            if isinstance(comp, CategoricalComponent):
+                columns.append(comp._categorical_data)
+            else:
+                columns.append(comp.data)
+            names.append(cid.label)
+
+        for subset in subsets:
+            columns.append(subset.to_mask())
+            names.append(subset.label)
+
+        write_csv(path, columns, names, chunk_size=chunk_size)
+
+    def compute_histogram(self, cid, lo, hi, nbins, log=False, subset=None):
+        """
+        Compute histogram bin counts for a component.
+
+        The bin index of each element is computed once per component and
+        binning, and re-used by the data and all of its subsets -- subset
+        counts are a masked bincount over these indices. Results are cached,
+        and shared between every viewer, until the numerical data change.
+
+        :param cid: The ComponentID to histogram
+        :param lo: Lower edge of the first bin (in log10 units if log=True)
+        :param hi: Upper edge of the last bin (in log10 units if log=True)
+        :param nbins: Number of bins
+        :param log: If True, histogram the log10 of the values
+        :param subset: Optional :class:`~glue.core.subset.Subset` of this
+                       data, to restrict the counts to
+
+        :raises: IncompatibleAttribute, if the component or
+                 subset cannot be computed
+
+        :returns: An array of bin counts
+        """
+        cache = self._histogram_cache(cid, log)
+        if subset is None:
+            return cache.counts(lo, hi, nbins)
+        mask = subset.to_mask()
+        return cache.counts(lo, hi, nbins, mask=mask, key=mask_key(mask))
+
+    def _histogram_cache(self, cid, log=False):
+        key = (cid, log)
+        version, cache = self._histograms.get(key, (None, None))
+        if version != self._version:
+            values = self[cid]
+            if log:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    values = np.log10(values)
+            cache = HistogramCache(values)
+            self._histograms[key] = (self._version, cache)
+        return cache
+
+    def _key_index(self, cid):
+        """
+        The :class:`~glue.core.key_index.KeyIndex` of a component,
+        used to evaluate key joins. The index is built on first use,
+        and kept until the data change.
+        """
+        version, index = self._key_indices.get(cid, (None, None))
+        if version != self._version:
+            index = KeyIndex(self[cid])
+            self._key_indices[cid] = (self._version, index)
+        return index
+
+    def _random_order(self):
+        """
+        A random permutation of the flat indices of the data, used to
+        draw unbiased samples: the first n elements of the permutation
+        are a random sample of size n. The permutation is built once
+        per data version, and shared by every view of the data.
+        """
+        if (self._sample_order is None or
+                self._sample_order[0] != self._version):
+            order = np.random.RandomState(0).permutation(self.size)
+            self._sample_order = (self._version, order)
+        return self._sample_order[1]
+
+    def _join_index(self, other):
+        """
+        The :class:`~glue.core.key_index.JoinIndex` which propagates
+        selections from a joined dataset to this one. The index is built
+        on first use, and kept until either dataset changes.
+        """
+        versions = (self._version, other._version)
+        version, index = self._join_indices.get(other, (None, None))
+        if version != versions:
+            cid, cid_other = self._key_joins[other]
+            index = JoinIndex(self._key_index(cid),
+                              other._key_index(cid_other))
+            self._join_indices[other] = (versions, index)
+        return index
+
     @contract(mapping="dict(inst($Component, $ComponentID):array_like)")
     def update_components(self, mapping):
         """
@@ -1119,6 +1414,8 @@ class Data(object):
 
             comp._data = data
 
+        self._version += 1
+
         # alert hub of the change
         if self.hub is not None:
             msg = NumericalDataChangedMessage(self)
@@ -73,11 +73,31 @@ class DataCollection(HubListener):
     def extend(self, data):
         """Add several new datasets to this collection
 
-        See :meth:`append` for more information
+        See :meth:`append` for more information. All of the datasets
+        are added (and the links between them updated once) before a
+        DataCollectionAddMessage is broadcast for each new dataset.
 
         :param data: List of data objects to add
         """
-        [self.append(d) for d in data]
+        added = []
+        for d in data:
+            if d in self or d in added:
+                continue
+            self._data.append(d)
+            added.append(d)
+            if self.hub:
+                d.register_to_hub(self.hub)
+                for s in d.subsets:
+                    s.register()
+
+        if not added:
+            return
+
+        self._sync_link_manager()
+        if self.hub is None:
+            return
+        for d in added:
+            self.hub.broadcast(DataCollectionAddMessage(self, d))
 
     def remove(self, data):
         """ Remove a data set from the collection
@@ -91,6 +111,11 @@ class DataCollection(HubListener):
             return
         self._data.remove(data)
         Registry().unregister(data, Data)
+
+        # release files the data were reading from lazily
+        log = getattr(data, '_load_log', None)
+        if log is not None:
+            log.close()
         if self.hub:
             msg = DataCollectionDeleteMessage(self, data)
             self.hub.broadcast(msg)
@@ -33,21 +33,28 @@ Putting this together, the simplest data factory code looks like this::
 from __future__ import absolute_import, division, print_function
 
 import os
+import logging
 import warnings
+from glob import glob
+from threading import Lock, Thread, current_thread
+from time import time
+from collections import namedtuple
 
 import numpy as np
 
-from .data import Component, Data, CategoricalComponent
+from .data import Component, Data, CategoricalComponent, LazyComponent
 from .io import extract_data_fits, extract_data_hdf5
-from .util import file_format, as_list
+from .util import file_format, as_list, process_pool
+from .odict import OrderedDict
 from .coordinates import coordinates_from_header, coordinates_from_wcs
 from ..backends import get_backend
-from ..config import auto_refresh
+from ..config import auto_refresh, cache_tables
 from ..external import six
 from .contracts import contract
 
 __all__ = ['load_data', 'gridded_data', 'casalike_cube',
-           'tabular_data', 'img_data', 'auto_data']
+           'tabular_data', 'img_data', 'auto_data', 'iter_load_data',
+           'add_data_files', 'expand_data_paths', 'start_loading_data']
 __factories__ = []
 _default_factory = {}
 
@@ -92,19 +99,115 @@ def has_extension(exts):
     return tester
 
 
+class FileInfo(object):
+
+    """
+    Facts about a file, used by data factory identifiers.
+
+    Each fact is computed on first use -- e.g. the FITS headers are
+    read once, and shared by every identifier (and by the factory
+    which loads the file). Use :func:`file_info` to fetch the
+    (cached) FileInfo for a path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._hdf5 = None
+        self._fits = None
+        self._casalike = None
+
+    @property
+    def is_hdf5(self):
+        """ Whether this is an HDF5 file """
+        if self._hdf5 is None:
+            # All hdf5 files begin with the same sequence
+            with open(self.path, 'rb') as infile:
+                self._hdf5 = infile.read(8) == b'\x89HDF\r\n\x1a\n'
+        return self._hdf5
+
+    @property
+    def fits_headers(self):
+        """
+        A list of (is_image, header) tuples for each HDU in a FITS
+        file, or None if this is not a FITS file
+        """
+        if self._fits is None:
+            from ..external.astro import fits
+            try:
+                with fits.open(self.path) as hdulist:
+                    self._fits = [(isinstance(hdu, (fits.PrimaryHDU,
+                                                    fits.ImageHDU)),
+                                   hdu.header)
+                                  for hdu in hdulist]
+            except IOError:
+                self._fits = False
+        return self._fits or None
+
+    @property
+    def is_fits(self):
+        """ Whether this is a FITS file """
+        return self.fits_headers is not None
+
+    @property
+    def is_casalike(self):
+        """
+        Whether this is a CASA-like FITS cube,
+        with (P, P, V, Stokes) layout
+        """
+        if self._casalike is None:
+            self._casalike = self._check_casalike()
+        return self._casalike
+
+    def _check_casalike(self):
+        headers = self.fits_headers
+        if headers is None or len(headers) != 1:
+            return False
+        header = headers[0][1]
+        if header['NAXIS'] != 4:
+            return False
+
+        from astropy.wcs import WCS
+        w = WCS(header)
+
+        ax = [a.get('coordinate_type') for a in w.get_axis_types()]
+        return ax == ['celestial', 'celestial', 'spectral', 'stokes']
+
+
+_file_info_cache = OrderedDict()
+_file_info_lock = Lock()
+_FILE_INFO_SIZE = 256  # number of files to remember
+
+
+def file_info(path):
+    """
+    The :class:`FileInfo` for a path.
+
+    Results are cached, until the file's size or
+    modification time change.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:  # let the identifiers report the error
+        return FileInfo(path)
+
+    key = os.path.abspath(path)
+    version = (stat.st_size, stat.st_mtime)
+    with _file_info_lock:  # files may be identified on several threads
+        cached = _file_info_cache.pop(key, None)
+        if cached is None or cached[0] != version:
+            cached = version, FileInfo(path)
+        _file_info_cache[key] = cached
+        while len(_file_info_cache) > _FILE_INFO_SIZE:
+            _file_info_cache.popitem(last=False)
+    return cached[1]
+
+
 def is_hdf5(filename):
-    # All hdf5 files begin with the same sequence
-    with open(filename, 'rb') as infile:
-        return infile.read(8) == b'\x89HDF\r\n\x1a\n'
+    return file_info(filename).is_hdf5
 
 
 def is_fits(filename):
-    from ..external.astro import fits
-    try:
-        with fits.open(filename):
-            return True
-    except IOError:
-        return False
+    return file_info(filename).is_fits
 
 
 class LoadLog(object):
@@ -125,11 +228,17 @@ class LoadLog(object):
         self.kwargs = kwargs
         self.components = []
         self.data = []
+        self.watcher = None
 
-        if auto_refresh():
-            self.watcher = FileWatcher(path, self.reload)
-        else:
-            self.watcher = None
+    def watch(self):
+        """
+        Start watching the file for changes, if auto-refresh is enabled.
+
+        File watchers use GUI timers, so this must be called
+        from the main thread.
+        """
+        if self.watcher is None and auto_refresh():
+            self.watcher = FileWatcher(self.path, self.reload)
 
     def _log_component(self, component):
         self.components.append(component)
@@ -155,7 +264,7 @@ class LoadLog(object):
         Re-read files, and update data
         """
         try:
-            d = load_data(self.path, factory=self.factory, **self.kwargs)
+            d = _load_data(self.path, self.factory, self.kwargs)
         except (OSError, IOError) as exc:
             warnings.warn("Could not reload %s.\n%s" % (self.path, exc))
             if self.watcher is not None:
@@ -164,17 +273,31 @@ class LoadLog(object):
 
         log = as_list(d)[0]._load_log
 
-        for dold, dnew in zip(self.data, as_list(d)):
-            if dold.shape != dnew.shape:
-                warnings.warn("Cannot refresh data -- data shape changed")
-                return
-
-            mapping = dict((c, log.component(self.id(c)).data)
-                           for c in dold._components.values()
-                           if c in self.components
-                           and type(c) == Component)
-            dold.coords = dnew.coords
-            dold.update_components(mapping)
+        # the old file is replaced, and the new one is read in full
+        self.close()
+        try:
+            for dold, dnew in zip(self.data, as_list(d)):
+                if dold.shape != dnew.shape:
+                    warnings.warn("Cannot refresh data -- data shape changed")
+                    return
+
+                mapping = dict((c, log.component(self.id(c)).data)
+                               for c in dold._components.values()
+                               if c in self.components
+                               and type(c) in (Component, LazyComponent))
+                dold.coords = dnew.coords
+                dold.update_components(mapping)
+        finally:
+            log.close()
+
+    def close(self):
+        """
+        Close the files that logged components read from lazily.
+        The files are re-opened if the components are read again
+        """
+        for comp in self.components:
+            if isinstance(comp, LazyComponent):
+                comp.close()
 
     def __gluestate__(self, context):
         return dict(path=self.path,
@@ -185,10 +308,150 @@ class LoadLog(object):
     def __setgluestate__(cls, rec, context):
         fac = context.object(rec['factory'])
         kwargs = dict(*rec['kwargs'])
+        if getattr(context, 'lazy', False):
+            return DeferredLoadLog(rec['path'], fac, kwargs)
         d = load_data(rec['path'], factory=fac, **kwargs)
         return as_list(d)[0]._load_log
 
 
+def _on_main_thread():
+    """ Whether the caller runs on the main thread """
+    try:
+        from threading import main_thread
+    except ImportError:  # Python 2
+        import threading
+        return isinstance(current_thread(), threading._MainThread)
+    return current_thread() is main_thread()
+
+
+class DeferredLoadLog(LoadLog):
+
+    """
+    A LoadLog restored from a saved session, which only re-reads its
+    file when the data are first needed.
+
+    Components whose shape and dtype were saved with the session are
+    restored as :class:`~glue.core.data.LazyComponent` placeholders,
+    which trigger the load on first access. Any other component
+    triggers the load as soon as it is requested.
+    """
+
+    def __init__(self, path, factory, kwargs):
+        self.path = os.path.abspath(path)
+        self.factory = factory
+        self.kwargs = kwargs
+        self.watcher = None
+        self._log = None
+        self._deferred = []  # (placeholder component, index) pairs
+        self._restored = []  # restored Data holding placeholders
+
+    @property
+    def loaded(self):
+        """ Whether the file has been read """
+        return self._log is not None
+
+    @property
+    def log(self):
+        """ The LoadLog of the file, once it has been read """
+        if self._log is None:
+            start = time()
+            d = _load_data(self.path, self.factory, self.kwargs)
+            self._log = as_list(d)[0]._load_log
+            logging.getLogger(__name__).info("Restored %s in %.3fs",
+                                             self.path, time() - start)
+            # file watchers need the GUI thread
+            if _on_main_thread():
+                self.watch()
+        return self._log
+
+    @property
+    def components(self):
+        return self.log.components
+
+    @property
+    def data(self):
+        return self.log.data
+
+    def attach(self, data):
+        """
+        Register a restored Data object which holds placeholder
+        components, so that reloading the file updates it
+
+        :param data: The :class:`~glue.core.data.Data` object
+        """
+        if not any(d is data for d in self._restored):
+            self._restored.append(data)
+
+    def id(self, component):
+        for comp, index in self._deferred:
+            if comp is component:
+                return index
+        return self.log.id(component)
+
+    def component(self, index):
+        return self.log.component(index)
+
+    def deferred_component(self, index, shape, dtype):
+        """
+        A placeholder for a component, which reads the file on first access
+
+        :param index: The index of the component in the log
+        :param shape: The shape of the component
+        :param dtype: The dtype of the component
+        """
+        comp = LazyComponent(_DeferredArray(self, index, shape, dtype))
+        comp._load_log = self
+        self._deferred.append((comp, index))
+        return comp
+
+    def reload(self):
+        """
+        Re-read the file, and update the restored data. Nothing is
+        done if the file has not been read yet
+        """
+        if self._log is None:
+            return
+        self._log.reload()
+
+        for data in self._restored:
+            components = list(data._components.values())
+            mapping = dict((comp, self.component(index).data)
+                           for comp, index in self._deferred
+                           if any(comp is c for c in components))
+            if mapping:
+                data.update_components(mapping)
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+
+
+class _DeferredArray(object):
+
+    """ An array-like source for a component of a DeferredLoadLog """
+
+    def __init__(self, log, index, shape, dtype):
+        self.log = log
+        self.index = index
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+    def _component(self):
+        comp = self.log.component(self.index)
+        if tuple(comp.shape) != self.shape:
+            raise IOError("Shape of %s changed since the session was saved "
+                          "(%s vs %s)" % (self.log.path, comp.shape,
+                                          self.shape))
+        return comp
+
+    def __getitem__(self, key):
+        # lazily read components only read the requested region
+        return self._component()[key]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self._component().data, dtype=dtype)
+
+
 class FileWatcher(object):
 
     """
@@ -246,6 +509,16 @@ def load_data(path, factory=None, **kwargs):
 
     Extra keywords are passed through to factory functions
     """
+    d = _load_data(path, factory, kwargs)
+    as_list(d)[0]._load_log.watch()
+    return d
+
+
+def _load_data(path, factory, kwargs):
+    """
+    Load a file, as :func:`load_data`, without watching it for changes.
+    Safe to call from any thread.
+    """
     from ..qglue import parse_data
 
     def as_data_objects(ds, lbl):
@@ -258,11 +531,19 @@ def load_data(path, factory=None, **kwargs):
             for item in parse_data(d, lbl):
                 yield item
 
+    from .table_cache import table_cache
+
     factory = factory or auto_data
     lbl = data_label(path)
 
-    d = as_list(factory(path, **kwargs))
-    d = list(as_data_objects(d, lbl))
+    # re-use columns from the last time this file was parsed
+    d = table_cache.load(path, factory, kwargs) if cache_tables() else None
+    if d is None:
+        d = as_list(factory(path, **kwargs))
+        d = list(as_data_objects(d, lbl))
+        if cache_tables():
+            table_cache.save(path, factory, kwargs, d)
+
     log = LoadLog(path, factory, kwargs)
     for item in d:
         if item.label is '':
@@ -278,6 +559,175 @@ def load_data(path, factory=None, **kwargs):
     return d
 
 
+#: The outcome of loading one file with :func:`iter_load_data`.
+#: data is the loaded Data object (or list of objects), or None if
+#: loading failed. error is the exception raised, or None.
+LoadResult = namedtuple('LoadResult', 'path data error seconds')
+
+
+def expand_data_paths(patterns):
+    """
+    Expand glob patterns and directories into a sorted list of files
+
+    Directories expand to the (non-hidden) files they contain.
+    Paths without glob characters are kept even if they do not exist,
+    so that loading them reports a useful error.
+
+    :param patterns: A path, glob pattern or directory, or a list of these
+    :rtype: list of str
+    """
+    result = []
+    for pattern in as_list(patterns):
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, p) for p in os.listdir(pattern)
+                     if not p.startswith('.')]
+            paths = [p for p in paths if os.path.isfile(p)]
+        elif any(c in pattern for c in '*?['):
+            paths = [p for p in glob(pattern) if os.path.isfile(p)]
+        else:
+            paths = [pattern]
+        result.extend(p for p in sorted(paths) if p not in result)
+    return result
+
+
+def _timed_load(args):
+    path, factory, kwargs = args
+    start = time()
+    try:
+        data, error = _load_data(path, factory, kwargs), None
+    except Exception as exc:
+        data, error = None, exc
+    seconds = time() - start
+    logging.getLogger(__name__).info("Loaded %s in %.3fs", path, seconds)
+    return LoadResult(path, data, error, seconds)
+
+
+def iter_load_data(paths, factory=None, workers=None, **kwargs):
+    """
+    Load many files in parallel, on a thread pool.
+
+    File identification and parsing (which mostly release the GIL, in
+    numpy, pandas, astropy and h5py) run on the pool.
+
+    The files are not watched for changes (see
+    :func:`~glue.config.auto_refresh`) until :meth:`LoadLog.watch`
+    is called on the main thread, e.g. by :func:`add_data_files`.
+
+    :param paths: A list of files to load (see :func:`expand_data_paths`)
+    :param factory: The factory to use for every file.
+                    Defaults to :func:`auto_data`
+    :param workers: Number of threads. Defaults to the number of CPUs
+
+    Extra keywords are passed to :func:`load_data`
+
+    :returns: An iterator over a :class:`LoadResult` for each file,
+              in the order in which they finish
+    """
+    from multiprocessing import cpu_count
+    from multiprocessing.pool import ThreadPool
+
+    jobs = [(path, factory, kwargs) for path in as_list(paths)]
+    if len(jobs) == 0:
+        return
+
+    workers = min(workers or cpu_count(), len(jobs))
+    if workers == 1:
+        for job in jobs:
+            yield _timed_load(job)
+        return
+
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap_unordered(_timed_load, jobs):
+            yield result
+    finally:
+        pool.terminate()
+
+
+def add_data_files(data_collection, patterns, factory=None, workers=None,
+                   interval=0.25, **kwargs):
+    """
+    Load files in parallel, and add them to a data collection.
+
+    Data are added as they finish loading. Everything which finished
+    within ``interval`` seconds is added together, with one call to
+    :meth:`~glue.core.data_collection.DataCollection.extend`.
+
+    A file which cannot be loaded is reported with a warning, and
+    does not stop the other files from loading.
+
+    :param data_collection: The DataCollection to add data to
+    :param patterns: Paths, globs or directories to load
+                     (see :func:`expand_data_paths`)
+    :param factory: The factory to use for every file.
+                    Defaults to :func:`auto_data`
+    :param workers: Number of loader threads. Defaults to the number of CPUs
+    :param interval: Minimum time, in seconds, between additions to the
+                     data collection
+
+    Extra keywords are passed to :func:`load_data`
+
+    :returns: A list of :class:`LoadResult` objects, one for each file
+    """
+    paths = expand_data_paths(patterns)
+    results = []
+    batch = []
+    last = time()
+
+    for result in iter_load_data(paths, factory=factory,
+                                 workers=workers, **kwargs):
+        results.append(result)
+        if result.error is not None:
+            warnings.warn("Could not load %s: %s" % (result.path,
+                                                     result.error))
+            continue
+
+        batch.extend(as_list(result.data))
+        batch[-1]._load_log.watch()
+        if time() - last >= interval:
+            data_collection.extend(batch)
+            batch = []
+            last = time()
+
+    data_collection.extend(batch)
+    return results
+
+
+def start_loading_data(paths, factory=None, workers=None, **kwargs):
+    """
+    Start loading files in parallel, on a background thread.
+
+    This returns immediately. The caller should poll the returned queue
+    (e.g. from a GUI timer), add the data to a data collection, and
+    call :meth:`LoadLog.watch` for each loaded file, on the main thread.
+
+    :param paths: A list of files to load (see :func:`expand_data_paths`)
+    :param factory: The factory to use for every file.
+                    Defaults to :func:`auto_data`
+    :param workers: Number of loader threads. Defaults to the number of CPUs
+
+    Extra keywords are passed to :func:`load_data`
+
+    :returns: A queue, which receives a :class:`LoadResult` for each
+              file as it finishes, followed by None once every file
+              has been loaded
+    """
+    results = six.moves.queue.Queue()
+
+    def run():
+        try:
+            for result in iter_load_data(paths, factory=factory,
+                                         workers=workers, **kwargs):
+                results.put(result)
+        finally:
+            results.put(None)
+
+    thread = Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return results
+
+
 def data_label(path):
     """Convert a file path into a data label, by stripping out
     slashes, file extensions, etc."""
@@ -357,34 +807,34 @@ def gridded_data(filename, format='auto', **kwargs):
     if format == 'auto':
         format = file_format(filename)
 
-    # Read in the data
+    # Open the data. Numerical arrays are read lazily,
+    # when (and where) they are first accessed
     if is_fits(filename):
-        from ..external.astro import fits
-        arrays = extract_data_fits(filename, **kwargs)
-        header = fits.getheader(filename)
+        arrays = extract_data_fits(filename, lazy=True, **kwargs)
+        header = file_info(filename).fits_headers[0][1]
         result.coords = coordinates_from_header(header)
     elif is_hdf5(filename):
-        arrays = extract_data_hdf5(filename, **kwargs)
+        arrays = extract_data_hdf5(filename, lazy=True, **kwargs)
     else:
         raise Exception("Unkonwn format: %s" % format)
 
     for component_name in arrays:
-        comp = Component.autotyped(arrays[component_name])
+        source = arrays[component_name]
+        if np.issubdtype(source.dtype, np.number):
+            comp = LazyComponent(source)
+        else:
+            comp = Component.autotyped(source)
         result.add_component(comp, component_name)
     return result
 
 
 def is_gridded_data(filename, **kwargs):
-    if is_hdf5(filename):
+    info = file_info(filename)
+    if info.is_hdf5:
         return True
 
-    from ..external.astro import fits
-    if is_fits(filename):
-        with fits.open(filename) as hdulist:
-            for hdu in hdulist:
-                if not isinstance(hdu, (fits.PrimaryHDU, fits.ImageHDU)):
-                    return False
-            return True
+    if info.is_fits:
+        return all(is_image for is_image, _ in info.fits_headers)
     return False
 
 
@@ -421,21 +871,7 @@ def is_casalike(filename, **kwargs):
     Check if a file is a CASA like cube,
     with (P, P, V, Stokes) layout
     """
-    from ..external.astro import fits
-
-    if not is_fits(filename):
-        return False
-    with fits.open(filename) as hdulist:
-        if len(hdulist) != 1:
-            return False
-        if hdulist[0].header['NAXIS'] != 4:
-            return False
-
-        from astropy.wcs import WCS
-        w = WCS(hdulist[0].header)
-
-    ax = [a.get('coordinate_type') for a in w.get_axis_types()]
-    return ax == ['celestial', 'celestial', 'spectral', 'stokes']
+    return file_info(filename).is_casalike
 
 
 casalike_cube.label = 'CASA PPV Cube'
@@ -591,9 +1027,16 @@ def panda_process(indf):
     Build a data set from a table using pandas. This attempts to respect
     categorical data input by letting pandas.read_csv infer the type
 
+    """
+    return _panda_process_columns(indf.iteritems())
+
+
+def _panda_process_columns(columns):
+    """
+    Build a data set from an iterable of (name, pandas.Series) pairs
     """
     result = Data()
-    for name, column in indf.iteritems():
+    for name, column in columns:
         if (column.dtype == np.object) | (column.dtype == np.bool):
             # try to salvage numerical data
             coerced = column.convert_objects(convert_numeric=True)
@@ -638,45 +1081,247 @@ set_default_factory('xls', panda_read_excel)
 set_default_factory('xlsx', panda_read_excel)
 
 
+#: Bytes read from the start of a table, to sniff its delimiter and columns
+TABLE_SAMPLE_SIZE = 2 ** 20
+
+#: Tables larger than this many bytes are parsed in parallel chunks
+TABLE_CHUNK_SIZE = 2 ** 26
+
+
+def _parser_error():
+    try:
+        from pandas.parser import CParserError
+    except ImportError:
+        try:
+            from pandas._parser import CParserError
+        except ImportError:  # pandas >= 0.20
+            from pandas.errors import ParserError as CParserError
+    return CParserError
+
+
+def _empty_data_error():
+    try:
+        from pandas.errors import EmptyDataError
+    except ImportError:
+        try:
+            from pandas.io.common import EmptyDataError
+        except ImportError:  # pandas < 0.18 raises ValueError
+            return ValueError
+    return EmptyDataError
+
+
+def _read_sample(path, size):
+    """
+    Read the first ``size`` bytes of a file, trimmed to whole lines.
+    Returns the sample, and whether it contains the whole file
+    """
+    with open(path, 'rb') as infile:
+        sample = infile.read(size + 1)
+    if len(sample) <= size:
+        return sample, True
+    return sample[:sample.rfind(b'\n') + 1], False
+
+
+def _sniff_table(table, delimiters, **kwargs):
+    """
+    Find the best delimiter with which to parse a table.
+
+    Tries each delimiter in turn, and returns the first which
+    parses the table into more than one column. Falls back to
+    a delimiter which gives one column, if nothing else works.
+
+    :param table: Path to, or file-like object holding, the table
+
+    :returns: (delimiter, DataFrame), or (None, None) if no delimiter works
+    """
+    import pandas as pd
+    errors = _parser_error(), _empty_data_error()
+
+    fallback = None, None
+    for d in delimiters:
+        if hasattr(table, 'seek'):
+            table.seek(0)
+        try:
+            indf = pd.read_csv(table, delimiter=d, **kwargs)
+        except errors:
+            continue
+
+        # ignore files parsed to empty dataframes
+        if len(indf) == 0:
+            continue
+
+        # only use files parsed to single-column dataframes
+        # if we don't find a better strategy
+        if len(indf.columns) < 2:
+            if fallback[1] is None:
+                fallback = d, indf
+            continue
+
+        return d, indf
+
+    return fallback
+
+
+def _chunk_ranges(path, start, chunk_size):
+    """
+    Split a file into byte ranges of roughly ``chunk_size``,
+    starting at ``start``, with each range ending on a newline
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as infile:
+        while start < size:
+            stop = start + chunk_size
+            if stop < size:
+                infile.seek(stop)
+                infile.readline()
+                stop = infile.tell()
+            stop = min(stop, size)
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def _read_table_chunk(args):
+    """
+    Parse the rows in a byte range of a table, on a worker process
+
+    :returns: A list of column arrays
+    """
+    import pandas as pd
+
+    path, start, stop, delimiter, names = args
+    with open(path, 'rb') as infile:
+        infile.seek(start)
+        chunk = infile.read(stop - start)
+    df = pd.read_csv(six.BytesIO(chunk), delimiter=delimiter,
+                     header=None, names=names)
+    return [df[name].values for name in names]
+
+
+def _parallel_read_table(path, start, delimiter, sample, progress=None):
+    """
+    Parse a table in byte-range chunks, on a process pool
+
+    :param path: Path to the table
+    :param start: Byte offset of the first row (after the header)
+    :param delimiter: The column delimiter
+    :param sample: A DataFrame parsed from the start of the table,
+                   which sets the column names
+    :param progress: Optional function, called with the fraction
+                     of the table which has been parsed
+
+    :returns: A list of (name, pandas.Series) pairs
+    """
+    import multiprocessing
+    import pandas as pd
+
+    names = list(sample.columns)
+    ranges = _chunk_ranges(path, start, TABLE_CHUNK_SIZE)
+    total = ranges[-1][1] - start
+    jobs = [(path, lo, hi, delimiter, names) for lo, hi in ranges]
+
+    chunks = []
+    # spawned, as tables are often read from loader threads
+    pool = process_pool(min(len(jobs), multiprocessing.cpu_count()))
+    try:
+        # imap keeps the chunks in file order
+        for (lo, hi), chunk in zip(ranges, pool.imap(_read_table_chunk, jobs)):
+            chunks.append(chunk)
+            if progress is not None:
+                progress((hi - start) / total)
+    finally:
+        pool.terminate()
+
+    # copy each column straight into a single preallocated array
+    nrows = sum(len(chunk[0]) for chunk in chunks)
+    columns = []
+    for i, name in enumerate(names):
+        parts = [chunk[i] for chunk in chunks]
+        dtype = sample[name].dtype
+        if any(p.dtype != dtype for p in parts):
+            dtype = np.result_type(*parts)
+        values = np.empty(nrows, dtype=dtype)
+        offset = 0
+        for p in parts:
+            values[offset: offset + len(p)] = p
+            offset += len(p)
+        columns.append((name, pd.Series(values)))
+    return columns
+
+
+def _can_chunk(sample, kwargs):
+    """
+    Whether a table can safely be split into chunks on newlines.
+    Quoted fields could hide newlines, and keyword arguments
+    could change which lines are rows.
+    """
+    if kwargs:
+        return False
+    return b'"' not in sample and b"'" not in sample
+
+
+def _report(result, progress):
+    if progress is not None:
+        progress(1)
+    return result
+
+
+def _header_end(sample):
+    """ Byte offset of the first row, after the header line """
+    start = len(sample) - len(sample.lstrip(b'\r\n'))
+    return sample.index(b'\n', start) + 1
+
+
 def pandas_read_table(path, **kwargs):
     """ A factory for reading tabular data using pandas
+
+    The delimiter is chosen by parsing a sample from the start of
+    the file. Large files are then parsed in chunks, in parallel.
+
     :param path: path/to/file
-    :param kwargs: All kwargs are passed to pandas.read_csv
+    :param progress: Optional function, called with the fraction
+                     of the file which has been parsed
+    :param kwargs: All other kwargs are passed to pandas.read_csv
     :returns: :class:`glue.core.data.Data` object
     """
     import pandas as pd
-    try:
-        from pandas.parser import CParserError
-    except ImportError:
-        from pandas._parser import CParserError
 
     # iterate over common delimiters to search for best option
     delimiters = kwargs.pop('delimiter', [None] + list(',|\t '))
+    progress = kwargs.pop('progress', None)
 
-    fallback = None
-
-    for d in delimiters:
-        try:
-            indf = pd.read_csv(path, delimiter=d, **kwargs)
-
-            # ignore files parsed to empty dataframes
-            if len(indf) == 0:
-                continue
+    sample, complete = _read_sample(path, TABLE_SAMPLE_SIZE)
+    compressed = sample.startswith(b'\x1f\x8b') or sample.startswith(b'BZh')
 
-            # only use files parsed to single-column dataframes
-            # if we don't find a better strategy
-            if len(indf.columns) < 2:
-                fallback = indf
-                continue
+    # pick the delimiter using a sample, so a wrong guess is cheap
+    indf = None
+    if not complete and not compressed:
+        d, indf = _sniff_table(six.BytesIO(sample), delimiters, **kwargs)
 
-            return panda_process(indf)
+    if (indf is not None and os.path.getsize(path) > TABLE_CHUNK_SIZE and
+            _can_chunk(sample, kwargs)):
+        try:
+            columns = _parallel_read_table(path, _header_end(sample), d,
+                                           indf, progress=progress)
+        except (_parser_error(), ValueError):
+            pass  # chunks disagreed with the sample -- parse serially
+        else:
+            return _panda_process_columns(columns)
 
-        except CParserError:
-            continue
+    if indf is not None:
+        try:
+            indf = pd.read_csv(path, delimiter=d, **kwargs)
+        except (_parser_error(), _empty_data_error()):
+            pass  # the rest of the file disagrees with the sample
+        else:
+            return _report(panda_process(indf), progress)
 
-    if fallback is not None:
-        return panda_process(fallback)
-    raise IOError("Could not parse %s using pandas" % path)
+    # parse the whole file, trying each delimiter
+    d, indf = _sniff_table(path, delimiters, **kwargs)
+    if indf is None:
+        raise IOError("Could not parse %s using pandas" % path)
+    return _report(panda_process(indf), progress)
 
 pandas_read_table.label = "Pandas Table"
 pandas_read_table.identifier = has_extension('csv csv txt tsv tbl dat')
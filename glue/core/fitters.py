@@ -9,13 +9,15 @@ help with using custom fitting utilities in Glue.
 import numpy as np
 
 from .simpleforms import IntOption, Option
+from .util import broadcast_to, process_pool
 
 
 __all__ = ['BaseFitter1D',
            'PolynomialFitter',
            'AstropyFitter1D',
            'SimpleAstropyGaussianFitter',
-           'BasicGaussianFitter']
+           'BasicGaussianFitter',
+           'CubeFitter']
 
 
 class BaseFitter1D(object):
@@ -136,6 +138,79 @@ class BaseFitter1D(object):
                         constraints=self.constraints,
                         **self.options)
 
+    def build_and_fit_batch(self, x, y, dy=None):
+        """
+        Like :meth:`build_and_fit`, for many profiles at once
+        (see :meth:`fit_batch`)
+        """
+        x = np.asarray(x).ravel()
+        y = np.atleast_2d(y)
+        if dy is not None:
+            dy = np.asarray(dy)
+
+        return self.fit_batch(x, y, dy=dy,
+                              constraints=self.constraints,
+                              **self.options)
+
+    def fit_batch(self, x, y, dy=None, constraints=None, **options):
+        """
+        Fit the model to many profiles, which share the same x values.
+
+        Subclasses can override this with a vectorized implementation.
+        By default, each profile is passed to :meth:`fit` in turn,
+        without its non-finite values. If :meth:`parameter_values` is
+        implemented, each fit starts from the parameters of the previous
+        fit.
+
+        :param x: The x values of the data
+        :type x: :class:`numpy.ndarray`
+        :param y: The y values of each profile, with shape (nprofile, nx)
+        :type y: :class:`numpy.ndarray`
+        :param dy: 1 sigma uncertainties, broadcastable to the shape of y
+                   (optional)
+        :param constraints: The constraints to use. Defaults to
+                            :attr:`constraints`
+        :param options: kwargs for model hyperparameters.
+
+        :returns: A list of the fit result for each profile, or None
+                  where a fit failed (raising ValueError, RuntimeError
+                  or LinAlgError)
+        """
+        if constraints is None:
+            constraints = self.constraints
+        if dy is not None:
+            dy = broadcast_to(dy, y.shape)
+
+        result = []
+        previous = None
+        for i, row in enumerate(y):
+            ok = np.isfinite(row)
+            c = constraints
+            if previous is not None:
+                c = dict((k, dict(v)) for k, v in constraints.items())
+                for k in previous:
+                    v = c.setdefault(k, dict(value=None, fixed=False,
+                                             limits=None))
+                    if not v['fixed']:
+                        v['value'] = previous[k]
+
+            fit = previous = None
+            if ok.any():
+                err = None if dy is None else dy[i][ok]
+                try:
+                    fit = self.fit(x[ok], row[ok], dy=err, constraints=c,
+                                   **options)
+                except (ValueError, RuntimeError,
+                        np.linalg.LinAlgError):
+                    pass  # failed fits are reported as None
+            if fit is not None:
+                try:
+                    previous = self.parameter_values(fit)
+                except NotImplementedError:
+                    pass
+            result.append(fit)
+        return result
+
     def fit(self, x, y, dy, constraints, **options):
         """
         Fit the model to data.
@@ -156,6 +231,19 @@ class BaseFitter1D(object):
 
         raise NotImplementedError()
 
+    def parameter_values(self, fit_result):
+        """
+        The fitted value of each model parameter.
+
+        **This must be overridden in a subclass** to fit cubes with
+        :class:`CubeFitter`
+
+        :param fit_result: The result from the fit method
+
+        :returns: A dict mapping ``{parameter_name: value}``
+        """
+        raise NotImplementedError()
+
     def predict(self, fit_result, x):
         """
         Evaulate the model at a set of locations.
@@ -202,6 +290,10 @@ class AstropyFitter1D(BaseFitter1D):
         model, _ = fit_result
         return model(x)
 
+    def parameter_values(self, fit_result):
+        model, _ = fit_result
+        return dict((p, getattr(model, p).value) for p in model.param_names)
+
     def summarize(self, fit_result, x, y, dy=None):
         model, fitter = fit_result
         result = [_report_fitter(fitter), ""]
@@ -260,14 +352,163 @@ class AstropyFitter1D(BaseFitter1D):
 
 
 def _gaussian_parameter_estimates(x, y, dy):
-
-    amplitude = np.percentile(y, 95)
-    y = np.maximum(y / y.sum(), 0)
-    mean = (x * y).sum()
-    stddev = np.sqrt((y * (x - mean) ** 2).sum())
+    # y may also be a 2D array of profiles
+    amplitude = np.percentile(y, 95, axis=-1)
+    y = np.maximum(y / y.sum(axis=-1, keepdims=True), 0)
+    mean = (x * y).sum(axis=-1)
+    stddev = np.sqrt((y * (x - np.expand_dims(mean, -1)) ** 2).sum(axis=-1))
     return dict(mean=mean, stddev=stddev, amplitude=amplitude)
 
 
+def _fit_gaussians(x, y, weights, params, iterations=200, tol=1e-10):
+    """
+    Fit a Gaussian to many profiles at once, with a vectorized
+    Levenberg-Marquardt least-squares fit
+
+    The damping of each profile is updated from the ratio of the actual
+    to the predicted reduction in chi^2 (Nielsen's rule), and a fit
+    converges once an accepted step reduces chi^2 by less than a
+    fraction tol.
+
+    :param x: The x values, shape (nx,)
+    :param y: The profiles, shape (nprofile, nx)
+    :param weights: The weight of each residual, shape (nprofile, nx)
+    :param params: Initial (amplitude, mean, stddev), shape (nprofile, 3)
+
+    :returns: The fitted parameters, shape (nprofile, 3), and whether
+              each fit converged within the given number of iterations
+    """
+    evaluate = BasicGaussianFitter.eval
+    deriv = BasicGaussianFitter.fit_deriv
+
+    def chi2(p, rows):
+        resid = evaluate(x, *p.T[:, :, None]) - y[rows]
+        return (weights[rows] * resid ** 2).sum(axis=1), resid
+
+    params = np.array(params, dtype=float)
+    n = params.shape[0]
+    rows = np.arange(n)
+    cost, resid = chi2(params, rows)
+    damping = np.ones(n)
+    growth = np.ones(n) * 2
+    converged = np.zeros(n, dtype=bool)
+
+    for _ in range(iterations):
+        if rows.size == 0:
+            break
+        p = params[rows]
+        mu = damping[rows][:, None]
+
+        # normal equations of each profile
+        jac = np.concatenate([d[..., None] for d in
+                              deriv(x, *p.T[:, :, None])], axis=-1)
+        wjac = (jac * weights[rows][:, :, None]).transpose(0, 2, 1)
+        jtj = np.einsum('nij,njk->nik', wjac, jac)
+        grad = np.einsum('nij,nj->ni', wjac, resid)
+
+        scale = jtj[:, [0, 1, 2], [0, 1, 2]].copy()
+        jtj[:, [0, 1, 2], [0, 1, 2]] += mu * scale
+        try:
+            step = np.linalg.solve(jtj, grad[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:  # degenerate profiles
+            pinv = np.array([np.linalg.pinv(m) for m in jtj])
+            step = np.einsum('nij,nj->ni', pinv, grad)
+
+        trial = p - step
+        new_cost, new_resid = chi2(trial, rows)
+        reduction = cost[rows] - new_cost
+        better = reduction > 0
+
+        # only accepted steps which barely reduce chi^2 signal
+        # convergence -- a rejected step only means the damping
+        # is too low. Once even tiny steps along the gradient fail
+        # (e.g. for an exact fit), the fit is at a minimum
+        done = better & (reduction <= tol * cost[rows])
+        done |= damping[rows] > 1e10
+        converged[rows[done]] = True
+
+        # the reduction predicted by the linearized model
+        predicted = (step * (mu * scale * step + grad)).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(predicted > 0, reduction / predicted, 0)
+        damping[rows] *= np.where(better,
+                                  np.maximum(1 / 3., 1 - (2 * ratio - 1) ** 3),
+                                  growth[rows])
+        growth[rows] = np.where(better, 2, growth[rows] * 2)
+
+        accept = rows[better]
+        params[accept] = trial[better]
+        resid[better] = new_resid[better]
+        cost[accept] = new_cost[better]
+
+        rows, resid = rows[~done], resid[~done]
+
+    params[:, 2] = np.abs(params[:, 2])
+    return params, converged
+
+
+def _fit_gaussian_batch(x, y, dy=None, start=None, neighbours=True):
+    """
+    Fit a Gaussian to many profiles at once, with :func:`_fit_gaussians`.
+    Non-finite values are given no weight.
+
+    Noisy profiles can send the vectorized fit far outside the data, or
+    stop it from converging. If neighbours is True, these are fit again,
+    starting from the parameters fit to their nearest preceding (or,
+    for the first profiles, following) neighbour. Those which still
+    fail should be fit again one at a time.
+
+    :param x: The x values, shape (nx,)
+    :param y: The profiles, shape (nprofile, nx)
+    :param dy: Optional 1 sigma uncertainties, broadcastable to y
+    :param start: Optional dict of initial values of some parameters,
+                  either one value or one per profile, used instead of
+                  the estimates from the data
+
+    :returns: (good, redo, params). good is a boolean array marking the
+              successful fits, redo the indices of the profiles to fit
+              again, and params the fitted (amplitude, mean, stddev)
+              of each profile
+    """
+    y = np.asarray(y, dtype=float)
+    ok = np.isfinite(y)
+    weights = ok.astype(float)
+    if dy is not None:
+        weights = np.where(ok, 1. / np.asarray(dy) ** 2, 0)
+    y = np.where(ok, y, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        init = _gaussian_parameter_estimates(x, y, dy)
+    init.update(start or {})
+    names = ['amplitude', 'mean', 'stddev']
+    init = np.column_stack([broadcast_to(init[p], y.shape[:1])
+                            for p in names])
+
+    enough = ok.sum(axis=1) >= 3
+    valid = enough & np.isfinite(init).all(axis=1)
+    params = np.zeros(init.shape) * np.nan
+    converged = np.zeros(valid.shape, dtype=bool)
+    params[valid], converged[valid] = _fit_gaussians(
+        x, y[valid], weights[valid], init[valid])
+
+    with np.errstate(invalid='ignore'):
+        inside = (params[:, 1] >= np.min(x)) & (params[:, 1] <= np.max(x))
+    good = valid & converged & inside & np.isfinite(params).all(axis=1)
+    redo = np.flatnonzero(enough & ~good)
+    if not neighbours or redo.size == 0 or not good.any():
+        return good, np.flatnonzero(valid & ~good), params
+
+    fitted = np.flatnonzero(good)
+    nearest = fitted[np.maximum(np.searchsorted(fitted, redo) - 1, 0)]
+    seed = dict(zip(names, params[nearest].T))
+    err = None if dy is None else broadcast_to(dy, ok.shape)[redo]
+    good2, redo2, params2 = _fit_gaussian_batch(
+        x, np.where(ok, y, np.nan)[redo], err, seed, neighbours=False)
+    params[redo[good2]] = params2[good2]
+    good[redo[good2]] = True
+    return good, redo[redo2], params
+
+
 class BasicGaussianFitter(BaseFitter1D):
 
     """
@@ -303,6 +544,10 @@ class BasicGaussianFitter(BaseFitter1D):
     def fit(self, x, y, dy, constraints):
         from scipy import optimize
         init_values = _gaussian_parameter_estimates(x, y, dy)
+        # start from the given values (e.g. the fit to a neighbour)
+        for p, c in constraints.items():
+            if p in init_values and c['value'] is not None:
+                init_values[p] = c['value']
         init_values = [init_values[p] for p in ['amplitude', 'mean', 'stddev']]
         farg = (x, y, dy)
         dfunc = None
@@ -311,9 +556,31 @@ class BasicGaussianFitter(BaseFitter1D):
             full_output=True)
         return fitparams
 
+    def fit_batch(self, x, y, dy=None, constraints=None, **options):
+        # all profiles are fit simultaneously, and those the vectorized
+        # fit does not handle well are fit one at a time
+        y = np.asarray(y, dtype=float)
+        start = dict((k, c['value']) for k, c in (constraints or {}).items()
+                     if c['value'] is not None)
+        good, redo, params = _fit_gaussian_batch(x, y, dy, start)
+        if redo.size:
+            if dy is not None:
+                dy = broadcast_to(dy, y.shape)[redo]
+            fits = super(BasicGaussianFitter, self).fit_batch(
+                x, y[redo], dy=dy, constraints=constraints, **options)
+            for i, fit in zip(redo, fits):
+                if fit is not None and np.isfinite(fit).all():
+                    params[i] = fit
+                    params[i, 2] = abs(params[i, 2])
+                    good[i] = True
+        return [p if g else None for p, g in zip(params, good)]
+
     def predict(self, fit_result, x):
         return self.eval(x, *fit_result)
 
+    def parameter_values(self, fit_result):
+        return dict(zip(['amplitude', 'mean', 'stddev'], fit_result))
+
     def summarize(self, fit_result, x, y, dy=None):
         return ("amplitude = %e\n"
                 "mean      = %e\n"
@@ -341,6 +608,40 @@ try:
 
         parameter_guesses = staticmethod(_gaussian_parameter_estimates)
 
+        def fit_batch(self, x, y, dy=None, constraints=None, **options):
+            """
+            Fit many profiles at once, with a vectorized fit (see
+            :class:`BasicGaussianFitter`), unless a parameter is fixed
+            or limited. Profiles the vectorized fit does not handle
+            well, and all profiles with fixed or limited parameters,
+            are fit one at a time with astropy.
+            """
+            if constraints is None:
+                constraints = self.constraints
+            if any(c['fixed'] or c['limits'] for c in constraints.values()):
+                return super(SimpleAstropyGaussianFitter, self).fit_batch(
+                    x, y, dy=dy, constraints=constraints, **options)
+
+            start = dict((k, c['value']) for k, c in constraints.items()
+                         if c['value'] is not None)
+            y = np.asarray(y, dtype=float)
+            good, redo, params = _fit_gaussian_batch(x, y, dy, start)
+
+            # results look like those of fit
+            fitter = self.fitting_cls()
+            result = [None] * len(good)
+            for i in np.flatnonzero(good):
+                result[i] = self.model_cls(*params[i]), fitter
+
+            if redo.size:
+                if dy is not None:
+                    dy = broadcast_to(dy, y.shape)[redo]
+                fits = super(SimpleAstropyGaussianFitter, self).fit_batch(
+                    x, y[redo], dy=dy, constraints=constraints, **options)
+                for i, fit in zip(redo, fits):
+                    result[i] = fit
+            return result
+
     GaussianFitter = SimpleAstropyGaussianFitter
 
 except ImportError:
@@ -365,16 +666,300 @@ class PolynomialFitter(BaseFitter1D):
 
         return np.polyfit(x, y, degree, w=w)
 
+    def fit_batch(self, x, y, dy=None, constraints=None, degree=2):
+        """
+        Fit a ``degree``-th order polynomial to many profiles.
+
+        Profiles without missing values are fit with a single
+        least-squares solve, with one right-hand side per profile.
+        """
+        y = np.asarray(y, dtype=float)
+        shared = np.isfinite(y).all(axis=1)
+        if dy is not None and np.ndim(dy) > 1:
+            shared[:] = False
+
+        # profiles with missing values, or their own uncertainties,
+        # are fit one at a time
+        result = [None] * y.shape[0]
+        rows = np.flatnonzero(~shared)
+        if rows.size > 0:
+            err = None if dy is None else broadcast_to(dy, y.shape)[rows]
+            fits = super(PolynomialFitter, self).fit_batch(
+                x, y[rows], err, constraints, degree=degree)
+            for i, fit in zip(rows, fits):
+                result[i] = fit
+
+        rows = np.flatnonzero(shared)
+        if rows.size == 0:
+            return result
+
+        # weighted like np.polyfit
+        lhs = np.vander(x, degree + 1)
+        rhs = y[rows].T
+        w = self._sigma_to_weights(dy)
+        if w is not None:
+            lhs = lhs * w[:, None]
+            rhs = rhs * w[:, None]
+        scale = np.sqrt((lhs * lhs).sum(axis=0))
+        scale[scale == 0] = 1
+        # the default cutoff of numpy >= 1.14
+        rcond = np.finfo(float).eps * max(lhs.shape)
+        coeffs = np.linalg.lstsq(lhs / scale, rhs, rcond=rcond)[0]
+        coeffs = (coeffs.T / scale)
+
+        for i, c in zip(rows, coeffs):
+            result[i] = c
+        return result
+
     def predict(self, fit_result, x):
         return np.polyval(fit_result, x)
 
+    def parameter_values(self, fit_result):
+        # c<n> is the coefficient of x ** n
+        degree = len(fit_result) - 1
+        return dict(('c%i' % (degree - i), c)
+                    for i, c in enumerate(fit_result))
+
     def summarize(self, fit_result, x, y, dy=None):
         return "Coefficients:\n" + "\n".join("%e" % coeff
                                              for coeff in fit_result.tolist())
 
 
+def _fit_spectra(job):
+    """
+    Fit a block of spectra
+
+    :returns: A list of parameter_values dicts, or None for failed fits
+    """
+    fitter, x, spectra, constraints, options = job
+    results = fitter.fit_batch(x, spectra, constraints=constraints,
+                               **options)
+    return [None if r is None else fitter.parameter_values(r)
+            for r in results]
+
+
+def _fit_chunk(job):
+    """
+    Fit the spectra of a chunk of pixels
+
+    :returns: The pixels, and the output of :func:`_fit_spectra`
+    """
+    pixels, job = job
+    return pixels, _fit_spectra(job)
+
+
+class CubeFitter(object):
+
+    """
+    Fit a model to the spectrum at every pixel of a cube.
+
+    Spectra are fit in chunks of neighbouring pixels, on a process
+    pool. Each chunk is passed to the fitter's
+    :meth:`~BaseFitter1D.fit_batch` method, which either fits the
+    chunk in one vectorized step, or fits each pixel starting from
+    the parameters fit to the previous pixel. The result is a map of
+    each fitted parameter, which can be added to the data as new
+    components.
+
+    The cube is read one block of rows at a time, as the chunks are
+    handed to the pool, so only a few chunks of spectra are in memory
+    at once. The fitter, including its constraints and options, is
+    pickled and sent to each process.
+
+    :meth:`run` is usually called from a background thread. Processes
+    are therefore spawned rather than forked where the platform allows
+    it (see :func:`~glue.core.util.process_pool`). On Python 2 they
+    are forked, which can hang if another thread holds a lock at that
+    moment.
+    """
+
+    def __init__(self, fitter, data, attribute, zaxis, subset=None,
+                 xlim=None, workers=None, chunk_size=64):
+        """
+        :param fitter: A :class:`BaseFitter1D` instance, which implements
+                       :meth:`~BaseFitter1D.parameter_values`
+        :param data: The :class:`~glue.core.data.Data` cube to fit
+        :param attribute: The :class:`~glue.core.data.ComponentID` to fit
+        :param zaxis: The spectral axis
+        :param subset: Optional :class:`~glue.core.subset.Subset`. If
+                       provided, only pixels with at least one channel in
+                       the subset are fit
+        :param xlim: Optional (lo, hi) range of world coordinates along
+                     zaxis to fit
+        :param workers: Number of processes. Defaults to the number of CPUs.
+                        If 1, spectra are fit in the calling process
+        :param chunk_size: Number of pixels sent to a process at once
+        """
+        self.fitter = fitter
+        self.data = data
+        self.attribute = attribute
+        self.zaxis = zaxis
+        self.subset = subset
+        self.xlim = xlim
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._cancelled = False
+
+    def cancel(self):
+        """ Stop a running fit. :meth:`run` then returns None """
+        self._cancelled = True
+
+    @property
+    def shape(self):
+        """ The shape of the parameter maps """
+        return tuple(s for i, s in enumerate(self.data.shape)
+                     if i != self.zaxis)
+
+    def _pixels(self):
+        """ The flat indices of the pixels to fit """
+        if self.subset is None:
+            return np.arange(int(np.prod(self.shape)))
+        return np.flatnonzero(self.subset.to_mask().any(axis=self.zaxis))
+
+    def _blocks(self):
+        """
+        How the cube is read: in blocks of whole rows along the first
+        spatial axis, each covering at least one chunk where possible
+
+        :returns: The axis, the number of pixels in each row, and the
+                  number of rows in each block
+        """
+        axis = 1 if self.zaxis == 0 else 0
+        row = int(np.prod(self.shape[1:]))
+        return axis, row, max(-(-self.chunk_size // max(row, 1)), 1)
+
+    def _chunks(self, pixels):
+        """
+        Split the pixels to fit into chunks, which do not straddle
+        blocks
+
+        :returns: A list of (first row of the block, pixels) tuples
+        """
+        _, row, rows = self._blocks()
+        block = row * rows
+        result = []
+        for lo in range(0, int(np.prod(self.shape)), block):
+            start, stop = np.searchsorted(pixels, [lo, lo + block])
+            for i in range(start, stop, self.chunk_size):
+                chunk = pixels[i: min(i + self.chunk_size, stop)]
+                result.append((lo // row, chunk))
+        return result
+
+    def _jobs(self, chunks):
+        """
+        Read the spectra of each chunk, one block at a time
+
+        :returns: A generator of (pixels, job) tuples, for
+                  :func:`_fit_chunk`
+        """
+        data, zaxis = self.data, self.zaxis
+
+        view = [0] * data.ndim
+        view[zaxis] = slice(None)
+        x = data[data.get_world_component_id(zaxis), tuple(view)].ravel()
+        channels = np.ones(x.size, dtype=bool)
+        if self.xlim is not None:
+            lo, hi = min(self.xlim), max(self.xlim)
+            channels = (x >= lo) & (x <= hi)
+
+        axis, row, rows = self._blocks()
+        view = [slice(None)] * data.ndim
+        constraints = self.fitter.constraints
+        options = self.fitter.options
+        block = None
+        for first, chunk in chunks:
+            if block is None or block[0] != first:
+                view[axis] = slice(first, first + rows)
+                spectra = data[self.attribute, tuple(view)]
+                spectra = np.asarray(spectra)
+                spectra = np.rollaxis(spectra, zaxis, spectra.ndim)
+                block = first, spectra.reshape(-1, x.size)[:, channels]
+            spectra = block[1][chunk - first * row]
+            yield chunk, (self.fitter, x[channels], spectra,
+                          constraints, options)
+
+    def run(self, progress=None):
+        """
+        Fit every pixel
+
+        :param progress: Optional function, called with the number of
+                         pixels fit so far, and the total number to fit
+
+        :returns: A dict mapping each parameter name to a map of its
+                  fitted values, which are NaN where the fit failed or
+                  was not attempted. Returns None if cancelled.
+        """
+        from multiprocessing import cpu_count
+
+        self._cancelled = False
+        pixels = self._pixels()
+        chunks = self._chunks(pixels)
+        jobs = self._jobs(chunks)
+
+        total = pixels.size
+        workers = min(self.workers or cpu_count(), len(chunks))
+        if workers <= 1:
+            pool = None
+            results = (_fit_chunk(job) for job in jobs)
+        else:
+            pool = process_pool(workers)
+            # imap keeps the chunks in order, and reads the jobs from
+            # the generator as the processes take them
+            results = pool.imap(_fit_chunk, jobs)
+
+        size = int(np.prod(self.shape))
+        maps = {}
+        done = 0
+        try:
+            for chunk, result in results:
+                if self._cancelled:
+                    return
+                for pixel, params in zip(chunk, result):
+                    if params is None:
+                        continue
+                    for k, v in params.items():
+                        if k not in maps:
+                            maps[k] = np.zeros(size) * np.nan
+                        maps[k][pixel] = v
+                done += chunk.size
+                if progress is not None:
+                    progress(done, total)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        return dict((k, v.reshape(self.shape)) for k, v in maps.items())
+
+    def add_to_data(self, maps):
+        """
+        Add parameter maps to the data, as new components
+
+        Each map is broadcast along the spectral axis. Components are
+        labeled with the fitter label and parameter name, and components
+        added by earlier fits with the same labels are updated.
+
+        :param maps: The output of :meth:`run`
+
+        :returns: A list of the :class:`~glue.core.data.ComponentID`
+                  for each parameter
+        """
+        result = []
+        for name in sorted(maps):
+            values = np.expand_dims(maps[name], self.zaxis)
+            values = broadcast_to(values, self.data.shape)
+            label = '%s %s' % (self.fitter.label, name)
+
+            cid = self.data.find_component_id(label)
+            if cid is None:
+                cid = self.data.add_component(values, label)
+            else:
+                self.data.update_components({cid: values})
+            result.append(cid)
+        return result
+
+
 def _report_fitter(fitter):
-    if "nfev" in fitter.fit_info:
+    if fitter.fit_info.get('nfev') is not None:
         return "Converged in %i iterations" % fitter.fit_info['nfev']
     return 'Converged'
 
@@ -0,0 +1,255 @@
+"""
+Fast, cached histograms of Data components.
+
+A :class:`HistogramCache` holds the values of one component. The
+bin index of every value is computed once per binning, and shared by
+the parent data and each of its subsets -- a subset's counts are a
+masked bincount over the parent's bin indices, so the component is
+never fancy-indexed by the subset mask.
+
+Each :class:`~glue.core.data.Data` object keeps one cache per
+(component, log scaling), via :meth:`~glue.core.data.Data.compute_histogram`,
+so every viewer histogramming the same attribute shares the work.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+
+import numpy as np
+
+from .odict import OrderedDict
+
+__all__ = ['fast_histogram', 'HistogramCache']
+
+#: Number of values whose bin indices are computed at a time
+INDEX_CHUNK_SIZE = 2 ** 20
+
+
+def fast_histogram(values, lo, hi, nbins):
+    """Bin values into a regular 1D grid, using a single bincount
+
+    Equivalent to ``np.histogram(values, bins=nbins, range=(lo, hi))[0]``:
+    values equal to hi are counted in the last bin, and values outside
+    the range (or non-finite) are ignored.
+
+    :param values: array-like
+    :param lo: Lower edge of the first bin
+    :param hi: Upper edge of the last bin
+    :param nbins: Number of bins
+
+    :rtype: Integer array of length nbins
+    """
+    nbins = int(nbins)
+    if hi <= lo or nbins < 1:
+        return np.zeros(max(nbins, 0), dtype=int)
+    idx = bin_indices(values, lo, hi, nbins)
+    return np.bincount(idx, minlength=nbins + 1)[:nbins]
+
+
+def bin_indices(values, lo, hi, nbins):
+    """
+    Compute the histogram bin of each value.
+
+    Values outside the range (or non-finite) are assigned to an
+    overflow bin, with index nbins.
+
+    :rtype: Integer array with the same size as values, of the
+            smallest unsigned type which holds nbins (see
+            :func:`index_dtype`)
+    """
+    nbins = int(nbins)
+    values = np.asarray(values).ravel()
+    result = np.empty(values.size, dtype=index_dtype(nbins))
+
+    # indices are computed as floats a chunk at a time, so the
+    # float temporaries stay small
+    scale = nbins / (hi - lo)
+    for start in range(0, values.size, INDEX_CHUNK_SIZE):
+        v = values[start:start + INDEX_CHUNK_SIZE]
+        with np.errstate(invalid='ignore'):
+            idx = np.floor((v - lo) * scale)
+            idx[v == hi] = nbins - 1
+            idx[~((idx >= 0) & (idx < nbins))] = nbins
+        result[start:start + INDEX_CHUNK_SIZE] = idx
+    return result
+
+
+def index_dtype(nbins):
+    """
+    The smallest unsigned integer type which can hold the bin indices
+    of nbins bins, including the overflow bin
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if nbins <= np.iinfo(dtype).max:
+            return dtype
+    return np.intp
+
+
+def mask_key(mask):
+    """
+    A hashable digest of a boolean mask, used to cache the counts
+    for a subset until its mask changes
+    """
+    mask = np.asarray(mask, dtype=bool)
+    return mask.shape, hashlib.sha1(np.packbits(mask.ravel())).hexdigest()
+
+
+def _lru_set(cache, key, value, size):
+    cache[key] = value
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _lru_set_nbytes(cache, key, value, nbytes):
+    """
+    Like :func:`_lru_set`, but bound the total size of the cached
+    arrays. The newest array is always kept
+    """
+    cache[key] = value
+    while (len(cache) > 1 and
+           sum(v.nbytes for v in cache.values()) > nbytes):
+        cache.popitem(last=False)
+
+
+class HistogramCache(object):
+
+    """
+    Histogram counts for a fixed array of values, which can be quickly
+    re-computed for different binnings, and for subsets of the values.
+
+    Small arrays are binned exactly: the bin index of each value
+    is computed once per binning, and reused for every mask.
+
+    For large arrays, a fine-grained base histogram is built for each
+    mask, with a single bincount over base bin indices that are
+    computed once. The counts for any other binning are then derived
+    from its cumulative sum, without re-scanning the values. This is
+    approximate only within one base bin (1 / BASE_BINS of the data
+    range) of each bin edge. Bins narrower than MIN_BASE_BINS base
+    bins (e.g. when zoomed into a range with a few distant outliers)
+    are instead counted exactly, from the values inside the range.
+    """
+
+    # number of bins in the base histogram. With the overflow bin, base
+    # bin indices fit in 2 bytes per value
+    BASE_BINS = 2 ** 16 - 1
+    MIN_BASE_BINS = 4  # narrower bins are counted exactly
+    EXACT_LIMIT = 10 ** 6  # arrays this small are always binned directly
+    MAX_ENTRIES = 32  # number of cached count arrays
+    MAX_INDEX_BYTES = 2 ** 26  # total size of the cached bin indices
+
+    def __init__(self, values):
+        """
+        :param values: The array of values to histogram. Non-finite
+                       values are ignored.
+        """
+        self.values = np.asarray(values).ravel()
+        self._range = None
+        self._base_indices = None
+        self._indices = OrderedDict()  # binning -> bin indices
+        self._counts = OrderedDict()  # (mask key, binning) -> counts
+        self._base = OrderedDict()  # mask key -> cumulative base counts
+
+    @property
+    def size(self):
+        """The total number of values, finite or not"""
+        return self.values.size
+
+    def range(self):
+        """(min, max) of the finite values, or None if there are none"""
+        if self._range is None:
+            finite = self.values[np.isfinite(self.values)]
+            if finite.size == 0:
+                return None
+            self._range = finite.min(), finite.max()
+        return self._range
+
+    def bin_indices(self, lo, hi, nbins):
+        """
+        The bin index of every value for a given binning,
+        (see :func:`bin_indices`), cached for re-use by every mask
+        """
+        key = (lo, hi, int(nbins))
+        try:
+            return self._indices[key]
+        except KeyError:
+            pass
+        result = bin_indices(self.values, lo, hi, nbins)
+        _lru_set_nbytes(self._indices, key, result, self.MAX_INDEX_BYTES)
+        return result
+
+    def _base_cumulative(self, mask, key):
+        """Cumulative counts of the base histogram, for the given mask"""
+        if key is not None and key in self._base:
+            return self._base[key]
+
+        if self._base_indices is None:
+            lo, hi = self.range()
+            self._base_indices = bin_indices(self.values, lo, hi,
+                                             self.BASE_BINS)
+        idx = self._base_indices
+        if mask is not None:
+            idx = idx[mask.ravel()]
+        counts = np.bincount(idx, minlength=self.BASE_BINS + 1)
+        result = np.zeros(self.BASE_BINS + 1, dtype=np.int64)
+        np.cumsum(counts[:self.BASE_BINS], out=result[1:])
+
+        if key is not None:
+            _lru_set(self._base, key, result, self.MAX_ENTRIES)
+        return result
+
+    def counts(self, lo, hi, nbins, mask=None, key=None):
+        """
+        Histogram the values into nbins regular bins between lo and hi
+
+        :param mask: Optional boolean array (the same size as the values)
+                     selecting which values to count
+        :param key: Optional hashable object identifying the mask. If
+                    provided, results for this mask are cached. Ignored
+                    if mask is None. The key must change whenever the
+                    mask does (see :func:`mask_key`).
+
+        :rtype: Integer array of length nbins
+        """
+        nbins = int(nbins)
+        if mask is None:
+            key = None
+        elif key is None:
+            return self._counts_uncached(lo, hi, nbins, mask, None)
+
+        ckey = (key, lo, hi, nbins)
+        try:
+            return self._counts[ckey]
+        except KeyError:
+            pass
+        result = self._counts_uncached(lo, hi, nbins, mask, key)
+        _lru_set(self._counts, ckey, result, self.MAX_ENTRIES)
+        return result
+
+    def _counts_uncached(self, lo, hi, nbins, mask, key):
+        rng = self.range()
+        if hi <= lo or nbins < 1 or rng is None:
+            return np.zeros(max(nbins, 0), dtype=int)
+
+        if self.size <= self.EXACT_LIMIT or rng[1] <= rng[0]:
+            idx = self.bin_indices(lo, hi, nbins)
+            if mask is not None:
+                idx = idx[mask.ravel()]
+            return np.bincount(idx, minlength=nbins + 1)[:nbins]
+
+        vlo, vhi = rng
+        scale = self.BASE_BINS / (vhi - vlo)
+        if (hi - lo) / nbins * scale < self.MIN_BASE_BINS:
+            values = self.values
+            with np.errstate(invalid='ignore'):
+                keep = (values >= lo) & (values <= hi)
+            if mask is not None:
+                keep &= mask.ravel()
+            return fast_histogram(values[keep], lo, hi, nbins)
+
+        cumulative = self._base_cumulative(mask, key)
+        edges = np.linspace(lo, hi, nbins + 1)
+        below = np.interp((edges - vlo) * scale,
+                          np.arange(cumulative.size), cumulative)
+        return np.diff(np.rint(below).astype(np.int64))
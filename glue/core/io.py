@@ -1,39 +1,274 @@
 from __future__ import absolute_import, division, print_function
 
+from threading import Lock, RLock
 
-def extract_data_fits(filename, use_hdu='all'):
+import numpy as np
+
+from ..external import six
+
+
+class FITSImageSource(object):
+
+    """
+    Lazily read the data in a FITS image HDU.
+
+    Slicing reads only the requested region from disk, via the
+    HDU's section interface. The full array is only read (or, for
+    uncompressed files, memory mapped) when converted to an array.
+
+    The file is kept open until :meth:`close` is called. It is
+    re-opened if the data are accessed again afterwards.
+
+    Sources may be read from several threads at once (e.g. by
+    :class:`~glue.core.aggregate.Aggregate`). Section reads of files
+    which are not memory mapped (e.g. gzipped files) seek and read one
+    shared file object, so they, and re-opening the file, are guarded
+    by a lock.
+    """
+
+    def __init__(self, hdu, hdulist=None):
+        """
+        :param hdu: The image HDU to read
+        :param hdulist: The HDUList that hdu belongs to, which is closed
+                        by :meth:`close`
+        """
+        self._hdu = hdu
+        self._hdulist = hdulist
+        self._filename = None
+        self._index = None
+        self._lock = RLock()
+        if hdulist is not None:
+            self._filename = hdulist.filename()
+            self._index = hdulist.index_of(hdu)
+
+    @property
+    def hdu(self):
+        with self._lock:
+            if self._hdu is None:
+                from ..external.astro import fits
+                self._hdulist = fits.open(self._filename, ignore_blank=True)
+                self._hdu = self._hdulist[self._index]
+            return self._hdu
+
+    def close(self):
+        """ Close the file, if this source can re-open it """
+        with self._lock:
+            if self._hdulist is None or self._filename is None:
+                return
+            self._hdulist.close()
+            self._hdulist = self._hdu = None
+
+    @property
+    def shape(self):
+        return tuple(self.hdu.shape)
+
+    @property
+    def dtype(self):
+        with self._lock:
+            hdu = self.hdu
+            if 'data' in hdu.__dict__:  # already loaded
+                return hdu.data.dtype
+            return np.asarray(hdu.section[(0,) * len(self.shape)]).dtype
+
+    def __getitem__(self, view):
+        with self._lock:
+            hdu = self.hdu
+            if 'data' in hdu.__dict__:
+                data = hdu.data
+            else:
+                return hdu.section[view]
+        return data[view]
+
+    def __array__(self, dtype=None):
+        with self._lock:
+            data = self.hdu.data
+        return np.asarray(data, dtype=dtype)
+
+
+# The shared handle of each HDF5 file read lazily, and the number of
+# sources using it: filename -> [h5py.File, count]
+_hdf5_files = {}
+_hdf5_lock = Lock()
+
+
+def _open_hdf5(filename, handle=None):
+    """
+    Take a reference to the shared, read-only handle of an HDF5 file
+
+    :param handle: An open handle of the file, used as the shared
+                   handle if there is no valid one yet
+
+    :returns: The shared h5py.File. Release it with :func:`_close_hdf5`
+    """
+    with _hdf5_lock:
+        entry = _hdf5_files.get(filename)
+        if entry is None or not entry[0].id.valid:
+            if handle is None or not handle.id.valid:
+                import h5py
+                handle = h5py.File(filename, 'r')
+            entry = _hdf5_files[filename] = [handle, 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def _close_hdf5(filename, handle):
+    """
+    Release a reference taken by :func:`_open_hdf5`. The file is
+    closed once no references are left
+    """
+    with _hdf5_lock:
+        entry = _hdf5_files.get(filename)
+        if entry is None or entry[0] is not handle:
+            return  # the handle was closed by its owner
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _hdf5_files[filename]
+        if handle.id.valid:
+            handle.close()
+
+
+class HDF5DatasetSource(object):
+
+    """
+    Lazily read the data in an HDF5 dataset.
+
+    Slices are expanded to the boundaries of the dataset's chunks,
+    and the last chunk-aligned block read is kept, so that nearby
+    slices (e.g. adjacent planes of a cube) do not re-read the file.
+
+    Sources of datasets in the same file share one handle, which is
+    kept open until every source has been closed (see :meth:`close`).
+    A closed source re-opens the file if its data are accessed again.
+
+    Sources may be read from several threads at once (e.g. by
+    :class:`~glue.core.aggregate.Aggregate`): reads, and the cached
+    block, are guarded by a lock. h5py serializes reads anyway.
+    """
+
+    def __init__(self, dataset):
+        self._filename = dataset.file.filename
+        self._name = dataset.name
+        self._file = _open_hdf5(self._filename, dataset.file)
+        self._dataset = self._file[self._name]
+        self._block = None  # (aligned view, array)
+        self._lock = RLock()
+
+    @property
+    def dataset(self):
+        with self._lock:
+            if self._dataset is None:
+                self._file = _open_hdf5(self._filename)
+                self._dataset = self._file[self._name]
+            return self._dataset
+
+    def close(self):
+        """
+        Release the file. It is closed once all the sources reading
+        it have been closed
+        """
+        with self._lock:
+            if self._dataset is None:
+                return
+            _close_hdf5(self._filename, self._file)
+            self._file = self._dataset = None
+            self._block = None
+
+    @property
+    def shape(self):
+        return self.dataset.shape
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    def _aligned(self, view):
+        """
+        Split a view into a chunk-aligned view, and the view into the
+        aligned block which is equivalent to the original view.
+
+        Returns None if the view cannot be aligned.
+        """
+        chunks = self.dataset.chunks
+        if not isinstance(view, tuple):
+            view = (view,)
+        if chunks is None or len(view) > len(chunks):
+            return
+        view = view + (slice(None),) * (len(chunks) - len(view))
+
+        aligned, relative = [], []
+        for v, size, chunk in zip(view, self.shape, chunks):
+            if isinstance(v, slice):
+                start, stop, step = v.indices(size)
+                if step != 1 or stop <= start:
+                    return
+            elif isinstance(v, (int, np.integer)):
+                start = v + size if v < 0 else v
+                stop = start + 1
+            else:
+                return
+            lo = start // chunk * chunk
+            hi = min(-(-stop // chunk) * chunk, size)
+            aligned.append(slice(lo, hi))
+            if isinstance(v, slice):
+                relative.append(slice(start - lo, stop - lo))
+            else:
+                relative.append(start - lo)
+        return tuple(aligned), tuple(relative)
+
+    def __getitem__(self, view):
+        split = self._aligned(view)
+        if split is None:
+            return self.dataset[view]
+
+        aligned, relative = split
+        key = tuple((s.start, s.stop) for s in aligned)
+        with self._lock:
+            if self._block is None or self._block[0] != key:
+                self._block = key, self.dataset[aligned]
+            block = self._block[1]
+        return block[relative]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.dataset[...], dtype=dtype)
+
+
+def extract_data_fits(filename, use_hdu='all', lazy=False):
     '''
     Extract non-tabular HDUs from a FITS file. If `use_hdu` is 'all', then
     all non-tabular HDUs are extracted, otherwise only the ones specified
     by `use_hdu` are extracted (`use_hdu` should then contain a list of
     integers). If the requested HDUs do not have the same dimensions, an
     Exception is raised.
+
+    If `lazy` is True, the file is left open, and each HDU is returned
+    as a :class:`FITSImageSource` rather than an array. Closing any of
+    the sources closes the file.
     '''
     from ..external.astro import fits
 
     # Read in all HDUs
-    hdulist = fits.open(filename, ignore_blank=True)
+    handle = hdulist = fits.open(filename, ignore_blank=True)
 
     # If only a subset are requested, extract those
     if use_hdu != 'all':
         hdulist = [hdulist[hdu] for hdu in use_hdu]
 
     # Now only keep HDUs that are not tables
-    for hdu in hdulist:
-        if not isinstance(hdu, fits.PrimaryHDU) and \
-                not isinstance(hdu, fits.ImageHDU):
-            hdulist.remove(hdu)
+    hdulist = [hdu for hdu in hdulist
+               if isinstance(hdu, (fits.PrimaryHDU, fits.ImageHDU))]
 
     # Check that dimensions of all HDU are the same
-    reference_shape = hdulist[0].data.shape
+    # (from the headers, without reading the data)
+    reference_shape = hdulist[0].shape
     for hdu in hdulist:
-        if hdu.data.shape != reference_shape:
+        if hdu.shape != reference_shape:
             raise Exception("HDUs are not all the same dimensions")
 
     # Extract data
     arrays = {}
     for hdu in hdulist:
-        arrays[hdu.name] = hdu.data
+        arrays[hdu.name] = FITSImageSource(hdu, handle) if lazy else hdu.data
 
     return arrays
 
@@ -42,37 +277,42 @@ def extract_hdf5_datasets(handle):
     '''
     Recursive function that returns a dictionary with all the datasets
     found in an HDF5 file or group. `handle` should be an instance of
-    h5py.highlevel.File or h5py.highlevel.Group.
+    h5py.File or h5py.Group.
     '''
 
     import h5py
 
     datasets = {}
     for group in handle:
-        if isinstance(handle[group], h5py.highlevel.Group):
+        if isinstance(handle[group], h5py.Group):
             sub_datasets = extract_hdf5_datasets(handle[group])
             for key in sub_datasets:
                 datasets[key] = sub_datasets[key]
-        elif isinstance(handle[group], h5py.highlevel.Dataset):
+        elif isinstance(handle[group], h5py.Dataset):
             datasets[handle[group].name] = handle[group]
     return datasets
 
 
-def extract_data_hdf5(filename, use_datasets='all'):
+def extract_data_hdf5(filename, use_datasets='all', lazy=False):
     '''
     Extract non-tabular datasets from an HDF5 file. If `use_datasets` is
     'all', then all non-tabular datasets are extracted, otherwise only the
     ones specified by `use_datasets` are extracted (`use_datasets` should
     then contain a list of paths). If the requested datasets do not have
     the same dimensions, an Exception is raised.
+
+    If `lazy` is True, the file is left open, and each dataset is returned
+    as an :class:`HDF5DatasetSource` rather than an array. The file is
+    closed once all of the sources have been closed.
     '''
 
     import h5py
 
     # Open file
-    file_handle = h5py.File(filename, 'r')
-
-    # Define function to read
+    if lazy:
+        file_handle = _open_hdf5(filename)
+    else:
+        file_handle = h5py.File(filename, 'r')
 
     # Read in all datasets
     datasets = extract_hdf5_datasets(file_handle)
@@ -86,17 +326,189 @@ def extract_data_hdf5(filename, use_datasets='all'):
         datasets.pop(key)
 
     # Check that dimensions of all datasets are the same
-    reference_shape = datasets[list(datasets.keys())[0]].value.shape
+    reference_shape = datasets[list(datasets.keys())[0]].shape
     for key in datasets:
-        if datasets[key].value.shape != reference_shape:
+        if datasets[key].shape != reference_shape:
             raise Exception("Datasets are not all the same dimensions")
 
+    if lazy:
+        # the sources keep the file open
+        try:
+            return dict((key, HDF5DatasetSource(datasets[key]))
+                        for key in datasets)
+        finally:
+            _close_hdf5(filename, file_handle)
+
     # Extract data
     arrays = {}
     for key in datasets:
-        arrays[key] = datasets[key].value
+        arrays[key] = datasets[key][...]
 
     # Close HDF5 file
     file_handle.close()
 
     return arrays
+
+
+#: Number of rows formatted at a time by :func:`write_csv`
+CSV_CHUNK_SIZE = 100000
+
+
+def _format_text(values, delimiter):
+    """ Format strings as a list of CSV fields, quoting them where needed """
+    special = (delimiter, '"', '\n', '\r')
+    result = []
+    for v in values:
+        v = six.text_type(v)
+        if any(s in v for s in special):
+            v = '"%s"' % v.replace('"', '""')
+        result.append(v.encode('utf-8'))
+    return result
+
+
+def _format_floats(values):
+    """
+    Format floats so that they read back as the same values.
+
+    numpy formats floats in C, but only keeps 12 significant digits on
+    Python 2 and old numpy versions. Values which do not read back
+    exactly are formatted again, with 17 digits.
+
+    :rtype: An array of bytes
+    """
+    text = values.astype(bytes)
+    redo = np.flatnonzero((text.astype(values.dtype) != values) &
+                          ~np.isnan(values))
+    if redo.size > 0:
+        text = text.astype('S32')
+        text[redo] = np.char.mod(b'%.17g', values[redo].astype(float))
+    return text
+
+
+def _format_column(values, delimiter):
+    """
+    Format a 1D array as a 2D array of bytes, with one (NUL-padded)
+    row per value
+
+    :returns: A tuple of the padded bytes, and the length of each field.
+              Fields may themselves contain NUL bytes, so the lengths
+              (rather than the padding) mark where each field ends
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'b':
+        values = values.astype(np.uint8)
+    if values.dtype.kind in 'iuf':
+        # numpy formats numbers in C
+        if values.dtype.kind == 'f':
+            text = _format_floats(values)
+        else:
+            text = values.astype(bytes)
+        lengths = np.char.str_len(text)
+    else:
+        fields = _format_text(values, delimiter)
+        lengths = np.array([len(f) for f in fields], dtype=np.intp)
+        # a plain bytes array would drop trailing NULs, so pad explicitly
+        width = max(lengths.max() if lengths.size else 0, 1)
+        text = np.array([f.ljust(width, b'\0') for f in fields],
+                        dtype='S%i' % width)
+    width = max(text.dtype.itemsize, 1)
+    text = np.ascontiguousarray(text, dtype='S%i' % width)
+    return text.view(np.uint8).reshape(-1, width), lengths
+
+
+def format_csv_rows(columns, delimiter=','):
+    """
+    Format rows of CSV text, one column at a time.
+
+    :param columns: A list of equal-length 1D arrays
+    :param delimiter: The field separator
+
+    :rtype: bytes, with one line for each row
+    """
+    fields = [_format_column(c, delimiter) for c in columns]
+    nrow = fields[0][0].shape[0] if fields else 0
+    if nrow == 0:
+        return b''
+
+    # lay out the padded fields and separators of each row side by
+    # side, then drop the padding after the end of each field
+    width = sum(f.shape[1] + 1 for f, _ in fields)
+    rows = np.zeros((nrow, width), dtype=np.uint8)
+    keep = np.ones((nrow, width), dtype=bool)
+    sep = ord(delimiter)
+    pos = 0
+    for f, lengths in fields:
+        rows[:, pos:pos + f.shape[1]] = f
+        keep[:, pos:pos + f.shape[1]] = (np.arange(f.shape[1]) <
+                                         lengths[:, np.newaxis])
+        pos += f.shape[1]
+        rows[:, pos] = sep
+        pos += 1
+    rows[:, -1] = ord('\n')
+    return rows[keep].tobytes()
+
+
+def write_csv(path, columns, names, delimiter=',', chunk_size=None):
+    """
+    Write columns of data to a CSV file.
+
+    Rows are formatted and written in chunks, so the full table is
+    never held in memory as text.
+
+    :param path: The file to write
+    :param columns: A list of array-likes, with the same number of
+                    elements. Multidimensional arrays are flattened
+    :param names: The name of each column
+    :param delimiter: The field separator
+    :param chunk_size: The number of rows to format at a time.
+                       Defaults to :data:`CSV_CHUNK_SIZE`
+    """
+    chunk_size = chunk_size or CSV_CHUNK_SIZE
+    columns = [np.asarray(c).ravel() for c in columns]
+    if len(columns) != len(names):
+        raise ValueError("Must provide a name for each column")
+    size = columns[0].size if columns else 0
+    if any(c.size != size for c in columns):
+        raise ValueError("All columns must have the same number of elements")
+
+    with open(path, 'wb') as out:
+        header = _format_text(names, delimiter)
+        out.write(delimiter.encode('ascii').join(header) + b'\n')
+        for start in range(0, size, chunk_size):
+            chunk = [c[start:start + chunk_size] for c in columns]
+            out.write(format_csv_rows(chunk, delimiter))
+
+
+def write_binary(path, columns, names):
+    """
+    Write numerical columns as one contiguous binary file, for
+    clients (e.g. web pages) which can read typed arrays directly.
+
+    Columns are written one after the other, in little-endian byte order.
+    Boolean columns are written as unsigned bytes.
+
+    :param path: The file to write
+    :param columns: A list of numerical array-likes. Multidimensional
+                    arrays are flattened
+    :param names: The name of each column
+
+    :returns: A JSON-serializable list describing each column, with its
+              name, dtype (e.g. '<f8'), byte offset and number of elements
+    """
+    manifest = []
+    offset = 0
+    with open(path, 'wb') as out:
+        for name, values in zip(names, columns):
+            values = np.asarray(values).ravel()
+            if values.dtype.kind == 'b':
+                values = values.astype(np.uint8)
+            if values.dtype.kind not in 'iuf':
+                raise TypeError("Column %s is not numerical" % name)
+            values = values.astype(values.dtype.newbyteorder('<'),
+                                   copy=False)
+            for start in range(0, values.size, CSV_CHUNK_SIZE):
+                out.write(values[start:start + CSV_CHUNK_SIZE].tobytes())
+            manifest.append(dict(name=name, dtype=values.dtype.str,
+                                 offset=offset, size=int(values.size)))
+            offset += values.nbytes
+    return manifest
@@ -0,0 +1,160 @@
+"""
+Inverted indices of key components, for fast key joins.
+
+A :class:`KeyIndex` sorts the values of a key component once, and
+stores the distinct keys alongside the (flat) positions of the elements
+with each key, in compressed form: the positions of the elements with
+key ``keys[i]`` are ``positions[offsets[i]:offsets[i + 1]]``.
+
+Looking up the elements whose key is in a set of values is then a
+binary search over the distinct keys, followed by a gather of the
+matching ranges -- rather than a comparison against every element.
+This is used to propagate subsets through
+:meth:`~glue.core.data.Data.join_on_key`, e.g. from a dendrogram to
+the pixels of its index map.
+
+Each :class:`~glue.core.data.Data` object keeps one index per key
+component, until the data change.
+
+A :class:`JoinIndex` maps the distinct keys of one index onto those of
+another. Subsets are propagated across a join in linear time, without
+sorting: the selected elements of one dataset mark their keys, the marks
+are mapped onto the keys of the other dataset, and gathered back out to
+its elements. Joins may be many-to-many.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+__all__ = ['KeyIndex', 'JoinIndex']
+
+
+class KeyIndex(object):
+
+    """
+    An inverted index from the values of an array to the positions
+    of the elements with each value
+    """
+
+    def __init__(self, values):
+        """
+        :param values: The array of keys to index
+        """
+        values = np.asarray(values)
+        self.shape = values.shape
+        values = values.ravel()
+
+        #: Flat positions of every element, sorted by key
+        self.positions = np.argsort(values, kind='mergesort')
+        ordered = values[self.positions]
+        first = np.ones(ordered.size, dtype=bool)
+        first[1:] = ordered[1:] != ordered[:-1]
+
+        #: The distinct keys, in ascending order
+        self.keys = ordered[first]
+
+        #: Where the positions of each key start (and end)
+        self.offsets = np.append(np.flatnonzero(first), ordered.size)
+
+        #: The number of the distinct key of each element
+        self.codes = np.empty(values.size, dtype=np.intp)
+        self.codes[self.positions] = np.cumsum(first) - 1
+        self.codes = self.codes.reshape(self.shape)
+
+    def counts(self):
+        """ The number of elements with each key """
+        return np.diff(self.offsets)
+
+    def find(self, keys):
+        """
+        Find which distinct keys match a set of values
+
+        :param keys: The values to look up
+
+        :returns: An array of the (sorted) numbers of each matching key
+        """
+        keys = np.unique(np.asarray(keys).ravel())
+        idx = np.searchsorted(self.keys, keys)
+        idx = idx[idx < self.keys.size]
+        keys = keys[:idx.size]  # keys beyond the largest key don't match
+        return idx[self.keys[idx] == keys]
+
+    def lookup(self, keys):
+        """
+        Find the elements whose key is one of a set of values
+
+        :param keys: The values to look up
+
+        :returns: An array of the flat positions of each matching element.
+                  Positions with the same key are in ascending order
+        """
+        return self.lookup_codes(self.find(keys))
+
+    def lookup_codes(self, codes):
+        """
+        Find the elements with a set of distinct keys
+
+        :param codes: The numbers of the keys to look up
+
+        :returns: An array of the flat positions of each matching element
+        """
+        starts = self.offsets[codes]
+        lengths = self.offsets[np.asarray(codes) + 1] - starts
+        total = lengths.sum()
+        if total == 0:
+            return np.zeros(0, dtype=np.intp)
+
+        # each range is an arange, offset by the start of the range
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.positions[shift + np.arange(total)]
+
+    def mask(self, keys):
+        """
+        Find the elements whose key is one of a set of values
+
+        Equivalent to ``np.in1d(values, keys).reshape(values.shape)``
+
+        :param keys: The values to look up
+
+        :returns: A boolean array, with the shape of the indexed values
+        """
+        result = np.zeros(int(np.prod(self.shape)), dtype=bool)
+        result[self.lookup(keys)] = True
+        return result.reshape(self.shape)
+
+
+class JoinIndex(object):
+
+    """
+    A mapping between the distinct keys of two :class:`KeyIndex` objects
+    """
+
+    def __init__(self, left, right):
+        """
+        :param left: The :class:`KeyIndex` to propagate selections to
+        :param right: The :class:`KeyIndex` to propagate selections from
+        """
+        self.left = left
+        self.right = right
+
+        # the right key matching each left key. Unmatched keys
+        # point to an extra, never selected, key
+        idx = np.minimum(np.searchsorted(right.keys, left.keys),
+                         max(right.keys.size - 1, 0))
+        match = right.keys[idx] == left.keys if right.keys.size else False
+        self._left_to_right = np.where(match, idx, right.keys.size)
+
+    def propagate(self, mask):
+        """
+        Find the left keys joined to a selection of right elements
+
+        :param mask: A boolean mask over the right values
+
+        :returns: A boolean array over the distinct left keys. Index
+                  it with the left ``codes`` to find the selected elements
+        """
+        selected = np.zeros(self.right.keys.size + 1, dtype=bool)
+        selected[self.right.codes[np.asarray(mask, dtype=bool)]] = True
+        selected[-1] = False
+        return selected[self._left_to_right]
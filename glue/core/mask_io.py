@@ -0,0 +1,240 @@
+"""
+Compact storage for subset masks.
+
+A subset mask is stored in whichever of three encodings is smallest:
+
+* ``bits``: the flattened boolean mask, packed 8 elements per byte
+* ``indices``: the (sorted) flat indices of the selected elements
+* ``runs``: the start and length of each run of selected elements
+
+Sparse subsets are stored as index lists, contiguous selections (e.g.
+ranges over sorted columns, or image regions) as runs, and everything
+else as packed bits, which is at most 1/8th of the size of a boolean
+mask.
+
+Many subsets can be written to a single file in one call, either as a
+NumPy ``.npz`` archive or, if h5py is installed, an HDF5 file.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+
+import numpy as np
+
+from .subset import ElementSubsetState
+
+__all__ = ['encode_mask', 'decode_mask', 'write_masks', 'read_masks']
+
+ENCODINGS = ['bits', 'indices', 'runs']
+
+
+def _index_dtype(size):
+    """ The smallest unsigned integer type which can index size elements """
+    for dtype in [np.uint8, np.uint16, np.uint32]:
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def _runs(mask):
+    """ The (starts, lengths) of each run of True values in a flat mask """
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def encode_mask(mask, encoding=None):
+    """
+    Compress a boolean mask
+
+    :param mask: The mask to encode
+    :param encoding: One of 'bits', 'indices' or 'runs'. By default,
+                     the encoding which takes the least space is used
+
+    :returns: A tuple of (encoding, array). The array is 1D for
+              bits and indices, and has shape (nruns, 2) for runs
+    """
+    mask = np.ascontiguousarray(mask, dtype=bool).ravel()
+    dtype = _index_dtype(mask.size)
+
+    if encoding is None:
+        # counting and finding runs is cheap compared to writing out
+        # a large mask in the wrong encoding
+        nbits = (mask.size + 7) // 8
+        nindices = np.count_nonzero(mask) * np.dtype(dtype).itemsize
+        if nindices <= nbits:
+            encoding = 'indices'
+        else:
+            starts, lengths = _runs(mask)
+            nruns = 2 * starts.size * np.dtype(dtype).itemsize
+            encoding = 'runs' if nruns < nbits else 'bits'
+
+    if encoding == 'bits':
+        return encoding, np.packbits(mask)
+    if encoding == 'indices':
+        return encoding, np.flatnonzero(mask).astype(dtype)
+    if encoding == 'runs':
+        starts, lengths = _runs(mask)
+        return encoding, np.column_stack((starts, lengths)).astype(dtype)
+    raise ValueError("Unknown mask encoding: %s. Must be one of %s" %
+                     (encoding, ', '.join(ENCODINGS)))
+
+
+def _decode_indices(encoding, values, size):
+    """ Decode an encoded mask into a sorted array of flat indices """
+    values = np.asarray(values)
+    if encoding == 'bits':
+        return np.flatnonzero(np.unpackbits(values)[:size])
+    if encoding == 'indices':
+        return values.astype(np.intp)
+    if encoding == 'runs':
+        if values.size == 0:
+            return np.zeros(0, dtype=np.intp)
+        starts, lengths = values[:, 0].astype(np.intp), \
+            values[:, 1].astype(np.intp)
+        # each run is an arange, built from the cumulative sum of steps
+        steps = np.ones(lengths.sum(), dtype=np.intp)
+        offsets = np.cumsum(lengths)[:-1]
+        steps[0] = starts[0]
+        steps[offsets] = starts[1:] - (starts[:-1] + lengths[:-1] - 1)
+        return np.cumsum(steps)
+    raise ValueError("Unknown mask encoding: %s. Must be one of %s" %
+                     (encoding, ', '.join(ENCODINGS)))
+
+
+def decode_mask(encoding, values, shape):
+    """
+    Rebuild a boolean mask from the output of :func:`encode_mask`
+
+    :param encoding: The encoding used
+    :param values: The encoded array
+    :param shape: The shape of the mask
+    """
+    size = int(np.prod(shape))
+    result = np.zeros(size, dtype=bool)
+    result[_decode_indices(encoding, values, size)] = True
+    return result.reshape(shape)
+
+
+def _format(path, format):
+    if format is not None:
+        return format
+    if path.lower().endswith(('.h5', '.hdf5', '.hd5')):
+        return 'hdf5'
+    return 'npz'
+
+
+def write_masks(subsets, path, format=None, encoding=None):
+    """
+    Write the masks of several subsets to a single file
+
+    :param subsets: A list of :class:`~glue.core.subset.Subset` objects
+    :param path: The file to write
+    :param format: 'npz' or 'hdf5'. By default, HDF5 is used for
+                   files ending in .h5, .hd5 or .hdf5, and npz otherwise
+    :param encoding: The encoding to use for every mask. By default,
+                     the smallest encoding is chosen for each mask
+                     (see :func:`encode_mask`)
+    """
+    format = _format(path, format)
+    if format not in ['npz', 'hdf5']:
+        raise AttributeError("format not supported: %s" % format)
+
+    records = []
+    arrays = {}
+    for i, subset in enumerate(subsets):
+        mask = subset.to_mask()
+        enc, values = encode_mask(mask, encoding)
+        key = 'subset_%i' % i
+        arrays[key] = values
+        records.append(dict(label=subset.label, shape=list(mask.shape),
+                            encoding=enc, key=key))
+
+    if format == 'npz':
+        # np.savez appends .npz to paths without that extension
+        with open(path, 'wb') as out:
+            np.savez(out, manifest=np.array(json.dumps(records)), **arrays)
+        return
+
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("Cannot write HDF5 masks -- requires h5py")
+
+    with h5py.File(path, 'w') as out:
+        for rec in records:
+            dset = out.create_dataset(rec['key'], data=arrays[rec['key']],
+                                      compression='gzip', shuffle=True)
+            dset.attrs['label'] = rec['label'] or ''
+            dset.attrs['shape'] = rec['shape']
+            dset.attrs['encoding'] = rec['encoding']
+
+
+def _signature(path):
+    """ The format of a mask file, from its first bytes """
+    with open(path, 'rb') as infile:
+        head = infile.read(8)
+    if head == b'\x89HDF\r\n\x1a\n':
+        return 'hdf5'
+    if head.startswith(b'PK\x03\x04'):
+        return 'npz'
+
+
+def _load_npz(path):
+    """ Open an .npz archive, without unpickling object arrays """
+    try:
+        return np.load(path, allow_pickle=False)
+    except TypeError:  # numpy < 1.10 has no allow_pickle
+        return np.load(path)
+
+
+def read_masks(path):
+    """
+    Read subset masks written by :func:`write_masks`
+
+    :param path: The file to read
+
+    :returns: A list of (label, shape, state) tuples for each subset,
+              where state is an :class:`~glue.core.subset.ElementSubsetState`
+    """
+    result = []
+
+    # np.load unpickles files which are not .npy or .npz, so only
+    # known signatures are read
+    signature = _signature(path)
+    if signature is None:
+        raise IOError("%s is not an .npz or HDF5 mask file" % path)
+
+    if signature == 'hdf5':
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError("Cannot read HDF5 masks -- requires h5py")
+
+        with h5py.File(path, 'r') as infile:
+            keys = sorted(infile, key=lambda k: int(k.split('_')[-1]))
+            for key in keys:
+                dset = infile[key]
+                shape = tuple(int(s) for s in dset.attrs['shape'])
+                encoding = dset.attrs['encoding']
+                if isinstance(encoding, bytes):
+                    encoding = encoding.decode('ascii')
+                label = dset.attrs['label']
+                if isinstance(label, bytes):
+                    label = label.decode('utf-8')
+                ind = _decode_indices(encoding, dset[()], int(np.prod(shape)))
+                result.append((label, shape,
+                               ElementSubsetState(indices=ind)))
+        return result
+
+    with _load_npz(path) as infile:
+        records = json.loads(str(infile['manifest']))
+        for rec in records:
+            shape = tuple(rec['shape'])
+            ind = _decode_indices(rec['encoding'], infile[rec['key']],
+                                  int(np.prod(shape)))
+            result.append((rec['label'], shape,
+                           ElementSubsetState(indices=ind)))
+    return result
@@ -7,12 +7,14 @@ s = GlueSerializer(object)
 s.dumpo() -> a JSON-serializeable dict
 s.dumps() -> a JSON string
 s.dump(file) -> dump to a file object
+s.dump_archive(path) -> dump to a session archive (see below)
 
 varname = s.id(x) -> string identifier that uniquely labels an object in
                      the Serialized state
 
 u = GlueUnSerializer.load(file)
 u = GlueUnSerializer.loads(str)
+u = GlueUnSerializer.load_path(path) -> load a JSON file or session archive
 u.object(varname) -> A reconstituted version of `x`
 u.object('__main__') -> The object passed to the GlueSerializer constructor
 
@@ -42,6 +44,17 @@ Unserializer methods can be registered either via:
 GlueUnserializer object. context.object() is useful for unserializing
 dependencies.
 
+Session archives:
+
+A session archive is an uncompressed zip file, holding the JSON
+description as ``session.json``, and every array (e.g. components
+created in memory, or subset masks) as a separate ``.npy`` member,
+referenced by name from the JSON. Arrays are streamed into the
+archive when saving, and memory-mapped from it when loading, rather
+than being base64-encoded inside the JSON. On Windows, where a file
+cannot be replaced while it is mapped (so a restored session could not
+be saved back over its archive), arrays are read into memory instead.
+
 Versions:
 
 Both the @saver and @loader take an optional version keyword. Whenever
@@ -53,9 +66,12 @@ starting from 1.
 
 from __future__ import absolute_import, division, print_function
 
+import os
+from time import time
 from itertools import count
 from collections import defaultdict
 import json
+import zipfile
 import types
 import logging
 from inspect import isgeneratorfunction
@@ -66,7 +82,8 @@ from .subset import (OPSYM, SYMOP, CompositeSubsetState,
                      SubsetState, Subset, RoiSubsetState,
                      InequalitySubsetState, RangeSubsetState)
 from .data import (Data, Component, ComponentID, DerivedComponent,
-                   CoordinateComponent)
+                   CoordinateComponent, LazyComponent)
+from .data_factories import DeferredLoadLog
 from . import (VisualAttributes, ComponentLink, DataCollection)
 from .component_link import CoordinateComponentLink
 from .util import lookup_class
@@ -187,6 +204,70 @@ class VersionedDict(object):
         self._data[item][version] = value
 
 
+ARCHIVE_JSON = 'session.json'
+ARCHIVE_ARRAYS = 'arrays/'
+
+#: Whether arrays are memory-mapped from session archives. Windows
+#: locks mapped files, which would stop dump_archive from replacing them
+MMAP_ARCHIVES = os.name != 'nt'
+
+
+def _write_member(zf, member, arr):
+    """Stream an array into a zip file, as a .npy member"""
+    try:
+        # Python 3.6+ can stream directly into the archive
+        with zf.open(member, 'w', force_zip64=True) as out:
+            np.save(out, arr)
+    except TypeError:
+        f = BytesIO()
+        np.save(f, arr)
+        zf.writestr(member, f.getvalue())
+
+
+def _read_member(path, zf, member):
+    """
+    Load a .npy member of a zip file, memory-mapping it if possible
+    """
+    info = zf.getinfo(member)
+    header = None
+    if MMAP_ARCHIVES and info.compress_type == zipfile.ZIP_STORED:
+        with open(path, 'rb') as f:
+            # the local header's extra field can differ from the
+            # central directory's, so it is read from the file
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype='<u2')
+            start = info.header_offset + 30 + name_len + extra_len
+            f.seek(start)
+            version = np.lib.format.read_magic(f)
+            # numpy < 1.9 only reads version 1.0 headers
+            read_header = getattr(np.lib.format,
+                                  'read_array_header_%i_%i' % version, None)
+            if read_header is not None:
+                header = read_header(f)
+                offset = f.tell()
+
+    if header is not None:
+        shape, fortran, dtype = header
+        if not dtype.hasobject and len(shape) > 0 and np.prod(shape) > 0:
+            return np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                             order='F' if fortran else 'C', offset=offset)
+
+    data = BytesIO(zf.read(member))
+    try:
+        return np.load(data, allow_pickle=True)
+    except TypeError:  # numpy < 1.10 always allows pickles
+        return np.load(data)
+
+
+def _replace(src, dest):
+    try:
+        os.replace(src, dest)
+    except AttributeError:  # Python 2
+        if os.path.exists(dest):
+            os.remove(dest)
+        os.rename(src, dest)
+
+
 class GlueSerializer(object):
 
     """
@@ -199,6 +280,7 @@ class GlueSerializer(object):
         self._objs = {}   # map name -> object
         self._working = set()
         self._main = obj
+        self._arrays = None  # map id(array) -> (member, array), if archiving
         self.id(obj)
 
     @classmethod
@@ -342,16 +424,70 @@ class GlueSerializer(object):
         return json.dump(result, outfile, default=self.json_default,
                          indent=indent)
 
+    def array(self, arr):
+        """
+        Return the name of the archive member that an array will
+        be saved to, or None if not writing a session archive
+        """
+        if self._arrays is None:
+            return
+        oid = id(arr)
+        if oid not in self._arrays:
+            member = '%s%i.npy' % (ARCHIVE_ARRAYS, len(self._arrays))
+            self._arrays[oid] = member, arr
+        return self._arrays[oid][0]
+
+    def dump_archive(self, path, indent=None):
+        """
+        Write a session archive
+
+        The archive is first written to a temporary file, which then
+        replaces path. Arrays memory-mapped from a previous archive at
+        the same path therefore remain valid (on Windows, where mapped
+        files cannot be replaced, arrays are never mapped; see
+        MMAP_ARCHIVES).
+
+        :param path: The file to write
+        """
+        self._arrays = {}
+        try:
+            result = self.dumpo()
+            tmp = path + '.tmp'
+            with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_STORED,
+                                 allowZip64=True) as zf:
+                for member, arr in self._arrays.values():
+                    _write_member(zf, member, arr)
+                zf.writestr(ARCHIVE_JSON,
+                            json.dumps(result, default=self.json_default,
+                                       indent=indent))
+            _replace(tmp, path)
+        finally:
+            self._arrays = None
+
 
 class GlueUnSerializer(object):
     dispatch = VersionedDict()
 
-    def __init__(self, string=None, fobj=None):
-        if string is None and fobj is None:
+    def __init__(self, string=None, fobj=None, archive=None, lazy=False):
+        """
+        :param string: A JSON string to load
+        :param fobj: A file object containing JSON to load
+        :param archive: The path to a session archive to load
+        :param lazy: If True, defer reading data files until the data
+                     are first accessed
+        """
+        if string is None and fobj is None and archive is None:
             raise ValueError("Most provide either a string or a file")
         self._names = {}  # map id(object) -> name
         self._objs = {}   # map name -> object
         self._working = set()
+        self._archive = archive
+        self.lazy = lazy
+        self.timings = {}  # map name -> seconds spent restoring
+
+        if archive is not None:
+            with zipfile.ZipFile(archive) as zf:
+                string = zf.read(ARCHIVE_JSON).decode('utf-8')
         self._rec = json.loads(string) if string else json.load(fobj)
 
     @classmethod
@@ -362,6 +498,49 @@ class GlueUnSerializer(object):
     def load(cls, fobj):
         return cls(fobj=fobj)
 
+    @classmethod
+    def load_archive(cls, path, lazy=False):
+        return cls(archive=path, lazy=lazy)
+
+    @classmethod
+    def load_path(cls, path, lazy=False):
+        """
+        Load a session from a file, which may either be a session
+        archive or a plain JSON file
+
+        :param lazy: If True, defer reading data files until the data
+                     are first accessed
+        """
+        if zipfile.is_zipfile(path):
+            return cls.load_archive(path, lazy=lazy)
+        with open(path) as infile:
+            return cls(fobj=infile, lazy=lazy)
+
+    def report(self, limit=10):
+        """
+        Describe the objects which took the longest to restore
+
+        Times include the time spent restoring each object's
+        dependencies
+
+        :param limit: The maximum number of objects to list
+        :rtype: str
+        """
+        items = sorted(self.timings.items(), key=lambda x: -x[1])[:limit]
+        return '\n'.join('%8.3fs  %s' % (t, name) for name, t in items)
+
+    def array(self, member):
+        """
+        Load an array saved in a session archive
+
+        Uncompressed arrays are memory-mapped, and read-only
+        """
+        if self._archive is None:
+            raise GlueSerializeError("Array %s refers to a session archive, "
+                                     "but none was loaded" % member)
+        with zipfile.ZipFile(self._archive) as zf:
+            return _read_member(self._archive, zf, member)
+
     @classmethod
     def unserializes(cls, obj, version=1):
         def decorator(func):
@@ -412,6 +591,7 @@ class GlueUnSerializer(object):
         else:
             rec = obj_id
 
+        start = time()
         func = self._dispatch(rec)
         obj = func(rec, self)
 
@@ -429,6 +609,11 @@ class GlueUnSerializer(object):
             for _ in gen:  # ... and finish constructing it
                 pass
 
+        if isinstance(obj_id, six.string_types):
+            self.timings[obj_id] = time() - start
+            logging.debug("Restored %s in %.3fs", obj_id,
+                          self.timings[obj_id])
+
         return obj
 
 
@@ -634,6 +819,13 @@ def _load_data(rec, context):
     for s in rec['subsets']:
         result.add_subset(context.object(s))
 
+    # data holding placeholders for deferred files are
+    # updated when the files are reloaded
+    for comp in result._components.values():
+        log = getattr(comp, '_load_log', None)
+        if isinstance(log, DeferredLoadLog):
+            log.attach(result)
+
     return result
 
 
@@ -691,6 +883,31 @@ def _load_component(rec, context):
                      units=rec['units'])
 
 
+@saver(Component, version=2)
+def _save_component_2(component, context):
+    # adds the shape and dtype of numerical components read from
+    # files, so that lazy restores can defer reading the file
+    result = _save_component(component, context)
+    if 'log' in result and type(component) in (Component, LazyComponent):
+        if isinstance(component, LazyComponent):
+            dtype = component.dtype  # without reading the file
+        else:
+            dtype = component.data.dtype
+        result['shape'] = list(component.shape)
+        result['dtype'] = dtype.str
+    return result
+
+
+@loader(Component, version=2)
+def _load_component_2(rec, context):
+    if 'shape' in rec:
+        log = context.object(rec['log'])
+        if isinstance(log, DeferredLoadLog):
+            return log.deferred_component(rec['log_item'],
+                                          rec['shape'], rec['dtype'])
+    return _load_component(rec, context)
+
+
 @saver(DerivedComponent)
 def _save_derived_component(component, context):
     return dict(link=context.id(component.link))
@@ -767,12 +984,18 @@ def _save_session(session, context):
 
 @loader(np.ndarray)
 def _load_numpy(rec, context):
+    if 'member' in rec:
+        return context.array(rec['member'])
     s = BytesIO(b64decode(rec['data']))
     return np.load(s)
 
 
 @saver(np.ndarray)
 def _save_numpy(obj, context):
+    member = context.array(obj)
+    if member is not None:
+        return dict(member=member)
+
     f = BytesIO()
     np.save(f, obj)
     data = b64encode(f.getvalue()).decode('ascii')
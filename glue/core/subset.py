@@ -158,30 +158,51 @@ class Subset(object):
                 raise exc
 
     def _to_index_list_join(self):
-        return np.where(self._to_mask_join(None).flat)[0]
+        index, selected = self._join_keys()
+        return np.sort(index.lookup_codes(np.flatnonzero(selected)))
 
     def _to_mask_join(self, view):
         """Conver the subset to a mask through an entity join
            to another dataset. """
-        for other, (cid1, cid2) in self.data._key_joins.items():
-            if getattr(other, '_recursing', False):
-                continue
-
-            try:
-                self.data._recursing = True
-                s2 = Subset(other)
-                s2.subset_state = self.subset_state
-                key_right = s2.to_mask()
-            except IncompatibleAttribute:
-                continue
-            finally:
-                self.data._recursing = False
+        index, selected = self._join_keys()
+        result = selected[index.codes]
+        if view is not None:
+            result = result[view]
+        return result
 
-            key_left = self.data[cid1, view]
-            result = np.in1d(key_left.ravel(),
-                             other[cid2, key_right])
+    def _join_keys(self):
+        """
+        Evaluate the subset state on the nearest dataset that it applies
+        to, among those joined to this subset's data (directly or through
+        a chain of joins), and propagate the selection back along the joins
 
-            return result.reshape(key_left.shape)
+        :returns: (index, selected). The
+                  :class:`~glue.core.key_index.KeyIndex` of the key of
+                  this data, and a boolean array over its distinct keys
+        """
+        # breadth-first search, recording the data each dataset
+        # was reached from
+        source = {self.data: None}
+        todo = [self.data]
+        while todo:
+            data = todo.pop(0)
+            for other in data._key_joins:
+                if other in source:
+                    continue
+                source[other] = data
+                try:
+                    mask = self.subset_state.to_mask(other)
+                except IncompatibleAttribute:
+                    todo.append(other)
+                    continue
+
+                while True:
+                    data = source[other]
+                    index = data._key_index(data._key_joins[other][0])
+                    selected = data._join_index(other).propagate(mask)
+                    if data is self.data:
+                        return index, selected
+                    mask, other = selected[index.codes], data
 
         raise IncompatibleAttribute
 
@@ -260,17 +281,27 @@ class Subset(object):
         Registry().unregister(self, group=self.data)
 
     @contract(file_name='string')
-    def write_mask(self, file_name, format="fits"):
+    def write_mask(self, file_name, format=None):
         """ Write a subset mask out to file
 
         :param file_name: name of file to write to
         :param format:
-           Name of format to write to. Currently, only "fits" is
-           supported
+           Name of format to write to. One of "fits" (a full-size
+           integer image), or "npz" or "hdf5" (compact encodings, see
+           :mod:`glue.core.mask_io`). By default, the format is
+           chosen from the file extension, falling back to "fits"
 
         """
-        mask = np.short(self.to_mask())
-        if format == 'fits':
+        if format is None:
+            ext = file_name.lower().rsplit('.', 1)[-1]
+            format = {'npz': 'npz', 'h5': 'hdf5', 'hd5': 'hdf5',
+                      'hdf5': 'hdf5'}.get(ext, 'fits')
+
+        if format in ['npz', 'hdf5']:
+            from .mask_io import write_masks
+            write_masks([self], file_name, format=format)
+        elif format == 'fits':
+            mask = np.short(self.to_mask())
             try:
                 from ..external.astro import fits
                 fits.writeto(file_name, mask, clobber=True)
@@ -281,6 +312,25 @@ class Subset(object):
 
     @contract(file_name='string')
     def read_mask(self, file_name):
+        """ Read a subset mask written by :meth:`write_mask`
+
+        :param file_name: name of file to read. For files holding
+                          several masks, the first mask is used
+        """
+        from .mask_io import read_masks
+        try:
+            masks = read_masks(file_name)
+        except (IOError, OSError, ValueError, KeyError):
+            masks = None  # not a compact mask file -- try FITS
+
+        if masks:
+            label, shape, state = masks[0]
+            if shape != self.data.shape:
+                raise ValueError("Mask shape %s does not match data shape "
+                                 "%s" % (shape, self.data.shape))
+            self.subset_state = state
+            return
+
         try:
             from ..external.astro import fits
             mask = fits.open(file_name)[0].data
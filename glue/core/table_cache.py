@@ -0,0 +1,220 @@
+"""
+An on-disk, columnar cache of tables parsed by data factories.
+
+Parsing a large text table is slow, and
+:func:`~glue.core.data_factories.load_data` re-parses every file each time
+a session is restored. The first time a table is loaded, each of its
+columns is saved as a ``.npy`` file, alongside a manifest recording the
+file's path, size and modification time, and the factory and keywords used
+to parse it. Later loads of the same, unchanged file memory-map these
+columns instead of parsing the file again.
+
+Categorical columns are stored dictionary-encoded, as an array of integer
+codes and an array of categories.
+
+Only simple tables are cached: 1D data sets with default coordinates, whose
+components are plain numerical or categorical columns.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import json
+import shutil
+import hashlib
+import warnings
+
+import numpy as np
+
+from .data import Data, Component, CategoricalComponent, CoordinateComponent
+from .coordinates import Coordinates
+from ..external import six
+
+__all__ = ['TableCache', 'table_cache']
+
+MANIFEST = 'manifest.json'
+
+
+def _simple(value):
+    """ Whether a keyword value has a stable, reproducible repr """
+    if isinstance(value, (list, tuple)):
+        return all(_simple(v) for v in value)
+    return value is None or isinstance(value, (bool, float) +
+                                       six.integer_types + six.string_types)
+
+
+def _factory_name(factory):
+    return '%s.%s:%s' % (getattr(factory, '__module__', ''),
+                         getattr(factory, '__name__', ''),
+                         getattr(factory, 'label', ''))
+
+
+def _cacheable(data):
+    """ Whether a Data object can be stored in the cache """
+    if data.ndim != 1 or type(data.coords) is not Coordinates:
+        return False
+    for cid in data.primary_components:
+        comp = data.get_component(cid)
+        if isinstance(comp, CoordinateComponent):
+            continue
+        if type(comp) is CategoricalComponent:
+            if comp._is_jittered or comp._categories.dtype.kind not in 'USO':
+                return False
+            if not np.isfinite(comp._data).all():  # uncategorized values
+                return False
+            if comp._categories.dtype.kind == 'O' and \
+                    not all(isinstance(c, six.string_types)
+                            for c in comp._categories):
+                return False
+        elif type(comp) is Component:
+            if comp.data.dtype.kind not in 'biuf':
+                return False
+        else:
+            return False
+    return True
+
+
+class TableCache(object):
+
+    """
+    A directory of parsed tables, keyed on the path and
+    factory keywords used to load each file
+    """
+
+    def __init__(self, directory=None):
+        """
+        :param directory: The directory to store tables in.
+                          Defaults to ~/.glue/cache/tables
+        """
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'),
+                                     '.glue', 'cache', 'tables')
+        self.directory = directory
+
+    def _key(self, path, factory, kwargs):
+        """
+        The cache subdirectory for a file, or None if the load
+        cannot be cached
+        """
+        if not all(_simple(v) for v in kwargs.values()):
+            return
+        key = repr((os.path.abspath(path), _factory_name(factory),
+                    sorted(kwargs.items())))
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+
+    def load(self, path, factory, kwargs):
+        """
+        Load the tables cached for a file
+
+        :param path: The path to the file
+        :param factory: The data factory used to parse the file
+        :param kwargs: Keywords passed to the factory
+
+        :returns: A list of :class:`~glue.core.data.Data` objects,
+                  or None if the file is not cached, or has changed
+                  since it was cached
+        """
+        entry = self._key(path, factory, kwargs)
+        if entry is None:
+            return
+
+        try:
+            with open(os.path.join(entry, MANIFEST)) as infile:
+                manifest = json.load(infile)
+            size, mtime = self._stat(path)
+        except (IOError, OSError, ValueError):
+            return
+
+        if manifest['size'] != size or manifest['mtime'] != mtime:
+            return
+
+        try:
+            return [self._load_data(entry, rec) for rec in manifest['data']]
+        except (IOError, OSError, ValueError, KeyError):
+            return
+
+    @staticmethod
+    def _load_data(entry, rec):
+        result = Data(label=rec['label'])
+        for col in rec['components']:
+            values = np.load(os.path.join(entry, col['file']), mmap_mode='r')
+            if 'categories' in col:
+                categories = np.load(os.path.join(entry, col['categories']))
+                comp = CategoricalComponent.from_codes(values, categories)
+            else:
+                comp = Component(values)
+            result.add_component(comp, col['label'])
+        return result
+
+    def save(self, path, factory, kwargs, data):
+        """
+        Store the tables parsed from a file
+
+        Data which cannot be cached are silently ignored.
+
+        :param path: The path to the file
+        :param factory: The data factory used to parse the file
+        :param kwargs: Keywords passed to the factory
+        :param data: The list of :class:`~glue.core.data.Data`
+                     objects parsed from the file
+        """
+        entry = self._key(path, factory, kwargs)
+        if entry is None or not all(_cacheable(d) for d in data):
+            return
+
+        try:
+            size, mtime = self._stat(path)
+            if os.path.exists(entry):
+                shutil.rmtree(entry)
+            os.makedirs(entry)
+
+            records = [self._save_data(entry, i, d)
+                       for i, d in enumerate(data)]
+
+            # the manifest is written last, so only complete
+            # entries are ever read
+            manifest = dict(path=os.path.abspath(path), size=size,
+                            mtime=mtime, factory=_factory_name(factory),
+                            data=records)
+            with open(os.path.join(entry, MANIFEST), 'w') as outfile:
+                json.dump(manifest, outfile)
+        except (IOError, OSError) as exc:
+            warnings.warn("Could not cache %s: %s" % (path, exc))
+
+    @staticmethod
+    def _save_data(entry, index, data):
+        components = []
+        for j, cid in enumerate(data.primary_components):
+            comp = data.get_component(cid)
+            if isinstance(comp, CoordinateComponent):
+                continue
+
+            col = dict(label=cid.label, file='%i_%i.npy' % (index, j))
+            if isinstance(comp, CategoricalComponent):
+                categories = comp._categories
+                if categories.dtype.kind == 'O':
+                    categories = categories.astype(six.text_type)
+                col['categories'] = '%i_%i_categories.npy' % (index, j)
+                np.save(os.path.join(entry, col['categories']), categories)
+                values = comp._data.astype(np.intp)
+            else:
+                values = comp.data
+            np.save(os.path.join(entry, col['file']), values)
+            components.append(col)
+
+        return dict(label=data.label, components=components)
+
+    def clear(self):
+        """ Remove every cached table """
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+
+#: The cache used by :func:`~glue.core.data_factories.load_data`
+table_cache = TableCache()
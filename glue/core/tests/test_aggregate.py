@@ -3,7 +3,8 @@ from numpy.testing import assert_allclose
 
 import pytest
 
-from ..aggregate import Aggregate
+from ..aggregate import Aggregate, CumulativeCube, CubeProducts
+from ..coordinates import Coordinates
 from .. import Data
 
 
@@ -139,3 +140,194 @@ def test_reverse_limits():
     a = Aggregate(d, 'a', 0, (0, 'y', 'x'), (3, 0))
     b = Aggregate(d, 'a', 0, (0, 'y', 'x'), (0, 3))
     assert_allclose(a.sum(), b.sum())
+
+
+@pytest.mark.parametrize('func', Aggregate.all_operators())
+def test_tiled(func):
+    a = np.random.random((4, 9, 7)) - 0.2
+    a[1, 2, 3] = np.nan
+    d = Data(a=a)
+
+    whole = Aggregate(d, 'a', 0, (0, 'y', 'x'), (0, 4))
+    tiled = Aggregate(d, 'a', 0, (0, 'y', 'x'), (0, 4), workers=3)
+    tiled.tile_size = 10
+    assert len(tiled._tiles()) > 10
+
+    assert_allclose(func(whole), func(tiled))
+
+
+class TestCumulativeCube(object):
+
+    def setup_method(self, method):
+        a = np.random.random((6, 4, 5)) - 0.2
+        a[2, 1, 1] = np.nan
+        self.d = Data(a=a)
+        self.cache = CumulativeCube(self.d, self.d.id['a'], 0, (0, 'y', 'x'))
+        self.cache.build(chunk_size=40)
+
+    @pytest.mark.parametrize(('func', 'zlim', 'slc'),
+                             [(f, z, s) for f in (Aggregate.sum,
+                                                  Aggregate.mean,
+                                                  Aggregate.mom1)
+                              for z in [(0, 6), (1, 4), (5, 3)]
+                              for s in [(2, 'y', 'x'), (0, 'x', 'y')]])
+    def test_matches_direct(self, func, zlim, slc):
+        att = self.d.id['a']
+        direct = Aggregate(self.d, att, 0, slc, zlim)
+        cached = Aggregate(self.d, att, 0, slc, zlim, cache=self.cache)
+        assert cached._cached('sum') is not None
+        assert_allclose(func(direct), func(cached))
+
+    def test_not_used_for_other_slices(self):
+        agg = Aggregate(self.d, self.d.id['a'], 1, ('x', 0, 'y'), (0, 2),
+                        cache=self.cache)
+        assert agg._cached('sum') is None
+
+    def test_not_used_for_other_attributes(self):
+        att = self.d.add_component(self.d['a'] * 2, 'b')
+        agg = Aggregate(self.d, att, 0, (0, 'y', 'x'), (0, 2),
+                        cache=self.cache)
+        assert not self.cache.matches(agg)
+        assert agg._cached('sum') is None
+
+    def test_not_built(self):
+        cache = CumulativeCube(self.d, self.d.id['a'], 0, (0, 'y', 'x'))
+        agg = Aggregate(self.d, self.d.id['a'], 0, (0, 'y', 'x'), (0, 2),
+                        cache=cache)
+        assert agg._cached('sum') is None
+        assert_allclose(agg.sum(), np.nansum(self.d['a'][:2], axis=0))
+
+    def test_stale_after_update(self):
+        att = self.d.id['a']
+        agg = Aggregate(self.d, att, 0, (0, 'y', 'x'), (0, 2),
+                        cache=self.cache)
+        assert self.cache.matches(agg)
+
+        self.d.update_components({att: np.ones((6, 4, 5))})
+        assert not self.cache.ready
+        assert not self.cache.matches(agg)
+        assert_allclose(agg.sum(), 2)
+
+        self.cache.build()
+        assert self.cache.matches(agg)
+        assert_allclose(self.cache.total('sum', (0, 2)), 2)
+
+    def test_nbytes(self):
+        assert self.cache.nbytes == self.cache._totals.nbytes
+
+
+class SkewedCoordinates(Coordinates):
+
+    # the world coordinate along the first numpy axis depends on x
+    def pixel2world(self, *args):
+        x, y, z = args
+        return x, y, z + x
+
+    def dependent_axes(self, axis):
+        return (0, 1, 2)
+
+
+def test_argmax_nonseparable_world():
+    a = np.random.random((4, 3, 5))
+    d = Data(a=a)
+    d.coords = SkewedCoordinates()
+    agg = Aggregate(d, 'a', 0, (0, 'y', 'x'), (1, 4))
+    assert agg._world_axis() is None
+    expected = np.argmax(a[1:4], axis=0) + 1 + np.arange(5)
+    assert_allclose(agg.argmax(), expected)
+
+
+class TestCubeProducts(object):
+
+    def setup_method(self, method):
+        a = np.random.random((6, 4, 5)) - 0.2
+        a[2, 1, 1] = np.nan
+        self.d = Data(a=a)
+        self.att = self.d.id['a']
+        self.products = CubeProducts(self.d, self.att, 0, (0, 'x', 'y'))
+
+    @pytest.mark.parametrize(('func', 'zlim', 'slc'),
+                             [(f, z, s) for f in (Aggregate.sum,
+                                                  Aggregate.max,
+                                                  Aggregate.argmax,
+                                                  Aggregate.mom1,
+                                                  Aggregate.mom2)
+                              for z in [(0, 6), (4, 1)]
+                              for s in [(2, 'y', 'x'), (0, 'x', 'y')]])
+    def test_matches_direct(self, func, zlim, slc):
+        direct = Aggregate(self.d, self.att, 0, slc, zlim)
+        agg = Aggregate(self.d, self.att, 0, slc, zlim,
+                        products=self.products)
+        assert agg._product('mom1') is None
+
+        self.products.compute(zlim)
+        assert agg._product('mom1') is not None
+        assert_allclose(func(agg), func(direct))
+
+    def test_empty_columns(self):
+        a = self.d['a'].copy()
+        a[:, 3, 4] = np.nan
+        self.d.update_components({self.att: a})
+        for name in CubeProducts.NAMES:
+            value = self.products.get(name, (0, 6))
+            assert np.isnan(value[3, 4]) != (name == 'mom0')
+
+    def test_rms(self):
+        a = np.random.normal(0, 2, (2000, 2, 3))
+        d = Data(a=a)
+        products = CubeProducts(d, d.id['a'], 0, (0, 'y', 'x'))
+        assert_allclose(products.get('rms', (0, 2000)), 2, rtol=0.1)
+
+    def test_rms_ignores_nans(self):
+        a = self.d['a'].copy()
+        a[:, 0, 0] = np.nan
+        a[:3, 2, 3] = np.nan
+        self.d.update_components({self.att: a})
+        rms = self.products.get('rms', (0, 6))
+        assert np.isnan(rms[0, 0])
+        for i, j in [(2, 3), (1, 4)]:
+            col = a[:, i, j][np.isfinite(a[:, i, j])]
+            expected = 1.4826 * np.median(np.abs(col - np.median(col)))
+            assert_allclose(rms[i, j], expected)
+
+    def test_invalidated_by_update(self):
+        self.products.compute((0, 6))
+        assert self.products.ready((0, 6))
+        self.d.update_components({self.att: np.ones((6, 4, 5))})
+        assert not self.products.ready((0, 6))
+        assert_allclose(self.products.get('mom0', (0, 6)), 6)
+
+    def test_bounded(self):
+        self.products.MAX_ENTRIES = 2
+        for zlim in [(0, 2), (0, 3), (0, 4)]:
+            self.products.compute(zlim)
+        assert list(self.products._products) == [(0, 3), (0, 4)]
+
+        # reading a range marks it as recently used
+        self.products.get('mom0', (0, 3))
+        self.products.compute((0, 5))
+        assert list(self.products._products) == [(0, 3), (0, 5)]
+
+        # ranges computed for older data are dropped
+        self.d.update_components({self.att: np.ones((6, 4, 5))})
+        self.products.compute((1, 2))
+        assert list(self.products._products) == [(1, 2)]
+
+    def test_read_while_computing(self):
+        self.products.compute((0, 6))
+        with self.products._lock:  # as if computing another range
+            assert self.products.ready((0, 6))
+            assert_allclose(self.products.get('mom0', (0, 6)),
+                            np.nansum(self.d['a'], axis=0))
+
+    def test_add_to_data(self):
+        cids = self.products.add_to_data((1, 4), names=['peak', 'mom0'])
+        assert [c.label for c in cids] == ['a peak [1:4]', 'a mom0 [1:4]']
+        assert not self.products.ready((1, 4))
+
+        peak = self.d[cids[0]]
+        assert peak.shape == self.d.shape
+        expected = np.nanmax(self.d['a'][1:4], axis=0)
+        assert_allclose(peak[3], expected)
+        assert self.products.ready((1, 4))
+        assert self.products.add_to_data((1, 4), names=['peak']) == cids[:1]
@@ -138,3 +138,15 @@ class TestCommandStack(object):
 
         self.stack.undo()
         assert s.subset_state is old_state
+
+    def test_load_data_files(self, tmpdir):
+        for name in 'ab':
+            tmpdir.join(name + '.csv').write('x,y\n1,2\n3,4\n')
+        dc = self.session.data_collection
+
+        cmd = c.LoadDataFiles(paths=[str(tmpdir)], factory=tabular_data)
+        self.stack.do(cmd)
+        assert sorted(d.label for d in dc) == ['a', 'b']
+
+        self.stack.undo()
+        assert len(dc) == 0
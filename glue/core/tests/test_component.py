@@ -10,7 +10,7 @@ import numpy as np
 
 from ..data import (Component, ComponentID, Data,
                     DerivedComponent, CoordinateComponent,
-                    CategoricalComponent)
+                    CategoricalComponent, LazyComponent)
 from ... import core
 
 
@@ -34,6 +34,73 @@ class TestComponent(object):
         assert self.component.ndim is len(self.data.shape)
 
 
+class ArraySource(object):
+
+    """A lazy component source which records how it is read"""
+
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.views = []
+        self.full_reads = 0
+
+    def __getitem__(self, view):
+        self.views.append(view)
+        return self.array[view]
+
+    def __array__(self, dtype=None):
+        self.full_reads += 1
+        return np.asarray(self.array, dtype=dtype)
+
+
+class TestLazyComponent(object):
+
+    def setup_method(self, method):
+        self.source = ArraySource(np.arange(24.).reshape(2, 3, 4))
+        self.component = LazyComponent(self.source)
+
+    def test_shape(self):
+        assert self.component.shape == (2, 3, 4)
+        assert self.component.ndim == 3
+        assert self.component.numeric
+        assert self.source.full_reads == 0
+
+    def test_view_reads_slab(self):
+        result = self.component[1, :, 2:]
+        np.testing.assert_array_equal(result, self.source.array[1, :, 2:])
+        assert self.source.views == [(1, slice(None), slice(2, None))]
+        assert self.source.full_reads == 0
+        assert not self.component.loaded
+
+    def test_data_read_once(self):
+        self.component.data
+        self.component.data
+        assert self.source.full_reads == 1
+        assert self.component.loaded
+
+        # views now come from the loaded array
+        self.component[0]
+        assert self.source.views == []
+
+    def test_fancy_view_reads_data(self):
+        result = self.component[self.source.array > 3]
+        np.testing.assert_array_equal(result, np.arange(4, 24))
+        assert self.source.full_reads == 1
+
+    def test_data_update(self):
+        data = Data()
+        cid = data.add_component(self.component, 'x')
+        data.update_components({cid: np.zeros((2, 3, 4))})
+        np.testing.assert_array_equal(data[cid, 0], np.zeros((3, 4)))
+
+    def test_assigned_array_stays_writeable(self):
+        values = np.zeros((2, 3, 4))
+        self.component._data = values
+        assert self.component.data is values
+        assert values.flags.writeable
+
+
 class TestComponentID(object):
 
     def setup_method(self, method):
@@ -93,6 +160,32 @@ class TestCategoricalComponent(object):
         d = Data(x=['a', 'b', 'c'])
         assert isinstance(d.get_component('x'), CategoricalComponent)
 
+    def test_from_codes(self):
+        cat_comp = CategoricalComponent.from_codes(np.array([0, 0, 1, 1]),
+                                                   np.array(['a', 'b']))
+        np.testing.assert_array_equal(cat_comp._data, [0, 0, 1, 1])
+        np.testing.assert_array_equal(cat_comp._categorical_data,
+                                      self.array_data)
+        assert not cat_comp._categorical_data.flags.writeable
+
+        cat_comp.jitter('uniform')
+        cat_comp.jitter(None)
+        np.testing.assert_array_equal(cat_comp._data, [0, 0, 1, 1])
+
+    def test_from_codes_lazy(self):
+        cat_comp = CategoricalComponent.from_codes(np.array([0, 0, 1, 1]),
+                                                   np.array(['a', 'b']))
+        d = Data(x=cat_comp)
+        assert cat_comp.shape == (4,)
+        assert cat_comp.ndim == 1
+        assert cat_comp.numeric
+        np.testing.assert_array_equal(d['x', 1:3], [0, 1])
+        assert cat_comp._values is None
+        assert cat_comp._labels is None
+
+        assert cat_comp.data.dtype == np.float
+        assert cat_comp.data is cat_comp._data
+
     def test_accepts_numpy(self):
         cat_comp = CategoricalComponent(self.array_data)
         assert cat_comp._categorical_data.shape == (4,)
@@ -292,6 +385,12 @@ def test_view(view):
     np.testing.assert_array_equal(comp[view], comp.data[view])
 
 
+@pytest.mark.parametrize(('view'), VIEWS)
+def test_view_lazy(view):
+    comp = LazyComponent(np.array([[1, 2, 3], [2, 3, 4]]))
+    np.testing.assert_array_equal(comp[view], comp.data[view])
+
+
 @pytest.mark.parametrize(('view'), VIEWS)
 def test_view_derived(view):
     comp = Component(np.array([[1, 2, 3], [2, 3, 4]]))
@@ -442,3 +442,16 @@ def test_add_binary_component():
     d.add_component(z, label='z')
 
     np.testing.assert_array_equal(d['z'], [3, 5, 7])
+
+
+def test_write_csv(tmpdir):
+    d = Data(x=[1, 2, 3, 4], label='test')
+    d.add_component(CategoricalComponent(np.array(['a', 'b', 'a', 'c,d'])),
+                    'y')
+    s = d.new_subset(label='sel')
+    s.subset_state = d.id['x'] > 2
+
+    path = tmpdir.join('data.csv')
+    d.write_csv(str(path), components=[d.id['x'], d.id['y']], subsets=[s],
+                chunk_size=3)
+    assert path.read() == 'x,y,sel\n1,a,0\n2,b,0\n3,a,1\n4,"c,d",1\n'
@@ -94,6 +94,26 @@ class TestDataCollection(object):
         assert isinstance(msg, DataCollectionAddMessage)
         assert msg.data is self.data
 
+    def test_extend_broadcast(self):
+        """ extend adds every data set, then broadcasts an add for each """
+        d1, d2 = Data(x=[1, 2, 3]), Data(y=[2, 3, 4])
+        seen = []
+
+        def check(msg):
+            seen.append(msg.data)
+            assert d1 in self.dc and d2 in self.dc
+
+        self.dc.hub.subscribe(self.log, DataCollectionAddMessage,
+                              handler=check)
+        self.dc.extend([d1, d2])
+        assert seen == [d1, d2]
+
+    def test_extend_single_broadcasts_add(self):
+        self.dc.extend([self.data])
+        msg = self.log.messages[-1]
+        assert isinstance(msg, DataCollectionAddMessage)
+        assert msg.data is self.data
+
     def test_remove_broadcast(self):
         """ call to remove generates a DataCollectionDeleteMessage """
         self.dc.append(self.data)
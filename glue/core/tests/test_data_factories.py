@@ -3,17 +3,18 @@ from __future__ import absolute_import, division, print_function
 from distutils.version import LooseVersion
 
 import pytest
-from mock import MagicMock
+from mock import MagicMock, patch
 import numpy as np
 from numpy.testing import assert_allclose, assert_array_equal
 
 from .. import data_factories as df
-from ..data import CategoricalComponent, Data
+from ..data import CategoricalComponent, Data, LazyComponent
+from ..data_collection import DataCollection
 from .util import make_file
 
 from ...tests.helpers import (requires_astropy, requires_astropy_ge_03,
                               requires_pil_or_skimage, requires_xlrd,
-                              requires_astrodendro)
+                              requires_astrodendro, requires_h5py)
 
 
 def test_load_data_auto_assigns_label():
@@ -67,6 +68,203 @@ def test_fits_uses_mmapping():
     assert not d['PRIMARY'].flags['OWNDATA']
 
 
+@requires_astropy
+def test_fits_image_loader_lazy():
+    with make_file(TEST_FITS_DATA, '.fits', decompress=True) as fname:
+        d = df.load_data(fname)
+        comp = d.get_component(d.id['PRIMARY'])
+        assert isinstance(comp, LazyComponent)
+        assert_array_equal(d['PRIMARY', 1:], [2, 3])
+        assert not comp.loaded
+
+
+@requires_astropy
+def test_fits_gz_threaded_reads(tmpdir):
+    from astropy.io import fits
+    from multiprocessing.pool import ThreadPool
+    from ..io import FITSImageSource
+
+    fname = str(tmpdir.join('test.fits.gz'))
+    cube = np.arange(8 * 8 * 6.).reshape(8, 8, 6)
+    fits.writeto(fname, cube)
+
+    hdulist = fits.open(fname)
+    source = FITSImageSource(hdulist[0], hdulist)
+    views = [(i % 8, slice(j, j + 3)) for i in range(40) for j in (0, 5)]
+    pool = ThreadPool(4)
+    try:
+        results = pool.map(lambda v: source[v], views)
+    finally:
+        pool.terminate()
+        source.close()
+    for view, result in zip(views, results):
+        assert_array_equal(result, cube[view])
+
+
+@requires_astropy
+def test_file_info_cached(tmpdir, monkeypatch):
+    from astropy.io import fits
+
+    fname = str(tmpdir.join('test.fits'))
+    fits.writeto(fname, np.zeros((2, 3)))
+
+    opened = []
+    original = fits.open
+
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(fits, 'open', counting_open)
+
+    assert df.find_factory(fname) is df.gridded_data
+    assert not df.is_casalike(fname)
+    assert df.find_factory(fname) is df.gridded_data
+
+    # headers read once, and shared by all identifiers
+    assert len(opened) == 1
+
+    # modifying the file invalidates the cache
+    fits.writeto(fname, np.zeros((2, 3, 4, 5)), overwrite=True)
+    info = df.file_info(fname)
+    assert info.fits_headers[0][1]['NAXIS'] == 4
+    assert len(opened) == 2
+
+
+@requires_astropy
+@requires_h5py
+def test_hdf5_loader_lazy(tmpdir):
+    import h5py
+
+    fname = str(tmpdir.join('test.hdf5'))
+    cube = np.arange(4 * 8 * 6.).reshape(4, 8, 6)
+    with h5py.File(fname, 'w') as f:
+        f.create_dataset('cube', data=cube, chunks=(1, 4, 6))
+        f.create_dataset('group/other', data=cube * 2)
+
+    d = df.load_data(fname)
+    comp = d.get_component(d.id['/cube'])
+    assert isinstance(comp, LazyComponent)
+    assert_array_equal(d['/cube', 2], cube[2])
+    assert_array_equal(d['/cube', 1, 3:5, ::2], cube[1, 3:5, ::2])
+    assert_array_equal(d['/group/other', :, 0, 0], cube[:, 0, 0] * 2)
+    assert not comp.loaded
+
+    assert_array_equal(d['/cube'], cube)
+    assert comp.loaded
+
+
+@requires_astropy
+@requires_h5py
+def test_hdf5_lazy_close_and_reload(tmpdir):
+    import h5py
+
+    fname = str(tmpdir.join('test.hdf5'))
+    cube = np.arange(24.).reshape(2, 3, 4)
+    with h5py.File(fname, 'w') as f:
+        f.create_dataset('cube', data=cube)
+
+    d = df.load_data(fname)
+    source = d.get_component(d.id['/cube'])._source
+    assert_array_equal(d['/cube', 1], cube[1])
+
+    # closed on removal, and re-opened if read again
+    dc = DataCollection([d])
+    dc.remove(d)
+    assert source._dataset is None
+    assert_array_equal(d['/cube', 0], cube[0])
+    d._load_log.close()
+
+    with h5py.File(fname, 'w') as f:
+        f.create_dataset('cube', data=-cube)
+    d._load_log.reload()
+    assert_array_equal(d['/cube'], -cube)
+    assert source._dataset is None
+
+
+@requires_astropy
+@requires_h5py
+def test_hdf5_lazy_shared_file(tmpdir):
+    import h5py
+
+    fname = str(tmpdir.join('test.hdf5'))
+    cube = np.arange(24.).reshape(2, 3, 4)
+    with h5py.File(fname, 'w') as f:
+        f.create_dataset('a', data=cube)
+        f.create_dataset('b', data=-cube)
+        f.create_dataset('c', data=2 * cube)
+
+    d = df.load_data(fname)
+    sources = [d.get_component(d.id[k])._source for k in ['/a', '/b', '/c']]
+    handle = sources[0]._file
+    assert all(s._file is handle for s in sources)
+
+    # the file stays open until the last source is closed
+    sources[0].close()
+    assert handle.id.valid
+    assert_array_equal(d['/b', 1], -cube[1])
+
+    DataCollection([d]).remove(d)
+    assert not handle.id.valid
+    assert all(s._dataset is None for s in sources)
+
+    # sources re-open one shared handle
+    assert_array_equal(d['/a', 0], cube[0])
+    assert_array_equal(d['/c', 0], 2 * cube[0])
+    assert sources[0]._file is sources[2]._file
+
+    d._load_log.reload()
+    assert_array_equal(d['/b'], -cube)
+    d._load_log.close()
+
+
+@requires_h5py
+def test_hdf5_chunk_aligned_reads(tmpdir):
+    import h5py
+    from ..io import HDF5DatasetSource
+
+    fname = str(tmpdir.join('test.hdf5'))
+    cube = np.arange(4 * 8 * 6.).reshape(4, 8, 6)
+    with h5py.File(fname, 'w') as f:
+        f.create_dataset('cube', data=cube, chunks=(2, 4, 6))
+
+    with h5py.File(fname, 'r') as f:
+        source = HDF5DatasetSource(f['cube'])
+        assert_array_equal(source[0, 1:3], cube[0, 1:3])
+        block = source._block
+        assert block[0] == ((0, 2), (0, 4), (0, 6))
+
+        # same chunks -- no new read
+        assert_array_equal(source[1, 0:4, -1], cube[1, 0:4, -1])
+        assert source._block is block
+
+        assert_array_equal(source[3, 5:], cube[3, 5:])
+        assert source._block[0] == ((2, 4), (4, 8), (0, 6))
+
+
+@requires_h5py
+def test_hdf5_threaded_reads(tmpdir):
+    import h5py
+    from multiprocessing.pool import ThreadPool
+    from ..io import HDF5DatasetSource
+
+    fname = str(tmpdir.join('test.hdf5'))
+    cube = np.arange(8 * 8 * 6.).reshape(8, 8, 6)
+    with h5py.File(fname, 'w') as f:
+        f.create_dataset('cube', data=cube, chunks=(2, 4, 6))
+
+    source = HDF5DatasetSource(h5py.File(fname, 'r')['cube'])
+    views = [(i % 8, slice(j, j + 3)) for i in range(40) for j in (0, 5)]
+    pool = ThreadPool(4)
+    try:
+        results = pool.map(lambda v: source[v], views)
+    finally:
+        pool.terminate()
+        source.close()
+    for view, result in zip(views, results):
+        assert_array_equal(result, cube[view])
+
+
 @requires_astropy
 @pytest.mark.parametrize('suffix', ['.h5', '.hdf5', '.hd5', '.h5custom'])
 def test_hdf5_loader(suffix):
@@ -119,6 +317,145 @@ def test_pandas_parse_delimiters(delim, suffix):
     assert_array_equal(d['b'], [2])
 
 
+def test_pandas_chunked(tmpdir, monkeypatch):
+    monkeypatch.setattr(df, 'TABLE_SAMPLE_SIZE', 100)
+    monkeypatch.setattr(df, 'TABLE_CHUNK_SIZE', 200)
+
+    x = np.arange(500)
+    path = tmpdir.join('test.csv')
+    rows = ['%i|%s|%i' % (i, i * 0.5 if i < 400 else 'nan', 2 * i)
+            for i in x]
+    path.write('a|b|c\n' + '\n'.join(rows) + '\n')
+
+    progress = []
+    d = df.pandas_read_table(str(path), progress=progress.append)
+
+    assert_array_equal(d['a'], x)
+    assert_array_equal(d['b'][:400], x[:400] * 0.5)
+    assert np.isnan(d['b'][400:]).all()
+    assert_array_equal(d['c'], 2 * x)
+    assert len(progress) > 1
+    assert progress[-1] == 1
+
+
+def test_pandas_sample_partial_line(tmpdir, monkeypatch):
+    # the sample holds no whole line
+    monkeypatch.setattr(df, 'TABLE_SAMPLE_SIZE', 5)
+    path = tmpdir.join('test.csv')
+    path.write('alpha,beta\n1,2\n3,4\n')
+
+    d = df.pandas_read_table(str(path))
+    assert_array_equal(d['alpha'], [1, 3])
+    assert_array_equal(d['beta'], [2, 4])
+
+
+def test_pandas_sample_disagrees(tmpdir, monkeypatch):
+    # the delimiter picked from the sample fails later in the file
+    monkeypatch.setattr(df, 'TABLE_SAMPLE_SIZE', 20)
+    path = tmpdir.join('test.csv')
+    path.write('a,b\n' + '1,2\n' * 10 + '1,2,3,4\n')
+
+    d = df.pandas_read_table(str(path))
+    assert d.size == 11
+
+
+def test_pandas_serial_read_keeps_kwargs(tmpdir, monkeypatch):
+    monkeypatch.setattr(df, 'TABLE_SAMPLE_SIZE', 20)
+    path = tmpdir.join('test.csv')
+    path.write('# comment\na,b\n' + '1,2\n' * 10)
+
+    d = df.pandas_read_table(str(path), comment='#')
+    assert_array_equal(d['a'], [1] * 10)
+
+
+def test_chunk_ranges(tmpdir):
+    path = tmpdir.join('test.csv')
+    path.write('a,b\n' + '1,2\n' * 100)
+    ranges = df._chunk_ranges(str(path), 4, 25)
+    assert ranges[0][0] == 4
+    assert ranges[-1][1] == 404
+    for (lo, hi), (lo2, hi2) in zip(ranges[:-1], ranges[1:]):
+        assert hi == lo2
+        assert (hi - 4) % 4 == 0  # on a line boundary
+
+
+def test_expand_data_paths(tmpdir):
+    for name in ['a.csv', 'b.csv', 'c.txt', '.hidden']:
+        tmpdir.join(name).write('x\n1\n')
+    tmpdir.mkdir('sub')
+
+    base = str(tmpdir)
+    names = lambda paths: [p[len(base) + 1:] for p in paths]
+
+    assert names(df.expand_data_paths([base])) == ['a.csv', 'b.csv', 'c.txt']
+    assert names(df.expand_data_paths([base + '/*.csv'])) == ['a.csv', 'b.csv']
+
+    # literal paths are passed through, even if missing
+    assert df.expand_data_paths(['missing.csv']) == ['missing.csv']
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_add_data_files(tmpdir, workers):
+    from ..data_collection import DataCollection
+
+    for i in range(4):
+        tmpdir.join('%i.csv' % i).write('x,y\n%i,2\n3,4\n' % i)
+    tmpdir.join('bad.csv').write('x,y\n1,2\n')
+
+    def factory(path):
+        if path.endswith('bad.csv'):
+            raise IOError("bad file")
+        return df.tabular_data(path)
+
+    dc = DataCollection()
+    with patch.object(df, 'warnings') as warn:
+        results = df.add_data_files(dc, [str(tmpdir)], factory=factory,
+                                    workers=workers)
+
+    assert len(results) == 5
+    assert sorted(d.label for d in dc) == ['0', '1', '2', '3']
+    warn.warn.assert_called_once_with('Could not load %s: bad file' %
+                                      tmpdir.join('bad.csv'))
+    for d in dc:
+        assert d['x'][0] == int(d.label)
+
+
+def test_file_watchers_created_on_calling_thread(tmpdir, monkeypatch):
+    import threading
+    from ...config import auto_refresh
+
+    for i in range(3):
+        tmpdir.join('%i.csv' % i).write('x,y\n%i,2\n' % i)
+
+    threads = []
+    monkeypatch.setattr(df, 'FileWatcher', lambda path, callback:
+                        threads.append(threading.current_thread()))
+
+    auto_refresh(True)
+    try:
+        results = list(df.iter_load_data(df.expand_data_paths(str(tmpdir)),
+                                         workers=3))
+        assert len(results) == 3
+        assert threads == []
+
+        df.add_data_files(DataCollection(), [str(tmpdir)], workers=3)
+    finally:
+        auto_refresh(False)
+    assert threads == [threading.current_thread()] * 3
+
+
+def test_start_loading_data(tmpdir):
+    for i in range(3):
+        tmpdir.join('%i.csv' % i).write('x,y\n%i,2\n' % i)
+
+    results = df.start_loading_data(df.expand_data_paths(str(tmpdir)),
+                                    workers=2)
+    loaded = []
+    for result in iter(lambda: results.get(timeout=10), None):
+        loaded.append(result.data.label)
+    assert sorted(loaded) == ['0', '1', '2']
+
+
 @requires_astropy
 def test_fits_gz_factory():
     data = b'\x1f\x8b\x08\x08\xdd\x1a}R\x00\x03test.fits\x00\xed\xd1\xb1\n\xc20\x10\xc6q\x1f\xe5\xde@ZA]\x1cZ\x8d\x10\xd0ZL\x87\xe2\x16m\x0b\x1d\x9aHR\x87n>\xba\xa5".\tRq\x11\xbe_\xe6\xfb\x93\xe3\x04\xdf\xa7;F\xb4"\x87\x8c\xa6t\xd1\xaa\xd2\xa6\xb1\xd4j\xda\xf2L\x90m\xa5*\xa4)\\\x03D1\xcfR\x9e\xbb{\xc1\xbc\xefIcdG\x85l%\xb5\xdd\xb5tW\xde\x92(\xe7\x82<\xff\x0b\xfb\x9e\xba5\xe7\xd2\x90\xae^\xe5\xba)\x95\xad\xb5\xb2\xfe^\xe0\xed\x8d6\xf4\xc2\xdf\xf5X\x9e\xb1d\xe3\xbd\xc7h\xb1XG\xde\xfb\x06_\xf4N\xecx Go\x16.\xe6\xcb\xf1\xbdaY\x00\x00\x00\x80?r\x9f<\x1f\x00\x00\x00\x00\x00|\xf6\x00\x03v\xd8\xf6\x80\x16\x00\x00'
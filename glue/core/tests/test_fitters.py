@@ -1,13 +1,14 @@
 import pytest
 
-from mock import MagicMock
+from mock import MagicMock, patch
 import numpy as np
 
 needs_modeling = pytest.mark.skipif("False", reason='')
 
 
-from ..fitters import (PolynomialFitter, IntOption,
-                       BasicGaussianFitter)
+from ..fitters import (BaseFitter1D, PolynomialFitter, IntOption,
+                       BasicGaussianFitter, CubeFitter, _fit_gaussian_batch)
+from ..data import Data
 
 from ...tests.helpers import requires_scipy, requires_astropy_ge_03, ASTROPY_GE_03_INSTALLED
 
@@ -200,3 +201,254 @@ class TestBasicGaussianFitter(object):
         expected = [3.67879441e-01, 1.83156389e-02, 1.23409804e-04]
         np.testing.assert_array_almost_equal(f.predict(r, [1, 2, 3]),
                                              expected)
+
+    @requires_scipy
+    def test_starts_from_constraint_values(self):
+        # two peaks: the fit finds the one it starts closest to
+        f = BasicGaussianFitter()
+        x = np.linspace(-10, 10, 81)
+        y = np.exp(-(x + 4) ** 2 / 2) + 1.2 * np.exp(-(x - 4) ** 2 / 2)
+        c = dict(amplitude=dict(value=1, fixed=False, limits=None),
+                 mean=dict(value=-4, fixed=False, limits=None),
+                 stddev=dict(value=1, fixed=False, limits=None))
+        r = f.fit(x, y, None, c)
+        np.testing.assert_allclose(r[1], -4, atol=1e-3)
+
+        c['mean']['value'] = 4
+        r = f.fit(x, y, None, c)
+        np.testing.assert_allclose(r[1], 4, atol=1e-3)
+
+
+class TestFitBatch(object):
+
+    def test_warm_start(self):
+        fitter = BaseFitter1D()
+        fitter.fit = MagicMock()
+        fitter.parameter_values = MagicMock(side_effect=[dict(a=1, b=2), None,
+                                                         dict(a=3, b=4)])
+        constraints = dict(a=dict(value=None, fixed=False, limits=None),
+                           b=dict(value=5, fixed=True, limits=None))
+        y = np.ones((3, 4))
+        y[1, 2] = np.nan
+        fitter.fit_batch(np.arange(4), y, constraints=constraints)
+
+        calls = [call[1] for call in fitter.fit.call_args_list]
+        assert calls[0]['constraints'] == constraints
+        assert calls[1]['constraints']['a']['value'] == 1
+        assert calls[1]['constraints']['b']['value'] == 5  # fixed
+        assert calls[2]['constraints'] == constraints  # previous failed
+        assert len(fitter.fit.call_args_list[1][0][1]) == 3  # nan skipped
+
+    def test_failures(self):
+        fitter = BaseFitter1D()
+        y = np.ones((2, 4))
+        y[1] = np.nan
+        assert fitter.fit_batch(np.arange(4), y) == [None, None]
+
+    def test_errors_are_not_failures(self):
+        fitter = BaseFitter1D()
+        fitter.fit = MagicMock(side_effect=TypeError())
+        with pytest.raises(TypeError):
+            fitter.fit_batch(np.arange(4), np.ones((2, 4)))
+
+    def test_shared_dy(self):
+        fitter = BaseFitter1D()
+        fitter.fit = MagicMock()
+        fitter.parameter_values = MagicMock(return_value=None)
+        y = np.ones((2, 4))
+        y[1, 2] = np.nan
+        fitter.fit_batch(np.arange(4), y, dy=np.arange(4.))
+        dy = [call[1]['dy'] for call in fitter.fit.call_args_list]
+        np.testing.assert_array_equal(dy[0], [0, 1, 2, 3])
+        np.testing.assert_array_equal(dy[1], [0, 1, 3])
+
+    @pytest.mark.parametrize('dy', [None, np.linspace(1, 2, 10)])
+    def test_polynomial(self, dy):
+        f = PolynomialFitter(degree=2)
+        x = np.linspace(-1, 3, 10)
+        y = np.random.normal(size=(5, 10))
+        y[3, 4] = np.nan
+
+        batch = f.build_and_fit_batch(x, y, dy=dy)
+        for row, fit in zip(y, batch):
+            ok = np.isfinite(row)
+            err = None if dy is None else dy[ok]
+            np.testing.assert_array_almost_equal(
+                fit, f.build_and_fit(x[ok], row[ok], dy=err))
+
+    @requires_scipy
+    def test_gaussian(self):
+        f = BasicGaussianFitter()
+        x = np.linspace(-10, 10, 50)
+        amp = np.linspace(1, 3, 6)[:, None]
+        mean = np.linspace(-2, 2, 6)[:, None]
+        y = amp * np.exp(-(x - mean) ** 2 / 2)
+        y += np.random.RandomState(0).normal(0, 0.01, y.shape)
+        y[2, 10] = np.nan
+        y[5] = np.nan
+
+        batch = f.build_and_fit_batch(x, y)
+        assert batch[5] is None
+        for row, fit in zip(y[:5], batch):
+            ok = np.isfinite(row)
+            np.testing.assert_allclose(
+                fit, f.build_and_fit(x[ok], row[ok]), rtol=1e-5)
+
+    @requires_scipy
+    def test_gaussian_starts_from_neighbour(self):
+        # the second profile sums to zero, so the estimates from the
+        # data are not finite
+        x = np.linspace(-5, 5, 41)
+        y = BasicGaussianFitter.eval(x, 3, 0.5, 1) * np.ones((2, 1))
+        y[1, 0] -= y[1].sum()
+
+        good, redo, params = _fit_gaussian_batch(x, y, neighbours=False)
+        np.testing.assert_array_equal(good, [True, False])
+        np.testing.assert_array_equal(redo, [1])
+
+        good, redo, params = _fit_gaussian_batch(x, y)
+        np.testing.assert_array_equal(good, [True, True])
+        assert redo.size == 0
+        np.testing.assert_allclose(params[1], [3, 0.5, 1], rtol=1e-4)
+
+    @requires_scipy
+    def test_gaussian_converges_on_noisy_data(self):
+        # the vectorized fit should reach the chi^2 of fitting each
+        # profile on its own
+        f = BasicGaussianFitter()
+        x = np.linspace(-10, 10, 40)
+        rs = np.random.RandomState(1)
+        amp, mean, stddev = rs.uniform([1, -3, 0.7], [2, 3, 3], (500, 3)).T
+        y = BasicGaussianFitter.eval(x, amp[:, None], mean[:, None],
+                                     stddev[:, None])
+        y += rs.normal(0, 0.3, y.shape)
+
+        def chi2(fit, row):
+            return ((f.predict(fit, x) - row) ** 2).sum()
+
+        batch = f.build_and_fit_batch(x, y)
+        for row, fit in zip(y, batch):
+            single = chi2(f.build_and_fit(x, row), row)
+            assert chi2(fit, row) <= single * (1 + 1e-6)
+
+
+class TestCubeFitter(object):
+
+    def setup_method(self, method):
+        # a line in every pixel, with slope a and intercept b
+        z = np.arange(6.)[:, None, None]
+        self.a = np.arange(12.).reshape(3, 4)
+        self.b = -np.arange(12.).reshape(3, 4) / 2
+        cube = self.a * z + self.b
+        cube[2, 0, 0] = np.nan
+        cube[:, 2, 3] = np.nan
+        self.data = Data(x=cube)
+        self.fitter = PolynomialFitter(degree=1)
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_fit(self, workers):
+        cube = CubeFitter(self.fitter, self.data, self.data.id['x'], 0,
+                          workers=workers, chunk_size=5)
+        progress = MagicMock()
+        maps = cube.run(progress=progress)
+
+        a, b = self.a.copy(), self.b.copy()
+        a[2, 3] = b[2, 3] = np.nan  # no finite values to fit
+        np.testing.assert_array_almost_equal(maps['c1'], a)
+        np.testing.assert_array_almost_equal(maps['c0'], b)
+        progress.assert_called_with(12, 12)
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 5, 20])
+    def test_spectral_axis_last(self, chunk_size):
+        data = Data(x=np.rollaxis(self.data['x'], 0, 3))
+        maps = CubeFitter(self.fitter, data, data.id['x'], 2,
+                          workers=1, chunk_size=chunk_size).run()
+        np.testing.assert_array_almost_equal(maps['c1'][:2], self.a[:2])
+        np.testing.assert_array_almost_equal(maps['c0'][:2], self.b[:2])
+
+    def test_reads_blocks(self):
+        cube = CubeFitter(self.fitter, self.data, self.data.id['x'], 0,
+                          chunk_size=3)
+        chunks = cube._chunks(cube._pixels())
+        assert [c.tolist() for _, c in chunks] == [[0, 1, 2], [3],
+                                                   [4, 5, 6], [7],
+                                                   [8, 9, 10], [11]]
+
+        with patch.object(Data, '__getitem__',
+                          side_effect=Data.__getitem__,
+                          autospec=True) as getitem:
+            for _ in cube._jobs(chunks):
+                pass
+        views = [args[1][1] for args, _ in getitem.call_args_list[1:]]
+        assert views == [(slice(None), slice(r, r + 1), slice(None))
+                         for r in range(3)]
+
+    def test_subset(self):
+        subset = self.data.new_subset()
+        subset.subset_state = self.data.id['x'] > 40
+        maps = CubeFitter(self.fitter, self.data, self.data.id['x'], 0,
+                          subset=subset, workers=1).run()
+        fit = subset.to_mask().any(axis=0)
+        assert np.isfinite(maps['c1']).sum() == fit.sum()
+        np.testing.assert_array_almost_equal(maps['c1'][fit], self.a[fit])
+
+    def test_cancel(self):
+        cube = CubeFitter(self.fitter, self.data, self.data.id['x'], 0,
+                          workers=1, chunk_size=1)
+        progress = MagicMock(side_effect=lambda done, total: cube.cancel())
+        assert cube.run(progress=progress) is None
+        assert progress.call_count == 1
+
+    def test_add_to_data(self):
+        cube = CubeFitter(self.fitter, self.data, self.data.id['x'], 0,
+                          workers=1)
+        c0, c1 = cube.add_to_data(cube.run())
+        assert c1.label == 'Polynomial c1'
+        np.testing.assert_array_almost_equal(self.data[c1][4, :2],
+                                             self.a[:2])
+
+        # fitting again updates the same components
+        assert cube.add_to_data(cube.run()) == [c0, c1]
+
+    @requires_astropy_ge_03
+    def test_gaussian(self):
+        # fit in pixel coordinates
+        x = np.arange(40.)[:, None]
+        mean = np.linspace(15, 25, 10)
+        data = Data(x=np.exp(-(x - mean) ** 2 / 8)[:, None, :])
+
+        f = SimpleAstropyGaussianFitter()
+        maps = CubeFitter(f, data, data.id['x'], 0, workers=1).run()
+        np.testing.assert_array_almost_equal(maps['mean'][0], mean)
+        np.testing.assert_array_almost_equal(maps['stddev'][0], 2)
+
+    @requires_astropy_ge_03
+    def test_registered_gaussian_is_vectorized(self):
+        from .. import fitters
+        x = np.arange(40.)[:, None]
+        mean = np.linspace(15, 25, 10)
+        data = Data(x=np.exp(-(x - mean) ** 2 / 8)[:, None, :])
+
+        f = [c for c in fitters.__FITTERS__ if c.label == 'Gaussian'][0]()
+        assert isinstance(f, SimpleAstropyGaussianFitter)
+        with patch.object(fitters, '_fit_gaussians',
+                          side_effect=fitters._fit_gaussians) as batch:
+            with patch.object(SimpleAstropyGaussianFitter, 'fit') as single:
+                maps = CubeFitter(f, data, data.id['x'], 0, workers=1).run()
+        assert batch.call_count == 1
+        assert single.call_count == 0
+        np.testing.assert_array_almost_equal(maps['mean'][0], mean)
+        np.testing.assert_array_almost_equal(maps['stddev'][0], 2)
+
+        # results can be used like those of fit
+        fit = f.fit_batch(np.arange(40.), data['x'][:, 0].T)[3]
+        np.testing.assert_allclose(f.predict(fit, x[:, 0]),
+                                   data['x'][:, 0, 3], atol=1e-6)
+        assert 'Converged' in f.summarize(fit, x[:, 0], data['x'][:, 0, 3])
+
+        # fixed parameters are fit one profile at a time
+        f.set_constraint('stddev', value=2, fixed=True)
+        with patch.object(fitters, '_fit_gaussians') as batch:
+            maps = CubeFitter(f, data, data.id['x'], 0, workers=1).run()
+        assert batch.call_count == 0
+        np.testing.assert_array_almost_equal(maps['mean'][0], mean)
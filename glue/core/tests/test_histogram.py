@@ -0,0 +1,181 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ..data import Data
+from ..histogram import fast_histogram, HistogramCache
+from ..subset import SubsetState
+
+
+def test_fast_histogram_matches_numpy():
+    x = np.random.normal(size=1000)
+    x[:5] = np.nan
+    x[5] = 2
+    result = fast_histogram(x, -1, 2, 7)
+    expected = np.histogram(x[5:], bins=7, range=(-1, 2))[0]
+    assert_allclose(result, expected)
+
+
+class TestHistogramCache(object):
+
+    def setup_method(self, method):
+        self.x = np.random.normal(size=10000)
+        self.x[:5] = np.nan
+        self.mask = self.x > 0.3
+
+    def test_exact(self):
+        cache = HistogramCache(self.x)
+        assert cache.size == self.x.size
+        result = cache.counts(-1, 1, 10)
+        expected = np.histogram(self.x[5:], bins=10, range=(-1, 1))[0]
+        assert_allclose(result, expected)
+
+    def test_exact_masked(self):
+        cache = HistogramCache(self.x)
+        result = cache.counts(-1, 1, 10, mask=self.mask)
+        expected = np.histogram(self.x[self.mask], bins=10, range=(-1, 1))[0]
+        assert_allclose(result, expected)
+
+    def test_masks_share_bin_indices(self):
+        cache = HistogramCache(self.x)
+        cache.counts(-1, 1, 10)
+        idx = cache.bin_indices(-1, 1, 10)
+        cache.counts(-1, 1, 10, mask=self.mask, key='a')
+        cache.counts(-1, 1, 10, mask=~self.mask, key='b')
+        assert cache.bin_indices(-1, 1, 10) is idx
+
+    def test_bin_indices_compact(self):
+        cache = HistogramCache(self.x)
+        assert cache.bin_indices(-1, 1, 10).dtype == np.uint8
+        assert cache.bin_indices(-1, 1, 255).dtype == np.uint8
+        assert cache.bin_indices(-1, 1, 256).dtype == np.uint16
+        assert cache.bin_indices(-1, 1, cache.BASE_BINS).dtype == np.uint16
+        assert cache.bin_indices(-1, 1, 10 ** 5).dtype == np.uint32
+
+    def test_bin_indices_chunked(self, monkeypatch):
+        from .. import histogram
+        expected = HistogramCache(self.x).bin_indices(-1, 1, 10)
+        monkeypatch.setattr(histogram, 'INDEX_CHUNK_SIZE', 333)
+        result = HistogramCache(self.x).bin_indices(-1, 1, 10)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_bin_indices_bounded_by_size(self):
+        cache = HistogramCache(self.x)
+        cache.MAX_INDEX_BYTES = 2 * self.x.size
+        first = cache.bin_indices(-1, 1, 10)
+        cache.bin_indices(-1, 1, 11)
+        assert cache.bin_indices(-1, 1, 10) is first
+        cache.bin_indices(-1, 1, 300)  # 2 bytes per value
+        assert list(cache._indices.keys()) == [(-1, 1, 300)]
+
+    def test_keyed_counts_cached(self):
+        cache = HistogramCache(self.x)
+        result = cache.counts(-1, 1, 10, mask=self.mask, key='a')
+        assert cache.counts(-1, 1, 10, mask=self.mask, key='a') is result
+        assert cache.counts(-1, 1, 10, mask=~self.mask, key='b') is not result
+
+    def test_rebinned(self):
+        cache = HistogramCache(self.x)
+        cache.EXACT_LIMIT = 0
+        cache.BASE_BINS = 100000
+
+        for lo, hi, nbins in [(-1, 1, 10), (-5, 5, 3), (0, 0.5, 17)]:
+            result = cache.counts(lo, hi, nbins)
+            expected = np.histogram(self.x[5:], bins=nbins,
+                                    range=(lo, hi))[0]
+            # approximate within 1 base bin of each edge
+            assert_allclose(result, expected, atol=2)
+
+            result = cache.counts(lo, hi, nbins, mask=self.mask, key='a')
+            expected = np.histogram(self.x[self.mask], bins=nbins,
+                                    range=(lo, hi))[0]
+            assert_allclose(result, expected, atol=2)
+
+    def test_rebinned_base_computed_once(self):
+        cache = HistogramCache(self.x)
+        cache.EXACT_LIMIT = 0
+        cache.counts(-1, 1, 10)
+        base = cache._base_indices
+        cache.counts(-2, 1, 30)
+        cache.counts(-2, 1, 30, mask=self.mask, key='a')
+        assert cache._base_indices is base
+
+    def test_narrow_bins_exact(self):
+        x = np.random.normal(size=20000)
+        x[0] = 1e6
+        cache = HistogramCache(x)
+        cache.EXACT_LIMIT = 0
+        result = cache.counts(-1, 1, 10)
+        expected = np.histogram(x, bins=10, range=(-1, 1))[0]
+        assert result.dtype.kind == 'i'
+        assert_allclose(result, expected)
+
+        mask = x > 0.3
+        result = cache.counts(-1, 1, 10, mask=mask, key='a')
+        expected = np.histogram(x[mask], bins=10, range=(-1, 1))[0]
+        assert_allclose(result, expected)
+
+    def test_rebinned_counts_integer(self):
+        cache = HistogramCache(self.x)
+        cache.EXACT_LIMIT = 0
+        result = cache.counts(-1, 1, 7)
+        assert result.dtype.kind == 'i'
+        assert result.sum() == cache.counts(-1, 1, 1)[0]
+
+    def test_all_nan(self):
+        cache = HistogramCache(np.zeros(5) * np.nan)
+        assert cache.range() is None
+        assert_allclose(cache.counts(0, 1, 3), [0, 0, 0])
+
+
+class TestComputeHistogram(object):
+
+    def setup_method(self, method):
+        self.data = Data(x=[1, 2, 2, 3, 3, 3], label='d')
+        self.x = self.data.id['x']
+
+    def test_counts(self):
+        result = self.data.compute_histogram(self.x, 1, 4, 3)
+        assert_allclose(result, [1, 2, 3])
+
+    def test_log(self):
+        result = self.data.compute_histogram(self.x, 0, np.log10(4), 2,
+                                             log=True)
+        expected = np.histogram(np.log10([1, 2, 2, 3, 3, 3]), bins=2,
+                                range=(0, np.log10(4)))[0]
+        assert_allclose(result, expected)
+
+    def test_subset(self):
+        subset = self.data.new_subset()
+        subset.subset_state = self.x > 1.5
+        result = self.data.compute_histogram(self.x, 1, 4, 3, subset=subset)
+        assert_allclose(result, [0, 2, 3])
+
+    def test_subset_counts_follow_mask(self):
+        class Threshold(SubsetState):
+
+            value = 1.5
+
+            def to_mask(self, data, view=None):
+                return data[data.id['x'], view] > self.value
+
+        subset = self.data.new_subset()
+        state = Threshold()
+        subset.subset_state = state
+        self.data.compute_histogram(self.x, 1, 4, 3, subset=subset)
+        state.value = 2.5  # same state, different mask
+        result = self.data.compute_histogram(self.x, 1, 4, 3, subset=subset)
+        assert_allclose(result, [0, 0, 3])
+
+    def test_cache_shared(self):
+        self.data.compute_histogram(self.x, 1, 4, 3)
+        cache = self.data._histogram_cache(self.x)
+        self.data.compute_histogram(self.x, 0, 5, 10)
+        assert self.data._histogram_cache(self.x) is cache
+
+    def test_invalidated_on_update(self):
+        self.data.compute_histogram(self.x, 1, 4, 3)
+        self.data.update_components({self.x: np.array([1, 1, 1, 1, 1, 3])})
+        result = self.data.compute_histogram(self.x, 1, 4, 3)
+        assert_allclose(result, [5, 0, 1])
@@ -0,0 +1,74 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..io import format_csv_rows, write_csv, write_binary
+
+
+def test_format_csv_rows():
+    rows = format_csv_rows([np.array([1, -2, 300]),
+                            np.array([0.1, np.nan, 1e-20]),
+                            np.array(['a', '', 'say "hi"'], dtype=object),
+                            np.array([True, False, True])])
+    assert rows == b'1,0.1,a,1\n-2,nan,,0\n300,1e-20,"say ""hi""",1\n'
+
+
+def test_format_csv_rows_floats_round_trip():
+    x = np.random.random(1000) * 10. ** np.random.randint(-20, 20, 1000)
+    x = np.concatenate([x, [1. / 3, 2. / 3, 0.1, np.inf, -np.inf]])
+    rows = format_csv_rows([x, x.astype(np.float32)])
+    parsed = np.array([r.split(b',') for r in rows.splitlines()], dtype=float)
+    assert_array_equal(parsed[:, 0], x)
+    assert_array_equal(parsed[:, 1].astype(np.float32), x.astype(np.float32))
+    assert rows.splitlines()[-3] == b'0.1,0.1'
+
+
+def test_format_csv_rows_keeps_nul_in_text():
+    rows = format_csv_rows([np.array(['a\0b', 'c\0', ''], dtype=object),
+                            np.array([1, 22, 333])])
+    assert rows == b'a\0b,1\nc\0,22\n,333\n'
+
+
+def test_format_csv_rows_empty():
+    assert format_csv_rows([np.array([])]) == b''
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000])
+def test_write_csv_round_trip(tmpdir, chunk_size):
+    x = np.random.normal(size=(10, 5))
+    y = np.arange(50)
+    path = tmpdir.join('test.csv')
+    write_csv(str(path), [x, y], ['x', 'y'], chunk_size=chunk_size)
+
+    result = np.loadtxt(str(path), delimiter=',', skiprows=1)
+    assert path.readlines()[0] == 'x,y\n'
+    assert_array_equal(result[:, 0], x.ravel())  # floats round-trip exactly
+    assert_array_equal(result[:, 1], y)
+
+
+def test_write_csv_bad_input(tmpdir):
+    path = str(tmpdir.join('test.csv'))
+    with pytest.raises(ValueError) as exc:
+        write_csv(path, [np.arange(3), np.arange(4)], ['a', 'b'])
+    assert exc.value.args[0] == ("All columns must have the same "
+                                 "number of elements")
+
+    with pytest.raises(ValueError) as exc:
+        write_csv(path, [np.arange(3)], ['a', 'b'])
+    assert exc.value.args[0] == "Must provide a name for each column"
+
+
+def test_write_binary(tmpdir):
+    x = np.arange(6, dtype='>f4').reshape(2, 3)
+    mask = np.array([True, False, True])
+    path = tmpdir.join('data.bin')
+
+    layout = write_binary(str(path), [x, mask], ['x', 'mask'])
+    assert layout == [dict(name='x', dtype='<f4', offset=0, size=6),
+                      dict(name='mask', dtype='|u1', offset=24, size=3)]
+
+    raw = path.read_binary()
+    assert_array_equal(np.frombuffer(raw[:24], dtype='<f4'), x.ravel())
+    assert_array_equal(np.frombuffer(raw[24:], dtype='u1'), [1, 0, 1])
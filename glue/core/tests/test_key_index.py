@@ -0,0 +1,108 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..data import Data
+from ..key_index import KeyIndex, JoinIndex
+
+
+def test_mask_matches_in1d():
+    values = np.random.randint(0, 50, (20, 30))
+    keys = [-3, 0, 7, 7, 12, 49, 60]
+    index = KeyIndex(values)
+    expected = np.in1d(values.ravel(), keys).reshape(values.shape)
+    assert_array_equal(index.mask(keys), expected)
+
+
+def test_lookup():
+    index = KeyIndex([3, 1, 3, 2, 1])
+    assert_array_equal(index.keys, [1, 2, 3])
+    assert_array_equal(index.counts(), [2, 1, 2])
+    assert_array_equal(index.lookup([3, 1]), [1, 4, 0, 2])
+    assert_array_equal(index.lookup([4, 0]), [])
+    assert_array_equal(index.lookup([]), [])
+
+
+def test_nan_keys_never_match():
+    index = KeyIndex([1., np.nan, 2.])
+    assert_array_equal(index.mask([np.nan, 2]), [False, False, True])
+
+
+class TestDataKeyIndex(object):
+
+    def setup_method(self, method):
+        self.image = Data(structure=[[0, 1], [1, -1]], label='image')
+        self.dendro = Data(height=[3, 1], label='dendro')
+        self.image.join_on_key(self.dendro, 'structure',
+                               self.dendro.pixel_component_ids[0])
+
+    def test_join_uses_cached_index(self):
+        s = self.image.new_subset()
+        s.subset_state = self.dendro.id['height'] > 2
+        assert_array_equal(s.to_mask(), [[True, False], [False, False]])
+
+        index = self.image._key_index(self.image.id['structure'])
+        s.subset_state = self.dendro.id['height'] < 2
+        assert_array_equal(s.to_mask(), [[False, True], [True, False]])
+        assert_array_equal(s.to_index_list(), [1, 2])
+        assert self.image._key_index(self.image.id['structure']) is index
+
+    def test_index_invalidated_by_update(self):
+        cid = self.image.id['structure']
+        index = self.image._key_index(cid)
+        self.image.update_components({cid: np.array([[1, 1], [0, 0]])})
+        assert self.image._key_index(cid) is not index
+
+        s = self.image.new_subset()
+        s.subset_state = self.dendro.id['height'] > 2
+        assert_array_equal(s.to_mask(), [[False, False], [True, True]])
+
+
+def test_join_index_many_to_many():
+    left = KeyIndex([5, 1, 5, 2, 9])
+    right = KeyIndex([1, 5, 5, 7, 1])
+    join = JoinIndex(left, right)
+
+    selected = join.propagate([False, True, False, True, False])
+    assert_array_equal(selected, [False, False, True, False])
+    assert_array_equal(selected[left.codes], [True, False, True, False, False])
+
+    selected = join.propagate([True, False, False, False, False])
+    assert_array_equal(selected[left.codes],
+                       [False, True, False, False, False])
+
+    empty = JoinIndex(left, KeyIndex([]))
+    assert not empty.propagate(np.zeros(0, dtype=bool)).any()
+
+
+class TestMultiHopJoin(object):
+
+    def setup_method(self, method):
+        self.a = Data(k1=[0, 1, 1, 2], label='a')
+        self.b = Data(k1=[0, 1, 2], k2=[10, 20, 10], label='b')
+        self.c = Data(k2=[10, 20, 20], k3=[7, 8, 9], label='c')
+        self.d = Data(k3=[9, 9, 7], x=[1, 2, 3], label='d')
+        self.a.join_on_key(self.b, 'k1', 'k1')
+        self.b.join_on_key(self.c, 'k2', 'k2')
+        self.c.join_on_key(self.d, 'k3', 'k3')
+
+    def test_three_hops(self):
+        s = self.a.new_subset()
+        s.subset_state = self.d.id['x'] == 3  # k3 = 7 -> k2 = 10 -> k1 = 0, 2
+        assert_array_equal(s.to_mask(), [True, False, False, True])
+        assert_array_equal(s.to_index_list(), [0, 3])
+
+    def test_cycle(self):
+        self.d.join_on_key(self.a, 'x', 'k1')
+        s = self.b.new_subset()
+        s.subset_state = self.c.id['k3'] > 7
+        assert_array_equal(s.to_mask(), [False, True, False])
+
+    def test_join_index_invalidated_by_update(self):
+        s = self.c.new_subset()
+        s.subset_state = self.d.id['x'] > 2
+        assert_array_equal(s.to_mask(), [True, False, False])
+
+        self.d.update_components({self.d.id['k3']: np.array([8, 8, 8])})
+        assert_array_equal(s.to_mask(), [False, True, False])
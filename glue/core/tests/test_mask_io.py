@@ -0,0 +1,117 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..data import Data
+from ..mask_io import encode_mask, decode_mask, write_masks, read_masks
+from ...tests.helpers import requires_h5py
+
+
+def random_mask(shape, fraction):
+    return np.random.random(shape) < fraction
+
+
+class TestEncoding(object):
+
+    @pytest.mark.parametrize('encoding', ['bits', 'indices', 'runs'])
+    @pytest.mark.parametrize('fraction', [0, 0.01, 0.5, 1])
+    def test_round_trip(self, encoding, fraction):
+        mask = random_mask((13, 7), fraction)
+        enc, values = encode_mask(mask, encoding)
+        assert enc == encoding
+        assert_array_equal(decode_mask(enc, values, mask.shape), mask)
+
+    def test_sparse_uses_indices(self):
+        mask = np.zeros(10000, dtype=bool)
+        mask[[5, 500, 5000]] = True
+        enc, values = encode_mask(mask)
+        assert enc == 'indices'
+        assert values.dtype == np.uint16
+
+    def test_contiguous_uses_runs(self):
+        mask = np.zeros((100, 100), dtype=bool)
+        mask[20:30] = True
+        enc, values = encode_mask(mask)
+        assert enc == 'runs'
+        assert_array_equal(values, [[2000, 1000]])
+
+    def test_dense_uses_bits(self):
+        mask = random_mask(10000, 0.5)
+        enc, values = encode_mask(mask)
+        assert enc == 'bits'
+        assert values.nbytes == 1250
+
+    def test_bad_encoding(self):
+        with pytest.raises(ValueError) as exc:
+            encode_mask(np.zeros(3, dtype=bool), 'bad')
+        assert exc.value.args[0].startswith("Unknown mask encoding: bad")
+
+
+class TestWriteMasks(object):
+
+    def setup_method(self, method):
+        self.data = Data(x=np.arange(1000).reshape(10, 100), label='d')
+        x = self.data.id['x']
+        self.subsets = [self.data.new_subset(label='low'),
+                        self.data.new_subset(label='odd'),
+                        self.data.new_subset(label='none')]
+        self.subsets[0].subset_state = x < 300
+        self.subsets[1].subset_state = (x > 10) & (x < 20) | (x > 900)
+        self.subsets[2].subset_state = x < 0
+
+    def check(self, path, **kwargs):
+        write_masks(self.subsets, path, **kwargs)
+        result = read_masks(path)
+
+        assert [r[0] for r in result] == ['low', 'odd', 'none']
+        for (label, shape, state), subset in zip(result, self.subsets):
+            assert shape == (10, 100)
+            assert_array_equal(state.to_mask(self.data), subset.to_mask())
+
+    def test_npz(self, tmpdir):
+        self.check(str(tmpdir.join('masks.npz')))
+
+    def test_npz_forced_encoding(self, tmpdir):
+        self.check(str(tmpdir.join('masks.npz')), encoding='bits')
+
+    @requires_h5py
+    def test_hdf5(self, tmpdir):
+        self.check(str(tmpdir.join('masks.hdf5')))
+
+    @requires_h5py
+    def test_hdf5_by_format(self, tmpdir):
+        self.check(str(tmpdir.join('masks')), format='hdf5')
+
+    def test_smaller_than_mask(self, tmpdir):
+        data = Data(x=np.random.random(100000))
+        subset = data.new_subset()
+        subset.subset_state = data.id['x'] > 0.5
+
+        path = tmpdir.join('masks.npz')
+        write_masks([subset], str(path))
+        assert path.size() < data.size / 7
+
+
+class _Unpickled(object):
+
+    def __reduce__(self):
+        return (_mark_unpickled, ())
+
+
+UNPICKLED = []
+
+
+def _mark_unpickled():
+    UNPICKLED.append(True)
+
+
+def test_read_masks_never_unpickles(tmpdir):
+    import pickle
+
+    path = tmpdir.join('mask.npy')
+    path.write_binary(pickle.dumps(_Unpickled()))
+    with pytest.raises(IOError):
+        read_masks(str(path))
+    assert not UNPICKLED
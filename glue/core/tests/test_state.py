@@ -14,6 +14,7 @@ from ...qt.widgets.scatter_widget import ScatterWidget
 from ...qt.widgets.image_widget import ImageWidget
 from ...qt.widgets.histogram_widget import HistogramWidget
 from .util import make_file
+from ..data import LazyComponent
 from ..data_factories import load_data
 from .test_data_factories import TEST_FITS_DATA
 from io import BytesIO
@@ -120,6 +121,137 @@ def test_save_numpy_scalar():
     assert clone(np.float32(5)) == 5
 
 
+class TestArchive(object):
+
+    def clone(self, obj, tmpdir):
+        path = str(tmpdir.join('session.glu'))
+        gs = GlueSerializer(obj)
+        oid = gs.id(obj)
+        gs.dump_archive(path)
+        return GlueUnSerializer.load_path(path).object(oid)
+
+    def test_arrays_stored_as_members(self, tmpdir):
+        import zipfile
+        d = core.Data(x=np.arange(12.).reshape(3, 4), label='testing')
+        path = str(tmpdir.join('session.glu'))
+        GlueSerializer(d).dump_archive(path)
+
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+            rec = json.loads(zf.read('session.json').decode('utf-8'))
+        assert 'session.json' in names
+        assert len([n for n in names if n.endswith('.npy')]) == 1
+
+        arrays = [r['data'] for r in rec.values()
+                  if r['_type'] == 'glue.core.data.Component']
+        assert arrays == [{'member': 'arrays/0.npy',
+                           '_type': 'numpy.ndarray'}]
+
+    def test_arrays_memory_mapped(self, tmpdir):
+        x = np.random.random((5, 4)).T
+        d = core.Data(x=x, label='testing')
+        d2 = self.clone(d, tmpdir)
+        assert isinstance(d2['x'], np.memmap)
+        np.testing.assert_array_equal(d2['x'], x)
+
+    def test_mask_subset(self, tmpdir):
+        d = core.Data(x=[1, 2, 3], label='testing')
+        d.new_subset().subset_state = core.subset.MaskSubsetState(
+            np.array([True, False, True]), d.pixel_component_ids)
+        d2 = self.clone(d, tmpdir)
+        np.testing.assert_array_equal(d2.subsets[0].to_mask(),
+                                      [True, False, True])
+
+    def test_overwrite_while_mapped(self, tmpdir):
+        d = core.Data(x=[1, 2, 3], label='testing')
+        d2 = self.clone(d, tmpdir)
+        d3 = self.clone(d2, tmpdir)
+        np.testing.assert_array_equal(d2['x'], [1, 2, 3])
+        np.testing.assert_array_equal(d3['x'], [1, 2, 3])
+
+    def test_overwrite_unmapped(self, tmpdir, monkeypatch):
+        from .. import state
+        monkeypatch.setattr(state, 'MMAP_ARCHIVES', False)
+        d = core.Data(x=[1, 2, 3], label='testing')
+        d2 = self.clone(d, tmpdir)
+        assert not isinstance(d2['x'], np.memmap)
+        d3 = self.clone(d2, tmpdir)
+        np.testing.assert_array_equal(d3['x'], [1, 2, 3])
+
+    def test_load_path_json(self, tmpdir):
+        d = core.Data(x=[1, 2, 3], label='testing')
+        path = tmpdir.join('session.glu')
+        path.write(GlueSerializer(d).dumps())
+        d2 = GlueUnSerializer.load_path(str(path)).object('__main__')
+        np.testing.assert_array_equal(d2['x'], [1, 2, 3])
+
+
+@requires_astropy
+class TestLazyRestore(object):
+
+    def setup_method(self, method):
+        from astropy.io import fits
+        s = BytesIO()
+        fits.writeto(s, np.arange(12.).reshape(3, 4))
+        self.contents = s.getvalue()
+
+    def test_data_read_on_access(self):
+        with make_file(self.contents, '.fits') as infile:
+            d = load_data(infile)
+            state = GlueUnSerializer.loads(GlueSerializer(d).dumps())
+            state.lazy = True
+            d2 = state.object('__main__')
+
+            comp = d2.get_component(d2.id['PRIMARY'])
+            assert not comp._load_log.loaded
+            assert d2.shape == (3, 4)
+
+            np.testing.assert_array_equal(d2['PRIMARY', 1],
+                                          [4, 5, 6, 7])
+            assert comp._load_log.loaded
+            assert 'PRIMARY' in state.report()
+
+    def test_resave_without_reading(self):
+        with make_file(self.contents, '.fits') as infile:
+            d = load_data(infile)
+            state = GlueUnSerializer.loads(GlueSerializer(d).dumps())
+            state.lazy = True
+            d2 = state.object('__main__')
+
+            d3 = clone(d2)
+            log = d2.get_component(d2.id['PRIMARY'])._load_log
+            assert not log.loaded
+            np.testing.assert_array_equal(d3['PRIMARY'], d['PRIMARY'])
+
+    def test_views_read_slabs(self):
+        with make_file(self.contents, '.fits') as infile:
+            d = load_data(infile)
+            state = GlueUnSerializer.loads(GlueSerializer(d).dumps())
+            state.lazy = True
+            d2 = state.object('__main__')
+
+            np.testing.assert_array_equal(d2['PRIMARY', 1], [4, 5, 6, 7])
+            log = d2.get_component(d2.id['PRIMARY'])._load_log
+            assert not any(c.loaded for c in log.components
+                           if isinstance(c, LazyComponent))
+
+    def test_reload_updates_restored_data(self):
+        from astropy.io import fits
+        with make_file(self.contents, '.fits') as infile:
+            d = load_data(infile)
+            state = GlueUnSerializer.loads(GlueSerializer(d).dumps())
+            state.lazy = True
+            d2 = state.object('__main__')
+            np.testing.assert_array_equal(d2['PRIMARY', 0], [0, 1, 2, 3])
+
+            version = d2._version
+            fits.writeto(infile, -np.arange(12.).reshape(3, 4),
+                         overwrite=True)
+            d2.get_component(d2.id['PRIMARY'])._load_log.reload()
+            np.testing.assert_array_equal(d2['PRIMARY', 0], [0, -1, -2, -3])
+            assert d2._version > version
+
+
 @requires_astropy
 def tests_data_factory_double():
     # ensure double-cloning doesn't somehow lose lightweight references
@@ -326,6 +458,29 @@ class TestApplication(object):
 
         self.check_clone(app)
 
+    def test_lazy_multi_tab(self):
+        d = core.Data(label='hist', x=[[1, 2], [2, 3]])
+        dc = core.DataCollection([d])
+
+        app = GlueApplication(dc)
+        app.new_data_viewer(HistogramWidget, data=d)
+        app.new_tab()
+        app.new_data_viewer(HistogramWidget, data=d)
+        app.new_tab()
+
+        state = GlueUnSerializer.loads(GlueSerializer(app).dumps())
+        state.lazy = True
+        copy = state.object('__main__')
+
+        # only the visible (last) tab is built
+        assert [len(v) for v in copy.viewers] == [0, 0, 0]
+        copy.tab_widget.setCurrentIndex(1)
+        assert [len(v) for v in copy.viewers] == [0, 1, 0]
+
+        # saving restores every viewer
+        copy2 = clone(copy)
+        assert [len(v) for v in copy2.viewers] == [1, 1, 0]
+
     def test_histogram(self):
         d = core.Data(label='hist', x=[[1, 2], [2, 3]])
         dc = core.DataCollection([d])
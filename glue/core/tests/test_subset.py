@@ -21,7 +21,7 @@ from ..message import SubsetDeleteMessage
 from ..registry import Registry
 from .test_state import clone
 
-from ...tests.helpers import requires_astropy
+from ...tests.helpers import requires_astropy, requires_h5py
 
 
 class TestSubset(object):
@@ -334,6 +334,28 @@ class TestSubsetIo(object):
         mask2 = sub2.to_mask()
         np.testing.assert_array_equal(mask1, mask2)
 
+    def check_compact(self, path):
+        self.subset.write_mask(path)
+        sub2 = Subset(self.data)
+        sub2.read_mask(path)
+        np.testing.assert_array_equal(sub2.to_mask(), self.subset.to_mask())
+
+    def test_read_npz(self, tmpdir):
+        self.check_compact(str(tmpdir.join('mask.npz')))
+
+    @requires_h5py
+    def test_read_hdf5(self, tmpdir):
+        self.check_compact(str(tmpdir.join('mask.hdf5')))
+
+    def test_read_wrong_shape(self, tmpdir):
+        path = str(tmpdir.join('mask.npz'))
+        self.subset.write_mask(path)
+        self.data.shape = (2, 8)
+        with pytest.raises(ValueError) as exc:
+            Subset(self.data).read_mask(path)
+        assert exc.value.args[0] == ("Mask shape (4, 4) does not match "
+                                     "data shape (2, 8)")
+
     @requires_astropy
     def test_read_error(self):
         with pytest.raises(IOError) as exc:
@@ -66,6 +66,13 @@ class TestSubsetGroup(object):
         self.dc.append(d)
         assert d.subsets[0] in sg.subsets
 
+    def test_extend_creates_subsets(self):
+        sg = self.dc.new_subset_group()
+        d1, d2 = Data(label='z', z=[10, 20, 30]), Data(label='w', w=[1, 2])
+        self.dc.extend([d1, d2])
+        assert d1.subsets[0] in sg.subsets
+        assert d2.subsets[0] in sg.subsets
+
     def test_remove_data_deletes_subset(self):
         sg = self.dc.new_subset_group()
         sub = self.dc[0].subsets[0]
@@ -0,0 +1,90 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from .. import data_factories as df
+from .. import table_cache as tc
+from ..data import Data, CategoricalComponent
+from ...config import cache_tables
+
+
+def table_factory(path, **kwargs):
+    table_factory.calls += 1
+    values = np.loadtxt(path, dtype=str, delimiter=',')
+    result = Data(x=values[:, 0].astype(float))
+    result.add_component(CategoricalComponent(values[:, 1]), 'y')
+    return result
+
+
+table_factory.calls = 0
+
+
+class TestTableCache(object):
+
+    def setup_method(self, method):
+        table_factory.calls = 0
+
+    def make_table(self, tmpdir):
+        path = tmpdir.join('table.csv')
+        path.write('1,a\n2,b\n3,a\n4,c\n')
+        return str(path)
+
+    def test_round_trip(self, tmpdir):
+        path = self.make_table(tmpdir)
+        cache = tc.TableCache(str(tmpdir.join('cache')))
+
+        assert cache.load(path, table_factory, {}) is None
+        cache.save(path, table_factory, {}, [table_factory(path)])
+
+        d, = cache.load(path, table_factory, {})
+        assert_array_equal(d['x'], [1, 2, 3, 4])
+        assert isinstance(d['x'], np.memmap)
+
+        comp = d.get_component(d.id['y'])
+        assert isinstance(comp, CategoricalComponent)
+        assert_array_equal(comp._categories, ['a', 'b', 'c'])
+        assert comp._labels is None  # rebuilt from the codes
+        assert_array_equal(d['y'], [0, 1, 0, 2])
+        assert_array_equal(comp._categorical_data, ['a', 'b', 'a', 'c'])
+
+    def test_keyed_on_kwargs(self, tmpdir):
+        path = self.make_table(tmpdir)
+        cache = tc.TableCache(str(tmpdir.join('cache')))
+        cache.save(path, table_factory, {'a': 1}, [table_factory(path)])
+        assert cache.load(path, table_factory, {'a': 2}) is None
+        assert cache.load(path, table_factory, {'a': 1}) is not None
+
+    def test_invalidated_by_modification(self, tmpdir):
+        path = self.make_table(tmpdir)
+        cache = tc.TableCache(str(tmpdir.join('cache')))
+        cache.save(path, table_factory, {}, [table_factory(path)])
+
+        with open(path, 'a') as outfile:
+            outfile.write('5,d\n')
+        assert cache.load(path, table_factory, {}) is None
+
+    def test_images_not_cached(self, tmpdir):
+        path = self.make_table(tmpdir)
+        cache = tc.TableCache(str(tmpdir.join('cache')))
+        cache.save(path, table_factory, {}, [Data(x=np.zeros((2, 2)))])
+        assert cache.load(path, table_factory, {}) is None
+
+    def test_load_data_uses_cache(self, tmpdir, monkeypatch):
+        path = self.make_table(tmpdir)
+        cache = tc.TableCache(str(tmpdir.join('cache')))
+        monkeypatch.setattr(tc, 'table_cache', cache)
+
+        cache_tables(True)
+        try:
+            d1 = df.load_data(path, factory=table_factory)
+            d2 = df.load_data(path, factory=table_factory)
+        finally:
+            cache_tables(False)
+
+        assert table_factory.calls == 1
+        assert d2.label == d1.label == 'table'
+        assert_array_equal(d1['x'], d2['x'])
+        assert d2._load_log.path == os.path.abspath(path)
@@ -6,7 +6,8 @@ import pytest
 import numpy as np
 
 from ..util import (file_format, point_contour, view_shape, facet_subsets,
-                    colorize_subsets, coerce_numeric, as_variable_name, stack_view)
+                    colorize_subsets, coerce_numeric, as_variable_name, stack_view,
+                    broadcast_to)
 
 from ...tests.helpers import requires_scipy
 from ...external.six import string_types
@@ -213,3 +214,19 @@ def test_stack_view(shape, views):
     actual = x[stack_view(shape, *views)]
 
     np.testing.assert_array_equal(exp, actual)
+
+
+def test_broadcast_to():
+    x = np.arange(3.)
+    y = broadcast_to(x, (4, 3))
+    np.testing.assert_array_equal(y, np.tile(x, (4, 1)))
+    assert not y.flags.writeable
+    assert np.may_share_memory(x, y)
+
+    z = broadcast_to(x.reshape(3, 1), (2, 3, 5))
+    np.testing.assert_array_equal(z, x[:, None] * np.ones((2, 3, 5)))
+
+    with pytest.raises(ValueError):
+        broadcast_to(x, (4, 2))
+    with pytest.raises(ValueError):
+        broadcast_to(np.zeros((2, 3)), (3,))
@@ -134,6 +134,36 @@ def view_shape(shape, view):
     return xy[0][view].shape
 
 
+def broadcast_to(array, shape):
+    """Broadcast an array to a shape, without copying it
+
+    Like numpy.broadcast_to, which requires numpy >= 1.10
+
+    :param array: The array to broadcast
+    :param shape: The shape of the result
+
+    Returns a read-only view of the array
+    """
+    from numpy.lib.stride_tricks import as_strided
+
+    array = np.asarray(array)
+    shape = tuple(shape)
+    if array.ndim > len(shape):
+        raise ValueError("Cannot broadcast %s to %s" % (array.shape, shape))
+    array = array.reshape((1,) * (len(shape) - array.ndim) + array.shape)
+
+    strides = []
+    for size, n, stride in zip(shape, array.shape, array.strides):
+        if n != size and n != 1:
+            raise ValueError("Cannot broadcast %s to %s" %
+                             (array.shape, shape))
+        strides.append(stride if n == size else 0)
+
+    result = as_strided(array, shape=shape, strides=strides)
+    result.flags.writeable = False
+    return result
+
+
 def stack_view(shape, *views):
     shp = tuple(slice(0, s, 1) for s in shape)
     result = np.broadcast_arrays(*np.ogrid[shp])
@@ -296,6 +326,26 @@ def coerce_numeric(arr):
     return pd.Series(arr).convert_objects(convert_numeric=True).values
 
 
+def process_pool(workers):
+    """
+    A :class:`multiprocessing.Pool` whose processes are started from
+    scratch, rather than forked, where possible.
+
+    Pools are often created from background threads (e.g. data loaders
+    or fitting threads), and forking a process while other threads are
+    running can deadlock the child, if another thread holds a lock when
+    the process forks. On Python 2, processes can only be forked.
+
+    :param workers: The number of processes
+    """
+    import multiprocessing
+    try:
+        context = multiprocessing.get_context('spawn')
+    except AttributeError:  # Python 2
+        return multiprocessing.Pool(workers)
+    return context.Pool(workers)
+
+
 def check_sorted(array):
     """ Return True if the array is sorted, False otherwise.
     """
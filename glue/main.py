@@ -28,11 +28,17 @@ def parse(argv):
     #start a new session with multiple files
     %prog image.fits catalog.csv
 
+    #load every file in a directory, and every FITS file matching a pattern
+    %prog -l data/ -l 'images/*.fits'
+
     #restore a saved session
     %prog saved_session.glu
     or
     %prog -g saved_session.glu
 
+    #restore a saved session, and load more files into it
+    %prog saved_session.glu -l data/
+
     #run a script
     %prog -x script.py
 
@@ -51,6 +57,14 @@ def parse(argv):
     parser.add_option('-c', '--config', type='string', dest='config',
                       metavar='CONFIG',
                       help='use CONFIG as configuration file')
+    parser.add_option('-l', '--load', action='append', dest='load',
+                      metavar='PATTERN',
+                      help='load every file matching PATTERN, '
+                      'a glob or directory (can be repeated)')
+    parser.add_option('-j', '--jobs', type='int', dest='jobs',
+                      metavar='N',
+                      help='load data files with N threads '
+                      '(default: number of CPUs)')
 
     err_msg = verify(parser, argv)
     if err_msg:
@@ -74,7 +88,12 @@ def verify(parser, argv):
     opts, args = parser.parse_args(argv)
     err_msg = None
 
-    if opts.script and opts.restore:
+    has_glu = any(a.endswith('.glu') for a in args)
+    if opts.load and opts.script:
+        err_msg = "Cannot specify -l with -x"
+    elif has_glu and len(args) > 1:
+        err_msg = "Cannot load a .glu file together with other files"
+    elif opts.script and opts.restore:
         err_msg = "Cannot specify -g with -x"
     elif opts.script and opts.config:
         err_msg = "Cannot specify -c with -x"
@@ -120,14 +139,30 @@ def restore_session(gluefile):
 
 
 @die_on_error("Error reading data file")
-def load_data_files(datafiles):
-    """Load data files and return a DataCollection"""
-    import glue
-    from glue.core.data_factories import auto_data, load_data
+def load_data_files(datafiles, workers=None, data_collection=None):
+    """Load data files in parallel and return a DataCollection
+
+    :param datafiles: Files, globs or directories to load
+    :param workers: Number of loader threads. Defaults to the number of CPUs
+    :param data_collection: The DataCollection to add the data to.
+                            Defaults to a new, empty collection
 
-    dc = glue.core.DataCollection()
-    for df in datafiles:
-        dc.append(load_data(df, auto_data))
+    If no file can be loaded, the first error is raised. Otherwise,
+    the files which could not be loaded are logged as errors.
+    """
+    import glue
+    from glue.core.data_factories import add_data_files
+
+    dc = data_collection
+    if dc is None:
+        dc = glue.core.DataCollection()
+    results = add_data_files(dc, datafiles, workers=workers)
+    failed = [r for r in results if r.error is not None]
+    if failed and len(failed) == len(results):
+        raise failed[0].error
+    for r in failed:
+        logging.getLogger(__name__).error("Could not load %s: %s",
+                                          r.path, r.error)
     return dc
 
 
@@ -136,7 +171,7 @@ def run_tests():
     test.main()
 
 
-def start_glue(gluefile=None, config=None, datafiles=None):
+def start_glue(gluefile=None, config=None, datafiles=None, workers=None):
     """Run a glue session and exit
 
     :param gluefile: An optional .glu file to restore
@@ -145,8 +180,13 @@ def start_glue(gluefile=None, config=None, datafiles=None):
     :param config: An optional configuration file to use
     :type config: str
 
-    :param datafiles: An optional list of data files to load
+    :param datafiles: An optional list of data files to load. If a .glu
+                      file is also given, the files are added to the
+                      restored session
     :type datafiles: list of str
+
+    :param workers: Number of threads used to load datafiles
+    :type workers: int
     """
     import glue
     from glue.qt.glue_application import GlueApplication
@@ -157,13 +197,16 @@ def start_glue(gluefile=None, config=None, datafiles=None):
 
     if gluefile is not None:
         app = restore_session(gluefile)
+        if datafiles:
+            load_data_files(datafiles, workers=workers,
+                            data_collection=app.data_collection)
         return app.start()
 
     if config is not None:
         glue.env = glue.config.load_configuration(search_path=[config])
 
     if datafiles:
-        data = load_data_files(datafiles)
+        data = load_data_files(datafiles, workers=workers)
 
     if not data:
         data = glue.core.DataCollection()
@@ -208,23 +251,27 @@ def main(argv=sys.argv):
     logging.getLogger(__name__).info("Input arguments: %s", sys.argv)
 
     opt, args = parse(argv[1:])
+    opt.load = opt.load or []
     if opt.test:
         return run_tests()
     elif opt.restore:
-        start_glue(gluefile=args[0], config=opt.config)
+        start_glue(gluefile=args[0], config=opt.config,
+                   datafiles=opt.load or None, workers=opt.jobs)
     elif opt.script:
         execute_script(args[0])
     else:
-        has_file = len(args) == 1
-        has_files = len(args) > 1
+        has_file = len(args) == 1 and not opt.load
+        has_files = len(args) > 1 or bool(opt.load)
         has_py = has_file and args[0].endswith('.py')
-        has_glu = has_file and args[0].endswith('.glu')
+        has_glu = len(args) == 1 and args[0].endswith('.glu')
         if has_py:
             execute_script(args[0])
         elif has_glu:
-            start_glue(gluefile=args[0], config=opt.config)
+            start_glue(gluefile=args[0], config=opt.config,
+                       datafiles=opt.load or None, workers=opt.jobs)
         elif has_file or has_files:
-            start_glue(datafiles=args, config=opt.config)
+            start_glue(datafiles=args + opt.load, config=opt.config,
+                       workers=opt.jobs)
         else:
             start_glue(config=opt.config)
 
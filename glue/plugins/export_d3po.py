@@ -3,6 +3,8 @@ from __future__ import absolute_import, division, print_function
 import json
 import os
 
+import numpy as np
+
 from ..config import exporters
 from ..qt.widgets import ScatterWidget, HistogramWidget
 from ..core import Subset
@@ -148,24 +150,32 @@ def can_save_d3po(application):
                          "in each tab")
 
 
-def make_data_file(data, subsets, path):
+def make_data_file(data, subsets, path, binary=False):
     """
     Create the data.csv file, given Data and tuple of subsets
-    """
-    from astropy.table import Table, Column
 
-    data_path = os.path.join(path, 'data.csv')
+    :param binary: If True, also write the columns to data.bin, as
+                   little-endian typed arrays. Skipped if any column
+                   is not numerical (e.g. categorical or text columns)
+
+    :returns: If data.bin was written, a list describing the layout of
+              each column (see :func:`glue.core.io.write_binary`).
+              Otherwise None
+    """
+    from ..core.io import write_csv, write_binary
 
-    t = Table([data[c] for c in data.components],
-              names=[c.label for c in data.components])
+    columns = [data[c] for c in data.components]
+    names = [c.label for c in data.components]
 
     for i, subset in enumerate(subsets):
         if subset is None:
             continue
-        c = Column(data=subset.to_mask().astype('i'), name='selection_%i' % i)
-        t.add_column(c)
+        columns.append(subset.to_mask())
+        names.append('selection_%i' % i)
 
-    t.write(data_path, format='ascii', delimiter=',')
+    write_csv(os.path.join(path, 'data.csv'), columns, names)
+    if binary and all(np.asarray(c).dtype.kind in 'biuf' for c in columns):
+        return write_binary(os.path.join(path, 'data.bin'), columns, names)
 
 
 def save_d3po(application, path):
@@ -189,12 +199,14 @@ def save_d3po(application, path):
     subsets = stage_subsets(application)
     viewers = application.viewers
 
-    # data.csv
-    make_data_file(data, subsets, path)
+    # data.csv, and data.bin for pages which can fetch typed arrays
+    layout = make_data_file(data, subsets, path, binary=True)
 
     # states.json
     result = {}
     result['filename'] = 'data.csv'  # XXX don't think this is needed?
+    if layout is not None:
+        result['binary'] = dict(filename='data.bin', columns=layout)
     result['title'] = "Glue export of %s" % data.label
     result['states'] = list(map(save_page, application.viewers,
                                 range(len(viewers)),
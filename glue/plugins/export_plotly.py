@@ -1,4 +1,6 @@
+import json
 import logging
+from functools import partial
 
 import numpy as np
 try:
@@ -10,6 +12,7 @@ from ..config import exporters, settings
 from ..qt.widgets import ScatterWidget, HistogramWidget
 from ..core.data import CategoricalComponent
 from ..core.layout import Rectangle, snap_to_grid
+from ..clients.util import fast_histogram2d
 
 
 SYM = {'o': 'circle', 's': 'square', '+': 'cross', '^': 'triangle-up',
@@ -41,6 +44,106 @@ def _sanitize(*arrs):
     return tuple(a[mask].ravel() for a in arrs)
 
 
+def stratified_sample(x, y, max_points, bins=64, seed=0):
+    """
+    Choose a subsample of points which preserves the structure of a
+    scatter plot.
+
+    Points are binned on a bins x bins grid, and each occupied cell
+    keeps one point, so that sparse regions and outliers survive. The
+    rest of the budget is shared between the cells in proportion to
+    their number of points.
+
+    :param x: Numerical x values
+    :param y: Numerical y values
+    :param max_points: The maximum number of points to keep
+    :param bins: The number of grid cells along each axis. Fewer
+                 are used if there are more cells than max_points
+    :param seed: Random seed, so that repeated exports match
+
+    :rtype: Sorted array of indices of the points to keep
+    """
+    n = x.size
+    if n <= max_points:
+        return np.arange(n)
+
+    def cell(v):
+        lo, hi = v.min(), v.max()
+        scale = bins / (hi - lo) if hi > lo else 0
+        return np.minimum(((v - lo) * scale).astype(np.intp), bins - 1)
+
+    # every occupied cell must fit in the budget
+    bins = max(min(bins, int(np.sqrt(max_points))), 1)
+
+    cells = cell(x) * bins + cell(y)
+    counts = np.bincount(cells, minlength=bins * bins)
+    occupied = np.count_nonzero(counts)
+    extra = (counts - 1) * (max_points - occupied) // (n - occupied)
+    quota = 1 + extra
+
+    # visit the points of each cell in a random order,
+    # and keep the first quota of them
+    order = np.random.RandomState(seed).permutation(n)
+    order = order[np.argsort(cells[order], kind='mergesort')]
+    start = np.cumsum(counts) - counts
+    rank = np.arange(n) - start[cells[order]]
+    return np.sort(order[rank < quota[cells[order]]])
+
+
+def _density_trace(x, y, viewer, style, max_points):
+    """
+    Bin a scatter layer into a heatmap, with about max_points cells
+    """
+    nbin = max(min(int(np.sqrt(max_points)), 512), 1)
+
+    def edges(v, lo, hi, log):
+        if log:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                v = np.log10(v)
+            lo, hi = np.log10(max(lo, 1e-300)), np.log10(max(hi, 1e-300))
+        if not (np.isfinite(lo) and np.isfinite(hi)) or hi <= lo:
+            finite = v[np.isfinite(v)]
+            lo, hi = (finite.min(), finite.max()) if finite.size else (0, 1)
+        e = np.linspace(lo, hi, nbin + 1)
+        centers = (e[1:] + e[:-1]) / 2
+        return v, (lo, hi), 10 ** centers if log else centers
+
+    x, xlim, xc = edges(x, viewer.xmin, viewer.xmax, viewer.xlog)
+    y, ylim, yc = edges(y, viewer.ymin, viewer.ymax, viewer.ylog)
+    counts = fast_histogram2d(x, y, xlim, ylim, (nbin, nbin)).astype(float)
+    counts[counts == 0] = np.nan  # leave empty cells transparent
+
+    color = _color(style)
+    transparent = color.rsplit(',', 1)[0] + ', 0)'
+    return dict(type='heatmap', x=xc, y=yc, z=counts,
+                colorscale=[[0, transparent], [1, color]],
+                showscale=False, zsmooth=False)
+
+
+def _payload_size(trace):
+    """ The size of a trace's JSON representation, in bytes """
+    def default(o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        raise TypeError(o)
+    return len(json.dumps(trace, default=default))
+
+
+def payload_report(traces):
+    """
+    Describe the size of each trace sent to plotly
+
+    :rtype: A list of (name, points, bytes) tuples
+    """
+    result = []
+    for t in traces:
+        points = t['z'].size if 'z' in t else np.size(t.get('x', []))
+        result.append((t.get('name'), points, _payload_size(t)))
+    return result
+
+
 def _position_plots(viewers, layout):
     rs = [Rectangle(v.position[0], v.position[1],
                     v.viewer_size[0], v.viewer_size[1])
@@ -145,9 +248,17 @@ def _color(style):
     return 'rgba(%i, %i, %i, %0.1f)' % (r, g, b, a)
 
 
-def export_scatter(viewer):
+def export_scatter(viewer, max_points=None, mode='sample'):
     """Export a scatter viewer to a list of
-    plotly-formatted data dictionaries"""
+    plotly-formatted data dictionaries
+
+    :param max_points: The maximum (approximate) number of points
+                       to export per layer. Defaults to no limit
+    :param mode: How to reduce layers with more than max_points points.
+                 'sample' exports a :func:`stratified_sample`, 'density'
+                 a heatmap of point counts. Layers with categorical
+                 data are always sampled
+    """
     traces = []
     xatt, yatt = viewer.xatt, viewer.yatt
     xcat = ycat = False
@@ -156,14 +267,27 @@ def export_scatter(viewer):
         if not layer.visible:
             continue
         l = layer.layer
-        xcat |= isinstance(l.data.get_component(xatt), CategoricalComponent)
-        ycat |= isinstance(l.data.get_component(yatt), CategoricalComponent)
+        lxcat = isinstance(l.data.get_component(xatt), CategoricalComponent)
+        lycat = isinstance(l.data.get_component(yatt), CategoricalComponent)
+        xcat |= lxcat
+        ycat |= lycat
 
         marker = dict(symbol=SYM.get(l.style.marker, 'circle'),
                       color=_color(l.style),
                       size=l.style.markersize)
 
-        x, y = _sanitize(_data(l, xatt), _data(l, yatt))
+        # numerical values (category codes) are used to downsample
+        xnum, ynum, x, y = _sanitize(l[xatt], l[yatt],
+                                     _data(l, xatt), _data(l, yatt))
+
+        if max_points is not None and x.size > max_points:
+            if mode == 'density' and not (lxcat or lycat):
+                trace = _density_trace(x, y, viewer, l.style, max_points)
+                trace['name'] = l.label
+                traces.append(trace)
+                continue
+            keep = stratified_sample(xnum, ynum, max_points)
+            x, y = x[keep], y[keep]
 
         trace = dict(x=x, y=y,
                      type='scatter',
@@ -216,7 +340,12 @@ def build_plotly_call(app):
     args = []
     layout = {'showlegend': True, 'barmode': 'overlay',
               'title': 'Autogenerated by Glue'}
-    dispatch = {ScatterWidget: export_scatter,
+    # histograms are already exported as bin counts; large scatter
+    # layers are reduced to a point budget
+    scatter = partial(export_scatter,
+                      max_points=app.get_setting('PLOTLY_MAX_POINTS'),
+                      mode=app.get_setting('PLOTLY_SCATTER_MODE'))
+    dispatch = {ScatterWidget: scatter,
                 HistogramWidget: export_histogram
                 }
 
@@ -300,7 +429,11 @@ def save_plotly(application, label):
     args, kwargs = build_plotly_call(application)
     kwargs['filename'] = label
 
-    logging.getLogger(__name__).debug(args, kwargs)
+    log = logging.getLogger(__name__)
+    log.debug("%s %s", args, kwargs)
+    for name, points, size in payload_report(args[0]['data']):
+        log.info("Plotly trace %s: %i points, %.1f kB",
+                 name, points, size / 1024.)
 
     plotly.sign_in(user, apikey)
     plotly.plot(*args, **kwargs)
@@ -308,3 +441,13 @@ def save_plotly(application, label):
 exporters.add('Plotly', save_plotly, can_save_plotly, outmode='label')
 settings.add('PLOTLY_USER', 'Glue')
 settings.add('PLOTLY_APIKEY', 't24aweai14')
+
+
+def _scatter_mode(value):
+    if value not in ['sample', 'density']:
+        raise ValueError("Scatter mode must be 'sample' or 'density'")
+    return value
+
+
+settings.add('PLOTLY_MAX_POINTS', 20000, int)
+settings.add('PLOTLY_SCATTER_MODE', 'sample', _scatter_mode)
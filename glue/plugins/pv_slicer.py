@@ -9,6 +9,7 @@ class PVSlicerTool(object):
     def __init__(self, widget=None):
         self.widget = widget
         self._slice_widget = None
+        self._extractor = None
 
     def _get_modes(self, axes):
         self._path = PathMode(axes, roi_callback=self._extract_callback)
@@ -29,7 +30,14 @@ class PVSlicerTool(object):
         self._build_from_vertices(vx, vy)
 
     def _build_from_vertices(self, vx, vy):
-        pv_slice, x, y, wcs = _slice_from_path(vx, vy, self.widget.data, self.widget.attribute, self.widget.slice)
+        data, att, slc = (self.widget.data, self.widget.attribute,
+                          self.widget.slice)
+
+        # reuse the strips sampled along unchanged segments of the path
+        ext = self._extractor
+        if ext is None or not ext.matches(data, att, slc):
+            ext = self._extractor = PVExtractor(data, att, slc)
+        pv_slice, x, y, wcs = ext.extract(vx, vy)
         if self._slice_widget is None:
             self._slice_widget = PVSliceWidget(image=pv_slice, wcs=wcs, image_client=self.widget.client,
                                                x=x, y=y, interpolation='nearest')
@@ -150,7 +158,218 @@ class PVSliceWidget(StandaloneImageWidget):
         self._draw_crosshairs(event)
 
 
-def _slice_from_path(x, y, data, attribute, slc):
+def _nearest(x):
+    """
+    The index of the pixel containing each coordinate
+    """
+    return np.floor(np.asarray(x) + 0.5).astype(int)
+
+
+def _interpolate(block, x, y, order):
+    """
+    Sample every plane of a (z, y, x) block at a set of points
+
+    Order 0 (nearest) and 1 (bilinear) are vectorized over all planes.
+    Higher order spline interpolation uses scipy, one plane at a time.
+    Samples which involve NaN values are NaN.
+
+    :param block: The array to sample
+    :param x: x coordinates of each point, inside the block
+    :param y: y coordinates of each point, inside the block
+
+    :returns: An array of shape (block.shape[0], x.size)
+    """
+    ny, nx = block.shape[1:]
+
+    if order == 0:
+        # round halves up, like the pixel edges, not to even
+        ix = np.clip(_nearest(x), 0, nx - 1)
+        iy = np.clip(_nearest(y), 0, ny - 1)
+        return block[:, iy, ix].astype(float)
+
+    bad = np.isnan(block)
+    values = np.where(bad, 0, block)
+
+    if order == 1:
+        ix = np.clip(np.floor(x).astype(int), 0, max(nx - 2, 0))
+        iy = np.clip(np.floor(y).astype(int), 0, max(ny - 2, 0))
+        fx, fy = x - ix, y - iy
+        jx, jy = np.minimum(ix + 1, nx - 1), np.minimum(iy + 1, ny - 1)
+        weights = [((1 - fy) * (1 - fx), iy, ix), ((1 - fy) * fx, iy, jx),
+                   (fy * (1 - fx), jy, ix), (fy * fx, jy, jx)]
+        result = sum(w * values[:, i, j] for w, i, j in weights)
+        nans = sum((w > 0) * bad[:, i, j] for w, i, j in weights)
+        result[nans > 0] = np.nan
+        return result
+
+    from scipy.ndimage import binary_dilation, map_coordinates
+    result = np.empty((block.shape[0], x.size))
+    for k, plane in enumerate(values):
+        result[k] = map_coordinates(plane, [y, x], order=order)
+        if bad[k].any():
+            # splines of the NaN mask ring, so grow the mask by the
+            # support of the spline, and find the samples next to it
+            # with a linear interpolation
+            near = binary_dilation(bad[k], structure=np.ones((3, 3)),
+                                   iterations=order)
+            nans = map_coordinates(near.astype(float), [y, x], order=1)
+            result[k][nans > 0] = np.nan
+    return result
+
+
+class PVExtractor(object):
+
+    """
+    Extract PV slices along paths through a cube.
+
+    Each segment of a path is sampled separately, from its start, into
+    a strip of spectra. Since a strip does not depend on the rest of the
+    path, strips are cached, so that when one vertex of a path is moved,
+    only its two adjacent segments are re-sampled. Each strip reads only
+    the spatial bounding box of its segment from the cube, in chunks of
+    channels.
+    """
+
+    #: The maximum number of cube elements read at once
+    chunk_size = 2 ** 22
+
+    def __init__(self, data, attribute, slc, order=0, spacing=1):
+        """
+        :param data: :class:`~glue.core.data.Data`
+        :param attribute: :class:`~glue.core.data.ComponentID` to extract
+        :param slc: orientation of the image widget that paths are
+                    defined on
+        :param order: Interpolation order. 0 is nearest-neighbor
+        :param spacing: Distance between samples along the path, in pixels
+        """
+        self.data = data
+        self.attribute = attribute
+        self.slc = tuple(slc)
+        self.order = order
+        self.spacing = spacing
+        self._strips = {}
+        self._version = data._version
+
+    def matches(self, data, attribute, slc):
+        """
+        Whether this extractor samples the same cube and slice
+        """
+        zaxis = _slice_index(data, slc)
+        fixed = [s for i, s in enumerate(slc) if i != zaxis]
+        mine = [s for i, s in enumerate(self.slc) if i != zaxis]
+        return (data is self.data and attribute is self.attribute and
+                fixed == mine and len(slc) == len(self.slc))
+
+    def extract(self, x, y):
+        """
+        Extract a PV slice along a path
+
+        :param x: The x value of each vertex (pixel units)
+        :param y: The y value of each vertex (pixel units)
+
+        :returns: (slice, x, y, wcs). slice is a 2D array, corresponding
+                  to a "PV ribbon" cutout from the cube. x and y are
+                  the rounded points along which the ribbon is extracted
+        """
+        if self.data._version != self._version:
+            self._strips = {}
+            self._version = self.data._version
+
+        strips = {}
+        for segment in zip(x[:-1], y[:-1], x[1:], y[1:]):
+            key = tuple(float(v) for v in segment)
+            if key not in strips:
+                strips[key] = self._strips.get(key)
+                if strips[key] is None:
+                    strips[key] = self._sample_segment(*key)
+        self._strips = strips  # forget segments no longer in the path
+
+        parts = [strips[tuple(float(v) for v in segment)]
+                 for segment in zip(x[:-1], y[:-1], x[1:], y[1:])]
+        parts = [p for p in parts if p[0].size > 0]
+        if len(parts) == 0:
+            raise ValueError("Path is shorter than spacing")
+
+        result = np.hstack([p[0] for p in parts])
+        xs = _nearest(np.hstack([p[1] for p in parts]))
+        ys = _nearest(np.hstack([p[2] for p in parts]))
+        return result, xs, ys, self._wcs()
+
+    def _sample_segment(self, x0, y0, x1, y1):
+        """
+        Sample the cube at the centers of intervals of length
+        spacing along a segment
+
+        :returns: (strip, x, y)
+        """
+        length = np.hypot(x1 - x0, y1 - y0)
+        n = int(np.floor(length / self.spacing))
+        t = (np.arange(n) + 0.5) * self.spacing / max(length, 1e-300)
+        x = x0 + t * (x1 - x0)
+        y = y0 + t * (y1 - y0)
+        return self._sample(x, y), x, y
+
+    def _sample(self, x, y):
+        data, slc = self.data, self.slc
+        xaxis, yaxis = slc.index('x'), slc.index('y')
+        zaxis = _slice_index(data, slc)
+        nx, ny, nz = (data.shape[xaxis], data.shape[yaxis],
+                      data.shape[zaxis])
+
+        result = np.zeros((nz, x.size)) * np.nan
+        if self.order == 0:
+            ix, iy = _nearest(x), _nearest(y)
+            valid = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        else:
+            valid = (x >= 0) & (x <= nx - 1) & (y >= 0) & (y <= ny - 1)
+        if not valid.any():
+            return result
+        x, y = x[valid], y[valid]
+
+        # the bounding box of the samples, and the pixels around them
+        # needed to interpolate
+        pad = 0 if self.order < 2 else 2 * self.order
+        bx = max(int(np.floor(x.min())) - pad, 0)
+        by = max(int(np.floor(y.min())) - pad, 0)
+        ex = min(int(np.ceil(x.max())) + 1 + pad, nx)
+        ey = min(int(np.ceil(y.max())) + 1 + pad, ny)
+
+        view = [s if i != zaxis else None for i, s in enumerate(slc)]
+        view[xaxis] = slice(bx, ex)
+        view[yaxis] = slice(by, ey)
+
+        # position of each axis in the blocks read from the cube
+        kept = [i for i, v in enumerate(view) if not isinstance(v, int)]
+        order = [kept.index(i) for i in (zaxis, yaxis, xaxis)]
+
+        step = max(self.chunk_size // ((ex - bx) * (ey - by)), 1)
+        for lo in range(0, nz, step):
+            hi = min(lo + step, nz)
+            view[zaxis] = slice(lo, hi)
+            block = self.data[self.attribute, tuple(view)]
+            block = np.transpose(block, order)
+            result[lo:hi, valid] = _interpolate(block, x - bx, y - by,
+                                                self.order)
+        return result
+
+    def _wcs(self):
+        from astropy.wcs import WCS
+        from astropy.io.fits import Header
+
+        cube_wcs = getattr(self.data.coords, 'wcs', None)
+        if cube_wcs is None:
+            return WCS(Header())
+
+        from ..external.pvextractor.utils.wcs_utils import (get_spatial_scale,
+                                                            sanitize_wcs)
+        from ..external.pvextractor.utils.wcs_slicing import slice_wcs
+        cube_wcs = sanitize_wcs(cube_wcs)
+        scale = get_spatial_scale(cube_wcs)
+        return WCS(slice_wcs(cube_wcs, spatial_scale=self.spacing * scale)
+                   .to_header())
+
+
+def _slice_from_path(x, y, data, attribute, slc, order=0):
     """
     Extract a PV-like slice from a cube
 
@@ -159,8 +378,9 @@ def _slice_from_path(x, y, data, attribute, slc):
     :param data: :class:`~glue.core.data.Data`
     :param attribute: :claass:`~glue.core.data.Component`
     :param slc: orientation of the image widget that `pts` are defined on
+    :param order: Interpolation order. 0 is nearest-neighbor
 
-    :returns: (slice, x, y)
+    :returns: (slice, x, y, wcs)
               slice is a 2D Numpy array, corresponding to a "PV ribbon"
               cutout from the cube
               x and y are the resampled points along which the
@@ -169,40 +389,7 @@ def _slice_from_path(x, y, data, attribute, slc):
     :note: For >3D cubes, the "V-axis" of the PV slice is the longest
            cube axis ignoring the x/y axes of `slc`
     """
-    from ..external.pvextractor import Path, extract_pv_slice
-    p = Path(list(zip(x, y)))
-
-    cube = data[attribute]
-    dims = list(range(data.ndim))
-    s = list(slc)
-    ind = _slice_index(data, slc)
-
-    cube_wcs = getattr(data.coords, 'wcs', None)
-
-    # transpose cube to (z, y, x, <whatever>)
-    def _swap(x, s, i, j):
-        x[i], x[j] = x[j], x[i]
-        s[i], s[j] = s[j], s[i]
-
-    _swap(dims, s, ind, 0)
-    _swap(dims, s, s.index('y'), 1)
-    _swap(dims, s, s.index('x'), 2)
-    cube = cube.transpose(dims)
-
-    # slice down from >3D to 3D if needed
-    s = [slice(None)] * 3 + [slc[d] for d in dims[3:]]
-    cube = cube[s]
-
-    # sample cube
-    spacing = 1  # pixel
-    x, y = [np.round(_x).astype(int) for _x in p.sample_points(spacing)]
-    result = extract_pv_slice(cube, path=p, wcs=cube_wcs, order=0)
-
-    from astropy.wcs import WCS
-    data = result.data
-    wcs = WCS(result.header)
-
-    return data, x, y, wcs
+    return PVExtractor(data, attribute, slc, order=order).extract(x, y)
 
 
 def _slice_index(data, slc):
@@ -1,4 +1,5 @@
 import traceback
+from weakref import WeakKeyDictionary
 
 import numpy as np
 
@@ -21,9 +22,10 @@ from ..core.exceptions import IncompatibleAttribute
 from ..qt.glue_toolbar import GlueToolbar
 from ..qt.qtutil import load_ui, nonpartial, Worker
 from ..qt.widget_properties import CurrentComboProperty
-from ..core.aggregate import Aggregate
+from ..core.aggregate import Aggregate, CumulativeCube, CubeProducts
 from ..qt.mime import LAYERS_MIME_TYPE
 from ..qt.simpleforms import build_form_item
+from ..core.fitters import CubeFitter
 from ..config import fit_plugin
 from ..external.six.moves import range as xrange
 
@@ -33,6 +35,12 @@ class Extractor(object):
     # Coordinate conversion is not well-defined if pix2world is not
     # monotonic!
 
+    #: The maximum number of cube elements read at once
+    chunk_size = 2 ** 22
+
+    # subset -> (key, spectrum) of the last subset spectrum
+    _subset_cache = WeakKeyDictionary()
+
     @staticmethod
     def abcissa(data, axis):
         slc = [0 for _ in data.shape]
@@ -44,38 +52,61 @@ class Extractor(object):
     def spectrum(data, attribute, roi, slc, zaxis):
         xaxis = slc.index('x')
         yaxis = slc.index('y')
-        ndim, nz = data.ndim, data.shape[zaxis]
-
         l, r, b, t = roi.xmin, roi.xmax, roi.ymin, roi.ymax
         shp = data.shape
         # The 'or 0' is because Numpy in Python 3 cannot deal with 'None'
         l, r = np.clip([l or 0, r or 0], 0, shp[xaxis])
         b, t = np.clip([b or 0, t or 0], 0, shp[yaxis])
 
-        # extract sub-slice, without changing dimension
-        slc = [slice(s, s + 1)
-               if s not in ['x', 'y'] else slice(None)
-               for s in slc]
-        slc[xaxis] = slice(l, r)
-        slc[yaxis] = slice(b, t)
-        slc[zaxis] = slice(None)
+        view = list(slc)
+        view[xaxis] = slice(l, r)
+        view[yaxis] = slice(b, t)
         x = Extractor.abcissa(data, zaxis)
+        return x, Extractor._profile(data, attribute, view, zaxis)
 
-        data = data[attribute, tuple(slc)]
-        finite = np.isfinite(data)
-
-        assert data.ndim == ndim
-
-        for i in reversed(list(range(ndim))):
-            if i != zaxis:
-                data = np.nansum(data, axis=i)
-                finite = finite.sum(axis=i)
+    @staticmethod
+    def _profile(data, attribute, view, zaxis, mask=None):
+        """
+        The mean of a region of a cube, in each channel along zaxis
 
-        assert data.ndim == 1
-        assert data.size == nz
+        The cube is read in blocks of channels, and each block is
+        reduced with a single matrix-vector product.
 
-        data = (1. * data / finite).ravel()
-        return x, data
+        :param view: A view with slices for the two spatial axes,
+                     and integers for every other axis except zaxis
+        :param mask: Optional 2D boolean mask over the spatial region
+                     of view (with axes in the order of the data)
+        """
+        view = list(view)
+        view[zaxis] = slice(None)
+        spatial = [i for i, v in enumerate(view)
+                   if isinstance(v, slice) and i != zaxis]
+        shape = [len(xrange(*view[i].indices(data.shape[i])))
+                 for i in spatial]
+        zpos = sum(isinstance(v, slice) for v in view[:zaxis])
+
+        nz = data.shape[zaxis]
+        step = max(Extractor.chunk_size // max(np.prod(shape), 1), 1)
+        if mask is not None:
+            weights = np.asarray(mask, dtype=float).ravel()
+
+        total, count = np.zeros(nz), np.zeros(nz)
+        for lo in xrange(0, nz, step):
+            hi = min(lo + step, nz)
+            view[zaxis] = slice(lo, hi)
+            block = data[attribute, tuple(view)]
+            block = np.rollaxis(block, zpos, 0).reshape(hi - lo, -1)
+
+            finite = np.isfinite(block)
+            block = np.where(finite, block, 0)
+            if mask is None:
+                total[lo:hi] = block.sum(axis=1)
+                count[lo:hi] = finite.sum(axis=1)
+            else:
+                total[lo:hi] = block.dot(weights)
+                count[lo:hi] = finite.dot(weights)
+
+        return total / count
 
     @staticmethod
     def world2pixel(data, axis, value):
@@ -108,30 +139,39 @@ class Extractor(object):
         :param zaxis: Which axis to integrate over
         """
         data = subset.data
+
+        # spectra are cached until the subset, slice or data change.
+        # ComponentIDs overload ==, so objects are compared by identity
+        objects = (data, subset.subset_state, attribute)
+        key = (tuple(slc), zaxis, data._version)
+        cached = Extractor._subset_cache.get(subset)
+        if cached is not None and cached[1] == key and \
+                all(a is b for a, b in zip(cached[0], objects)):
+            return cached[2]
+
         x = Extractor.abcissa(data, zaxis)
 
         view = [slice(s, s + 1)
                 if s not in ['x', 'y'] else slice(None)
                 for s in slc]
 
-        mask = np.squeeze(subset.to_mask(view))
-        if slc.index('x') < slc.index('y'):
-            mask = mask.T
-
-        w = np.where(mask)
-        view[slc.index('x')] = w[1]
-        view[slc.index('y')] = w[0]
+        # the mask, with the x and y axes in the order of the data
+        axes = sorted([slc.index('x'), slc.index('y')])
+        mask = subset.to_mask(tuple(view))
+        mask = mask.reshape([data.shape[i] for i in axes])
 
-        result = np.empty(x.size)
+        # only read the bounding box of the mask
+        view = list(slc)
+        for dim, i in enumerate(axes):
+            hits = np.flatnonzero(mask.any(axis=1 - dim))
+            if hits.size == 0:
+                return x, np.zeros(x.size) * np.nan
+            view[i] = slice(hits[0], hits[-1] + 1)
+        mask = mask[view[axes[0]], view[axes[1]]]
 
-        # treat each channel separately, to reduce memory storage
-        for i in xrange(data.shape[zaxis]):
-            view[zaxis] = i
-            val = data[attribute, view]
-            result[i] = np.nansum(val) / np.isfinite(val).sum()
-
-        y = result
+        y = Extractor._profile(data, attribute, view, zaxis, mask)
 
+        Extractor._subset_cache[subset] = (objects, key, (x, y))
         return x, y
 
 
@@ -264,11 +304,35 @@ class CollapseContext(SpectrumContext):
     """
     Mode to collapse a section of a cube into a 2D image.
 
-    Supports several aggregations: mean, median, max, mom1, mom2
+    Supports several aggregations: mean, median, max, mom1, mom2,
+    and the location of the peak
+
+    After the first collapse, running totals of the cube are built in the
+    background, unless they would take up more than
+    :attr:`max_cache_bytes`. Mean and mom1 collapses are then updated
+    live as the range is dragged.
+
+    The standard products of each collapsed range (see
+    :class:`~glue.core.aggregate.CubeProducts`) are also computed in the
+    background, so switching between aggregations is instant. They can
+    be added to the data as new components.
     """
 
+    #: Aggregations which can be computed from a :class:`CumulativeCube`
+    cached_operators = (Aggregate.mean, Aggregate.mom1)
+
+    #: The largest :class:`CumulativeCube` to build, in bytes. The
+    #: totals take up 32 bytes per element of the cube
+    max_cache_bytes = 2 ** 30
+
     def _setup_grip(self):
         self.grip = self.main.profile.new_range_grip()
+        self._cache = None
+        self._cache_worker = None
+        self._products = None
+        self._products_worker = None
+        self._live = False
+        add_callback(self.grip, 'range', nonpartial(self._drag))
 
     def _setup_widget(self):
         w = QWidget()
@@ -281,33 +345,122 @@ class CollapseContext(SpectrumContext):
         combo.addItem("Max", userData=Aggregate.max)
         combo.addItem("Centroid", userData=Aggregate.mom1)
         combo.addItem("Linewidth", userData=Aggregate.mom2)
+        combo.addItem("Peak Location", userData=Aggregate.argmax)
 
         run = QPushButton("Collapse")
         self._run = run
 
+        save = QPushButton("Save Maps")
+        save.setToolTip("Add moment, peak and noise maps of this "
+                        "range to the data")
+        self._save = save
+
         l.addRow("", combo)
         l.addRow("", run)
+        l.addRow("", save)
         self.widget = w
         self._combo = combo
 
     def _connect(self):
         self._run.clicked.connect(nonpartial(self._aggregate))
+        self._save.clicked.connect(nonpartial(self._save_products))
 
-    def _aggregate(self):
-        func = self._combo.itemData(self._combo.currentIndex())
-
+    def _aggregator(self):
         rng = list(self.grip.range)
         rng[1] += 1
         rng = Extractor.world2pixel(self.data,
                                     self.profile_axis,
                                     rng)
 
-        agg = Aggregate(self.data, self.client.display_attribute,
-                        self.main.profile_axis, self.client.slice, rng)
+        return Aggregate(self.data, self.client.display_attribute,
+                         self.main.profile_axis, self.client.slice, rng,
+                         cache=self._cache, products=self._products)
+
+    def _aggregate(self):
+        func = self._combo.itemData(self._combo.currentIndex())
+        agg = self._aggregator()
 
         im = func(agg)
         self.client.override_image(im)
 
+        self._live = True
+        self._build_cache(agg)
+        self._build_products(agg)
+
+    def _drag(self):
+        """
+        Re-collapse as the range changes, if the running totals
+        make this fast
+        """
+        func = self._combo.itemData(self._combo.currentIndex())
+        if not self._live or func not in self.cached_operators:
+            return
+
+        agg = self._aggregator()
+        if self._cache is not None and self._cache.matches(agg):
+            self.client.override_image(func(agg))
+
+    def _build_cache(self, agg):
+        """
+        Build the running totals for a slice on a dedicated thread,
+        unless they already exist, are being built, or are too large
+        """
+        if self._cache_worker is not None:
+            return
+        if self._cache is not None and self._cache.matches(agg):
+            return
+
+        cache = CumulativeCube(agg.data, agg.attribute, agg.zax, agg.slc)
+        if cache.nbytes > self.max_cache_bytes:
+            return
+
+        def on_success(result):
+            self._cache = cache
+
+        def on_done():
+            self._cache_worker = None
+
+        w = Worker(cache.build)
+        w.result.connect(on_success)
+        w.finished.connect(on_done)
+
+        self._cache_worker = w  # hold onto a reference
+        w.start()
+
+    def _products_for(self, agg):
+        if self._products is None or not self._products.matches(agg):
+            self._products = CubeProducts(agg.data, agg.attribute, agg.zax,
+                                          agg.slc)
+        return self._products
+
+    def _build_products(self, agg):
+        """
+        Compute the products of the collapsed range on a dedicated
+        thread, unless they already exist or are being computed
+        """
+        products = self._products_for(agg)
+        if self._products_worker is not None or products.ready(agg.zlim):
+            return
+
+        def on_done():
+            self._products_worker = None
+
+        w = Worker(products.compute, agg.zlim)
+        w.finished.connect(on_done)
+
+        self._products_worker = w  # hold onto a reference
+        w.start()
+
+    def _save_products(self):
+        """
+        Add the products of the current range to the data. They are
+        computed when first used
+        """
+        agg = self._aggregator()
+        if agg.empty_slice:
+            return
+        self._products_for(agg).add_to_data(agg.zlim)
+
 
 class ConstraintsWidget(QWidget):
 
@@ -490,6 +643,8 @@ class FitContext(SpectrumContext):
             self.ui.profile_combo.addItem(fitter.label,
                                           userData=fitter())
 
+        self._cube_fitter = None
+
     def _edit_model_options(self):
 
         d = FitSettingsWidget(self.fitter)
@@ -498,6 +653,7 @@ class FitContext(SpectrumContext):
     def _connect(self):
         self.ui.fit_button.clicked.connect(nonpartial(self.fit))
         self.ui.clear_button.clicked.connect(nonpartial(self.clear))
+        self.ui.cube_button.clicked.connect(nonpartial(self.fit_cube))
         self.ui.settings_button.clicked.connect(
             nonpartial(self._edit_model_options))
 
@@ -536,6 +692,54 @@ class FitContext(SpectrumContext):
         self._fit_worker = w  # hold onto a reference
         w.start()
 
+    def fit_cube(self):
+        """
+        Fit the model to the spectrum in the fit range at every pixel,
+        and add maps of the fitted parameters to the data
+
+        The fitting happens on a process pool, managed from a dedicated
+        thread. If a cube is already being fit, it is cancelled
+        """
+        if self._cube_fitter is not None:
+            self._cube_fitter.cancel()
+            return
+
+        cube = CubeFitter(self.fitter, self.data,
+                          self.client.display_attribute,
+                          self.profile_axis, xlim=self.grip.range)
+
+        def on_progress(done, total):
+            self._report_fit("Fitting cube: %i / %i pixels" % (done, total))
+
+        def on_success(maps):
+            if maps is None:
+                self._report_fit("Cube fit cancelled")
+                return
+            cids = cube.add_to_data(maps)
+            self._report_fit("Added components:\n" +
+                             "\n".join(cid.label for cid in cids))
+
+        def on_fail(exc_info):
+            exc = '\n'.join(traceback.format_exception(*exc_info))
+            self._report_fit("Error during fitting:\n%s" % exc)
+
+        def on_done():
+            self._cube_fitter = None
+            self.ui.cube_button.setText("Fit Cube")
+
+        self.ui.cube_button.setText("Cancel")
+
+        w = Worker(cube.run)
+        w.kwargs['progress'] = w.progress.emit
+        w.progress.connect(on_progress)
+        w.result.connect(on_success)
+        w.error.connect(on_fail)
+        w.finished.connect(on_done)
+
+        self._cube_fitter = cube
+        self._cube_worker = w  # hold onto a reference
+        w.start()
+
     def _report_fit(self, report):
         self.ui.results_box.document().setPlainText(report)
 
@@ -32,3 +32,28 @@ def test_make_data_file():
         np.testing.assert_array_equal(t['selection_0'], [0, 1, 1])
     finally:
         rmtree(dir, ignore_errors=True)
+
+
+def test_make_data_file_binary(tmpdir):
+    d = Data(x=[1, 2, 3], label='data')
+    s = d.new_subset(label='test')
+    s.subset_state = d.id['x'] > 1
+
+    layout = make_data_file(d, (None, s), str(tmpdir), binary=True)
+    assert sorted(c['name'] for c in layout) == ['Pixel Axis 0', 'World 0',
+                                                 'selection_1', 'x']
+
+    raw = tmpdir.join('data.bin').read_binary()
+    sel = layout[-1]
+    np.testing.assert_array_equal(
+        np.frombuffer(raw, dtype=sel['dtype'], count=sel['size'],
+                      offset=sel['offset']), [0, 1, 1])
+
+
+def test_make_data_file_skips_binary_for_non_numerical(tmpdir):
+    # complex values have no typed array equivalent
+    d = Data(x=[1, 2, 3], z=np.array([1j, 2, 3]), label='data')
+
+    assert make_data_file(d, (), str(tmpdir), binary=True) is None
+    assert tmpdir.join('data.csv').check()
+    assert not tmpdir.join('data.bin').check()
@@ -4,7 +4,7 @@ import numpy as np
 from ...core import Data, DataCollection
 from ...qt.glue_application import GlueApplication
 from ...qt.widgets import ScatterWidget, ImageWidget, HistogramWidget
-from ..export_plotly import build_plotly_call
+from ..export_plotly import build_plotly_call, stratified_sample
 
 
 class TestPlotly(object):
@@ -110,3 +110,45 @@ class TestPlotly(object):
         for k in expected:
             assert expected[k] == data[0][k]
         assert args[0]['layout']['barmode'] == 'overlay'
+
+    def test_scatter_downsampled(self):
+        app = self.app
+        d = Data(x=np.random.normal(size=5000),
+                 y=np.random.normal(size=5000), label='big')
+        app.data_collection.append(d)
+        v = app.new_data_viewer(ScatterWidget, data=d)
+        v.xatt = d.id['x']
+        v.yatt = d.id['y']
+
+        app.set_setting('PLOTLY_MAX_POINTS', 500)
+        args, kwargs = build_plotly_call(app)
+        trace = args[0]['data'][0]
+        assert 400 < trace['x'].size < 1500
+        assert np.in1d(trace['x'], d['x']).all()
+
+        app.set_setting('PLOTLY_SCATTER_MODE', 'density')
+        args, kwargs = build_plotly_call(app)
+        trace = args[0]['data'][0]
+        assert trace['type'] == 'heatmap'
+        assert np.nansum(trace['z']) <= 5000
+
+
+def test_stratified_sample():
+    x = np.hstack([np.random.normal(size=10000), [100]])
+    y = np.hstack([np.random.normal(size=10000), [100]])
+    keep = stratified_sample(x, y, 1000)
+    assert 800 < keep.size < 2000
+    assert (np.diff(keep) > 0).all()
+    assert keep[-1] == 10000  # the outlier survives
+
+    assert (stratified_sample(x[:10], y[:10], 1000) == np.arange(10)).all()
+
+
+def test_stratified_sample_within_budget():
+    # one point in every cell of the default grid
+    x, y = np.meshgrid(np.arange(64.), np.arange(64.))
+    x = np.hstack([x.ravel(), np.random.normal(size=5000)])
+    y = np.hstack([y.ravel(), np.random.normal(size=5000)])
+    for max_points in [100, 1000, 4096, 5000]:
+        keep = stratified_sample(x, y, max_points)
+        assert max_points * 0.8 < keep.size <= max_points
@@ -1,8 +1,10 @@
+import pytest
 import numpy as np
 from numpy.testing import assert_allclose
 from mock import MagicMock
 
-from ..pv_slicer import _slice_from_path, _slice_label, _slice_index, PVSliceWidget
+from ..pv_slicer import (_slice_from_path, _slice_label, _slice_index,
+                         _interpolate, PVSliceWidget, PVExtractor)
 
 from ...qt.widgets.image_widget import StandaloneImageWidget
 
@@ -41,6 +43,80 @@ class TestSliceExtraction(object):
         s = _slice_from_path(x, y, self.d, 'x', slc)[0]
         assert_allclose(s, self.x[:, 0, :])
 
+    def test_segments_cached(self):
+        slc = (0, 'y', 'x')
+        ext = PVExtractor(self.d, 'x', slc)
+        ext.chunk_size = 2  # read one channel at a time
+
+        s, x, y, _ = ext.extract([-0.5, 3, 3], [-0.5, -0.5, 2.5])
+        assert_allclose(s[:, :3], self.x[:, 0, :3])
+        assert_allclose(s[:, 3:], self.x[:, :, 3])
+        assert list(x) == [0, 1, 2, 3, 3, 3]
+        assert list(y) == [0, 0, 0, 0, 1, 2]
+
+        # moving the last vertex only samples the last segment again
+        first = ext._strips[(-0.5, -0.5, 3., -0.5)]
+        ext.extract([-0.5, 3, 1], [-0.5, -0.5, 2])
+        assert ext._strips[(-0.5, -0.5, 3., -0.5)] is first
+        assert len(ext._strips) == 2
+
+        # moving the first vertex keeps the strips of later segments
+        ext.extract([-0.5, 3, 3, 0], [-0.5, -0.5, 2.5, 2.5])
+        later = [ext._strips[(3., -0.5, 3., 2.5)],
+                 ext._strips[(3., 2.5, 0., 2.5)]]
+        ext.extract([-0.2, 3, 3, 0], [-0.5, -0.5, 2.5, 2.5])
+        assert ext._strips[(3., -0.5, 3., 2.5)] is later[0]
+        assert ext._strips[(3., 2.5, 0., 2.5)] is later[1]
+        assert len(ext._strips) == 3
+
+    def test_spacing_restarts_at_vertices(self):
+        ext = PVExtractor(self.d, 'x', (0, 'y', 'x'))
+
+        _, x, y, _ = ext.extract([-0.5, 1.7, 3.5], [0, 0, 0])
+        assert list(x) == [0, 1, 2]
+
+        with pytest.raises(ValueError) as exc:
+            ext.extract([-0.5, 0, 0.5], [0, 0, 0])
+        assert exc.value.args[0] == "Path is shorter than spacing"
+
+    def test_interpolation(self):
+        self.d = Data(x=np.arange(24.).reshape((2, 3, 4)))
+        x, y = [0, 3], [0.5, 0.5]
+        s = _slice_from_path(x, y, self.d, 'x', (0, 'y', 'x'), order=1)[0]
+        expected = np.arange(24.).reshape((2, 3, 4))[:, :2].mean(axis=1)
+        assert_allclose(s, [np.interp([.5, 1.5, 2.5], np.arange(4), e)
+                            for e in expected])
+
+        s = _slice_from_path(x, y, self.d, 'x', (0, 'y', 'x'), order=3)[0]
+        assert s.shape == (2, 3)
+
+    def test_spline_near_nan_is_nan(self):
+        block = np.arange(45.).reshape((1, 5, 9))
+        block[0, 2, 2] = np.nan
+
+        # a cubic sample reads two pixels either side
+        s = _interpolate(block, np.array([0., 6.5]), np.array([2., 2.]),
+                         order=3)
+        assert np.isnan(s[0, 0])
+        assert np.isfinite(s[0, 1])
+
+    def test_nearest_rounds_halves_up(self):
+        block = np.arange(6.).reshape((1, 1, 6))
+        x = np.arange(5) + 0.5
+        s = _interpolate(block, x, np.zeros(5), order=0)
+        assert_allclose(s, [[1, 2, 3, 4, 5]])
+
+        s, x, _, _ = _slice_from_path([0, 3], [0.5, 0.5], self.d, 'x',
+                                      (0, 'y', 'x'))
+        assert list(x) == [1, 2, 3]
+        assert_allclose(s, self.x[:, 1, 1:])
+
+    def test_outside_cube_is_nan(self):
+        s = _slice_from_path([-5.5, 3.5], [0, 0], self.d, 'x',
+                             (0, 'y', 'x'), order=1)[0]
+        assert np.isnan(s[:, :5]).all()
+        assert_allclose(s[:, 6:], self.x[:, 0, 1:])
+
 
 def test_slice_label():
     d = Data(x=np.zeros((2, 3, 4)))
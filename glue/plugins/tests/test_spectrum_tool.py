@@ -128,6 +128,29 @@ class Test3DExtractor(object):
                                               slc, 0)
         np.testing.assert_array_almost_equal(expected, actual)
 
+    def test_extract_subset_chunked_cached(self, monkeypatch):
+        monkeypatch.setattr(Extractor, 'chunk_size', 5)
+        x = np.random.random((3, 4, 5))
+        x[1, 2, 3] = np.nan
+        data = Data(x=x)
+        sub = data.new_subset()
+        sub.subset_state = data.id['x'] > .5
+        slc = (0, 'y', 'x')
+        mask = sub.to_mask()[0]
+
+        expected = np.nansum(np.where(mask, x, 0), axis=(1, 2))
+        expected /= (np.isfinite(x) & mask).sum(axis=(1, 2))
+        _, actual = Extractor.subset_spectrum(sub, data.id['x'], slc, 0)
+        np.testing.assert_array_almost_equal(expected, actual)
+
+        # unchanged subsets are not extracted again
+        assert Extractor.subset_spectrum(sub, data.id['x'],
+                                         slc, 0)[1] is actual
+
+        sub.subset_state = data.id['x'] > .2
+        assert Extractor.subset_spectrum(sub, data.id['x'],
+                                         slc, 0)[1] is not actual
+
 
 class Test4DExtractor(object):
 
@@ -3,6 +3,7 @@
 from __future__ import absolute_import, division, print_function
 
 import sys
+import logging
 import webbrowser
 
 from ..external.qt.QtGui import (QKeySequence, QMainWindow, QGridLayout,
@@ -12,9 +13,11 @@ from ..external.qt.QtGui import (QKeySequence, QMainWindow, QGridLayout,
                                  QBrush, QPainter, QLabel, QHBoxLayout,
                                  QTextEdit, QTextCursor, QPushButton,
                                  QListWidgetItem)
-from ..external.qt.QtCore import Qt, QSize, QSettings, Signal
+from ..external.qt.QtCore import Qt, QSize, QSettings, Signal, QTimer
 
 from ..core import command
+from ..core.data_factories import expand_data_paths, start_loading_data
+from ..core.util import as_list
 from .. import env
 from ..qt import get_qapp
 from .decorators import set_cursor, messagebox_on_error
@@ -29,7 +32,9 @@ from .widgets.layer_tree_widget import PlotAction, LayerTreeWidget
 from .widgets.data_viewer import DataViewer
 from .widgets.settings_editor import SettingsEditor
 from .widgets.mpl_widget import defer_draw
+from ..clients.util import redraw_scheduler
 from .feedback import submit_bug_report
+from ..external import six
 
 __all__ = ['GlueApplication']
 DOCS_URL = 'http://www.glue-viz.org'
@@ -397,6 +402,7 @@ class GlueApplication(Application, QMainWindow):
         self._ui.layerWidget.setup(self._data)
 
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
+        self.tab_widget.currentChanged.connect(self.restore_pending_viewers)
 
     def _create_menu(self):
         mbar = self.menuBar()
@@ -608,22 +614,31 @@ class GlueApplication(Application, QMainWindow):
         return ga
 
     @staticmethod
-    def restore(path, show=True):
+    def restore(path, show=True, lazy=None):
         """Reload a previously-saved session
 
         :param path: Path to the file to load
         :type path: str
         :param show: If True (the default), immediately show the widget
         :type show: bool
+        :param lazy: If True, defer reading data files, and building
+                     viewers in hidden tabs, until they are needed.
+                     Defaults to the ``lazy_restore`` setting
+        :type lazy: bool
 
         :returns: A new :class:`GlueApplication`
         """
         from ..core.state import GlueUnSerializer
+        from ..config import lazy_restore
 
-        with open(path) as infile:
-            state = GlueUnSerializer.load(infile)
+        if lazy is None:
+            lazy = lazy_restore()
+
+        state = GlueUnSerializer.load_path(path, lazy=lazy)
 
         ga = state.object('__main__')
+        logging.getLogger(__name__).info("Slowest objects to restore:\n%s",
+                                         state.report())
         if show:
             ga.show()
         return ga
@@ -709,7 +724,13 @@ class GlueApplication(Application, QMainWindow):
         # figures are still inlined in the notebook.
         # XXX find out a better place for this
         _fix_ipython_pylab()
-        return self.app.exec_()
+
+        # coalesce plot redraws once the event loop is running
+        redraw_scheduler.install(QTimer.singleShot)
+        try:
+            return self.app.exec_()
+        finally:
+            redraw_scheduler.install(None)
 
     exec_ = start
 
@@ -731,10 +752,58 @@ class GlueApplication(Application, QMainWindow):
 
     def dropEvent(self, event):
         urls = event.mimeData().urls()
-        for url in urls:
-            self.load_data(url.path())
+        self.load_data_files([url.path() for url in urls])
         event.accept()
 
+    def load_data_files(self, paths):
+        """
+        Load many files, globs or directories in parallel, in the
+        background.
+
+        Data are added to the data collection (and watched for changes)
+        from the GUI thread, in batches, as they finish loading. Files
+        which cannot be loaded are reported once everything has finished.
+
+        :param paths: A list of paths to load
+        """
+        results = start_loading_data(expand_data_paths(paths))
+        created, errors = [], []
+        timer = QTimer(self)
+        timer.setInterval(250)
+
+        def add_finished():
+            batch, done = [], False
+            while not done:
+                try:
+                    result = results.get_nowait()
+                except six.moves.queue.Empty:
+                    break
+                if result is None:
+                    done = True
+                elif result.error is not None:
+                    errors.append("%s: %s" % (result.path, result.error))
+                else:
+                    batch.extend(as_list(result.data))
+                    batch[-1]._load_log.watch()
+
+            if batch:
+                self.data_collection.extend(batch)
+                created.extend(batch)
+            if not done:
+                return
+
+            timer.stop()
+            timer.deleteLater()
+            if created:
+                # already added -- record the datasets, so they can be undone
+                self.do(command.AddDatasets(data=created))
+            if errors:
+                self.report_error("Could not load %i file(s)" % len(errors),
+                                  "\n".join(errors))
+
+        timer.timeout.connect(add_finished)
+        timer.start()
+
     def report_error(self, message, detail):
         """
         Display an error in a modal
@@ -932,6 +932,7 @@ if __name__ == "__main__":
 class Worker(QThread):
     result = Signal(object)
     error = Signal(object)
+    progress = Signal(int, int)  # functions may report (done, total)
 
     def __init__(self, func, *args, **kwargs):
         """
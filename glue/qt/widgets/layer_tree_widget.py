@@ -505,7 +505,9 @@ class LayerTreeWidget(QWidget, Ui_LayerTree):
 def save_subset(subset):
     assert isinstance(subset, core.subset.Subset)
     fname, fltr = QFileDialog.getSaveFileName(caption="Select an output name",
-                                              filter='FITS mask (*.fits);; Fits mask (*.fits)')
+                                              filter='FITS mask (*.fits);; '
+                                              'Compact mask (*.npz);; '
+                                              'HDF5 mask (*.hdf5)')
     fname = str(fname)
     if not fname:
         return
@@ -1,7 +1,8 @@
 from __future__ import absolute_import, division, print_function
 
 from ...external.qt import QtGui
-from ...external.qt.QtCore import Qt
+from ...external.qt.QtCore import Qt, QTimer
+from ...external.axescache import AxesCache
 from ... import core
 
 from ...clients.scatter_client import ScatterClient
@@ -15,7 +16,7 @@ from ..widget_properties import (ButtonProperty, FloatLineProperty,
                                  CurrentComboProperty,
                                  connect_bool_button, connect_float_edit)
 
-from ..qtutil import load_ui, cache_axes, nonpartial
+from ..qtutil import load_ui, nonpartial
 
 __all__ = ['ScatterWidget']
 
@@ -63,10 +64,36 @@ class ScatterWidget(DataViewer):
         self._connect()
         self.unique_fields = set()
         tb = self.make_toolbar()
-        cache_axes(self.client.axes, tb)
+        self._connect_interaction(tb)
         self.statusBar().setSizeGripEnabled(False)
         self.setFocusPolicy(Qt.StrongFocus)
 
+    def _connect_interaction(self, toolbar):
+        """
+        Cache renders during window resizes, and draw a random
+        subsample of each layer during pan/zoom drags. Once the
+        drag ends, the rest of the points are added whenever the
+        event loop is idle.
+        """
+        canvas = self.central_widget.canvas
+        cache = AxesCache(self.client.axes)
+        canvas.resize_begin.connect(cache.enable)
+        canvas.resize_end.connect(cache.disable)
+
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setInterval(0)
+        self._refine_timer.timeout.connect(self._refine)
+        toolbar.pan_begin.connect(self._begin_interaction)
+        toolbar.pan_end.connect(self._refine_timer.start)
+
+    def _begin_interaction(self):
+        self._refine_timer.stop()
+        self.client.begin_interaction()
+
+    def _refine(self):
+        if not self.client.refine():
+            self._refine_timer.stop()
+
     def _tweak_geometry(self):
         self.central_widget.resize(600, 400)
         self.resize(self.central_widget.size())
@@ -261,12 +288,16 @@ class ScatterWidget(DataViewer):
     @defer_draw
     def update_xatt(self, index):
         component_id = self.xatt
+        self._begin_interaction()
         self.client.xatt = component_id
+        self._refine_timer.start()
 
     @defer_draw
     def update_yatt(self, index):
         component_id = self.yatt
+        self._begin_interaction()
         self.client.yatt = component_id
+        self._refine_timer.start()
 
     def _update_window_title(self):
         data = self.client.data
@@ -9,6 +9,7 @@ from mock import patch
 
 from ..scatter_widget import ScatterWidget
 from ..mpl_widget import MplCanvas
+from ...glue_toolbar import GlueToolbar
 from .... import core
 from . import simple_session
 
@@ -325,3 +326,33 @@ class TestDrawCount(TestScatterWidget):
         with self.patch_draw() as draw:
             self.widget.swap_axes()
         assert draw.call_count == 1
+
+
+class TestInteraction(TestScatterWidget):
+
+    def setup_method(self, method):
+        super(TestInteraction, self).setup_method(method)
+        self.add_layer_via_method()
+        self.toolbar = self.widget.findChild(GlueToolbar)
+        self.client = self.widget.client
+        self.client.interactive_points = 1
+
+    def test_pan_samples_then_refines(self):
+        self.toolbar.pan_begin.emit()
+        assert self.client._max_points == 1
+        assert not self.widget._refine_timer.isActive()
+
+        self.toolbar.pan_end.emit()
+        assert self.widget._refine_timer.isActive()
+
+        # 1 -> 4 points covers the layer, so one step restores everything
+        self.widget._refine()
+        assert self.client._max_points is None
+        assert not self.widget._refine_timer.isActive()
+
+    def test_new_pan_interrupts_refinement(self):
+        self.toolbar.pan_begin.emit()
+        self.toolbar.pan_end.emit()
+        self.toolbar.pan_begin.emit()
+        assert not self.widget._refine_timer.isActive()
+        assert self.client._max_points == 1
@@ -36,6 +36,8 @@ SKIMAGE_INSTALLED, requires_skimage = make_skipper('skimage',
 
 XLRD_INSTALLED, requires_xlrd = make_skipper('xlrd')
 
+H5PY_INSTALLED, requires_h5py = make_skipper('h5py')
+
 PLOTLY_INSTALLED, requires_plotly = make_skipper('plotly')
 
 IPYTHON_GE_012_INSTALLED, requires_ipython_ge_012 = make_skipper('IPython',
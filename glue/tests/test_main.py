@@ -7,6 +7,7 @@ from ..main import (die_on_error, restore_session, load_data_files,
                     main, start_glue)
 
 from ..core import Data, DataCollection, Hub
+from ..core.data_factories import LoadLog
 
 
 def test_die_on_error_exception():
@@ -29,12 +30,38 @@ def test_die_on_error_noexception():
 
 
 def test_load_data_files():
-    with patch('glue.core.data_factories.load_data') as ld:
+    with patch('glue.core.data_factories._load_data') as ld:
         ld.return_value = Data()
+        LoadLog('test.py', None, {}).log(ld.return_value)
         dc = load_data_files(['test.py'])
         assert len(dc) == 1
 
 
+def test_load_data_files_all_failed():
+    """Failures raise, even when adding to a non-empty collection"""
+    dc = DataCollection([Data(label='restored')])
+    with patch('glue.core.data_factories._load_data') as ld:
+        ld.side_effect = IOError('bad file')
+        with patch('glue.external.qt.QtGui.QMessageBox'):
+            with pytest.raises(SystemExit):
+                load_data_files(['a.csv', 'b.csv'], data_collection=dc)
+    assert len(dc) == 1
+
+
+def test_load_data_files_some_failed():
+    from ..core.data_factories import LoadResult
+
+    results = [LoadResult('a.csv', Data(), None, 0.),
+               LoadResult('b.csv', None, IOError('bad file'), 0.)]
+    with patch('glue.core.data_factories.add_data_files') as adf:
+        adf.return_value = results
+        with patch('glue.main.logging') as log:
+            load_data_files(['a.csv', 'b.csv'])
+    error = log.getLogger.return_value.error
+    assert error.call_count == 1
+    assert error.call_args[0][1] == 'b.csv'
+
+
 def check_main(cmd, glue, config, data):
     """Pass command to main program, check for expected parsing"""
     with patch('glue.main.start_glue') as sg:
@@ -73,6 +100,11 @@ def test_main_auto_glu():
     check_main('glueqt test.glu', 'test.glu', None, None)
 
 
+def test_main_glu_and_load():
+    check_main('glueqt test.glu -l data', 'test.glu', None, ['data'])
+    check_main('glueqt -g test.glu -l data', 'test.glu', None, ['data'])
+
+
 def test_main_many_args():
     check_main('glueqt -c config.py data.fits d2.csv', None,
                'config.py', ['data.fits', 'd2.csv'])
@@ -87,9 +119,11 @@ def test_auto_exec():
 
 
 @pytest.mark.parametrize(('cmd'), ['glueqt -g test.glu test.fits',
+                                   'glueqt test.glu test.fits',
                                    'glueqt -g test.py test.fits',
                                    'glueqt -x test.py -g test.glu',
                                    'glueqt -x test.py -c test.py',
+                                   'glueqt -x test.py -l data',
                                    'glueqt -x',
                                    'glueqt -g',
                                    'glueqt -c'])
@@ -120,4 +154,4 @@ def test_start(glue, config, data):
                         if config:
                             lc.assert_called_once_with(search_path=[config])
                         if data:
-                            ldf.assert_called_once_with(data)
+                            ldf.assert_called_once_with(data, workers=None)